@@ -0,0 +1,156 @@
+"""
+Admission control for the inference endpoints.
+
+At most `max_in_flight` requests run inference at once. Further requests wait
+in a bounded FIFO queue; a finishing request hands its slot directly to the
+oldest waiter. A request is rejected instead of queued without limit:
+  - 429 when the queue is already full,
+  - 503 when it could not get a slot within its deadline (ADMISSION_DEADLINE_MS,
+    or a shorter X-Request-Deadline-Ms sent by the client).
+Both carry a Retry-After estimated from the recent time a request holds a slot.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from app.config import ADMISSION_DEADLINE_MS, ADMISSION_MAX_IN_FLIGHT, ADMISSION_MAX_QUEUE
+from app.metrics import ADMISSION_IN_FLIGHT, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTIONS, STAGE_LATENCY
+
+# Weight of the newest observation in the moving average of slot hold times
+EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight: int = 64, max_queue: int = 256, deadline_ms: float = 2000.0):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.deadline_ms = deadline_ms
+        self.in_flight = 0
+        self._waiters = deque()
+        self._hold_seconds: Optional[float] = None
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        self.max_queue_depth = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_in_flight > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained, at least 1."""
+        hold = self._hold_seconds or self.deadline_ms / 1000
+        return max(1, math.ceil(hold * (self.queue_depth + 1) / max(1, self.max_in_flight)))
+
+    def _reject(self, status_code: int, reason: str):
+        ADMISSION_REJECTIONS.inc(reason=reason)
+        raise AdmissionRejected(status_code, reason, self.retry_after())
+
+    async def acquire(self, deadline_ms: Optional[float] = None) -> float:
+        """Wait for an inference slot or raise AdmissionRejected. Returns the seconds spent queued."""
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            STAGE_LATENCY.observe(0.0, stage="admission")
+            return 0.0
+
+        if self.queue_depth >= self.max_queue:
+            self.rejected_queue_full += 1
+            self._reject(429, "queue_full")
+
+        deadline_ms = self.deadline_ms if deadline_ms is None else min(deadline_ms, self.deadline_ms)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, timeout=max(0.0, deadline_ms) / 1000)
+        except asyncio.TimeoutError:
+            self._forget(waiter)
+            self.rejected_deadline += 1
+            self._reject(503, "deadline")
+        except asyncio.CancelledError:
+            # Client went away while queued; pass on a slot it may just have been given
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            self._forget(waiter)
+            raise
+        self.admitted += 1
+        waited = time.perf_counter() - start
+        STAGE_LATENCY.observe(waited, stage="admission")
+        return waited
+
+    def _forget(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self, hold_seconds: Optional[float] = None):
+        """Free a slot; hold_seconds (omitted for long-lived streams) feeds the Retry-After estimate."""
+        if hold_seconds is not None:
+            self._hold_seconds = hold_seconds if self._hold_seconds is None else \
+                EWMA_ALPHA * hold_seconds + (1 - EWMA_ALPHA) * self._hold_seconds
+        # Hand the slot to the oldest request still waiting, else free it
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    @asynccontextmanager
+    async def slot(self, deadline_ms: Optional[float] = None):
+        """Hold a slot for the body of the block; yields the seconds spent queued."""
+        if not self.enabled:
+            yield 0.0
+            return
+        waited = await self.acquire(deadline_ms)
+        start = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            self.release(time.perf_counter() - start)
+
+    def get_stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "deadline_ms": self.deadline_ms,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_deadline": self.rejected_deadline,
+            "avg_hold_ms": self._hold_seconds * 1000 if self._hold_seconds is not None else None,
+        }
+
+
+admission = AdmissionController(
+    max_in_flight=ADMISSION_MAX_IN_FLIGHT,
+    max_queue=ADMISSION_MAX_QUEUE,
+    deadline_ms=ADMISSION_DEADLINE_MS
+)
+ADMISSION_IN_FLIGHT.set_function(lambda: {(): float(admission.in_flight)})
+ADMISSION_QUEUE_DEPTH.set_function(lambda: {(): float(admission.queue_depth)})
@@ -0,0 +1,191 @@
+"""
+On-disk cache of model artifacts downloaded from the MLflow registry.
+
+Layout under the cache root:
+  blobs/<sha256>/                  downloaded artifact directory, named by a hash of its contents
+  refs/<model>/<version>.json      registered version -> blob, with download time and size
+  refs/<model>/current.json        version most recently served, loaded at startup without the registry
+  tmp/                             in-progress downloads
+
+Downloads land in tmp/ and are renamed into blobs/ only when complete, and ref
+files are replaced atomically, so a crash or a concurrent process never sees a
+partial artifact. Versions with identical artifacts share one blob.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.metrics import MODEL_CACHE_LOOKUPS
+
+CURRENT_REF = "current"
+
+
+def _write_json_atomic(path: str, data: Dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def directory_digest(path: str) -> Tuple[str, int]:
+    """sha256 over every file's relative path and contents, and the total size in bytes."""
+    digest = hashlib.sha256()
+    size = 0
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            digest.update(os.path.relpath(full, path).encode())
+            with open(full, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            size += os.path.getsize(full)
+    return digest.hexdigest(), size
+
+
+def is_writable(root: str) -> bool:
+    """Whether the cache root can be created and written to, checked with a real file."""
+    try:
+        os.makedirs(root, exist_ok=True)
+        with tempfile.TemporaryFile(dir=root):
+            pass
+        return True
+    except OSError:
+        return False
+
+
+class ModelArtifactCache:
+    def __init__(self, root: str, keep: int = 3):
+        self.root = root
+        self.keep = keep
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.downloads = 0
+        self.download_seconds_total = 0.0
+        self.last_download_seconds: Optional[float] = None
+
+    def _ref_path(self, model_name: str, version: str) -> str:
+        return os.path.join(self.root, "refs", model_name, f"{version}.json")
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, "blobs", digest)
+
+    def lookup(self, model_name: str, version: str) -> Optional[str]:
+        """Local artifact directory of a cached version, or None."""
+        ref = _read_json(self._ref_path(model_name, version))
+        path = self._blob_path(ref["digest"]) if ref else None
+        hit = path is not None and os.path.isdir(path)
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        MODEL_CACHE_LOOKUPS.inc(result="hit" if hit else "miss")
+        return path if hit else None
+
+    def fetch(self, model_name: str, version: str, download: Callable[[str], str]) -> Tuple[str, Optional[float]]:
+        """
+        Local artifact directory of a version, downloading it on a miss.
+        `download(dst)` must place the artifacts under the directory dst and
+        return their path. Returns the path and the download time (None on a hit).
+        """
+        path = self.lookup(model_name, version)
+        if path is not None:
+            return path, None
+
+        tmp_root = os.path.join(self.root, "tmp")
+        os.makedirs(tmp_root, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=tmp_root, prefix=f"{model_name}-{version}-")
+        try:
+            start = time.perf_counter()
+            downloaded = download(staging)
+            seconds = time.perf_counter() - start
+
+            digest, size = directory_digest(downloaded)
+            path = self._blob_path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.rename(downloaded, path)
+            except OSError:
+                # Same contents already cached (another version or process)
+                if not os.path.isdir(path):
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        _write_json_atomic(self._ref_path(model_name, version), {
+            "version": version,
+            "digest": digest,
+            "size_bytes": size,
+            "downloaded_at": time.time(),
+            "download_seconds": seconds,
+        })
+        with self._lock:
+            self.downloads += 1
+            self.download_seconds_total += seconds
+            self.last_download_seconds = seconds
+        print(f"✓ Cached {model_name} version {version} ({size / 1e6:.1f} MB in {seconds:.2f}s)")
+        return path, seconds
+
+    def current(self, model_name: str) -> Optional[str]:
+        ref = _read_json(self._ref_path(model_name, CURRENT_REF))
+        return ref["version"] if ref else None
+
+    def set_current(self, model_name: str, version: str):
+        _write_json_atomic(self._ref_path(model_name, CURRENT_REF), {"version": version, "updated_at": time.time()})
+
+    def versions(self, model_name: str) -> List[Dict]:
+        folder = os.path.join(self.root, "refs", model_name)
+        if not os.path.isdir(folder):
+            return []
+        refs = [_read_json(os.path.join(folder, name)) for name in os.listdir(folder)
+                if name.endswith(".json") and name != f"{CURRENT_REF}.json"]
+        return sorted((ref for ref in refs if ref), key=lambda ref: ref["downloaded_at"], reverse=True)
+
+    def prune(self, model_name: str):
+        """Keep the `keep` most recently downloaded versions (and the current one); drop unreferenced blobs."""
+        current = self.current(model_name)
+        for ref in self.versions(model_name)[self.keep:]:
+            if ref["version"] != current:
+                os.remove(self._ref_path(model_name, ref["version"]))
+
+        referenced = set()
+        refs_root = os.path.join(self.root, "refs")
+        for name in os.listdir(refs_root) if os.path.isdir(refs_root) else []:
+            referenced.update(ref["digest"] for ref in self.versions(name))
+        blobs_root = os.path.join(self.root, "blobs")
+        for digest in os.listdir(blobs_root) if os.path.isdir(blobs_root) else []:
+            # A blob just renamed into place may not have its ref written yet
+            recent = time.time() - os.path.getmtime(self._blob_path(digest)) < 60
+            if digest not in referenced and not recent:
+                shutil.rmtree(self._blob_path(digest), ignore_errors=True)
+
+    def get_stats(self, model_name: Optional[str] = None) -> Dict:
+        stats = {
+            "enabled": True,
+            "root": self.root,
+            "hits": self.hits,
+            "misses": self.misses,
+            "downloads": self.downloads,
+            "download_seconds_total": self.download_seconds_total,
+            "last_download_seconds": self.last_download_seconds,
+        }
+        if model_name is not None:
+            stats["current_version"] = self.current(model_name)
+            stats["versions"] = self.versions(model_name)
+        return stats
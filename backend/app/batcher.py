@@ -0,0 +1,140 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.config import BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS
+from app.executor import InferenceExecutor, executor
+
+
+class MicroBatcher:
+    """
+    Dynamic batching layer between the /predict route and the inference
+    executor. Concurrent single-student requests are queued and flushed as one
+    stacked model call once max_batch_size requests are waiting or max_wait_ms
+    has passed since the first request of the batch arrived.
+    """
+
+    def __init__(self, executor: InferenceExecutor, max_batch_size: int = 32, max_wait_ms: float = 2.0):
+        self.executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self._batches = 0
+        self._requests = 0
+        self._last_batch_size = 0
+        self._largest_batch = 0
+        self._total_wait = 0.0
+        self._max_wait_seen = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        # Fail anything still waiting so callers do not hang on shutdown
+        while self._queue is not None and not self._queue.empty():
+            self._fail_pending([self._queue.get_nowait()])
+
+    @staticmethod
+    def _fail_pending(batch: List[Tuple]):
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped"))
+
+    async def predict(self, grades: Dict[str, float]) -> Tuple[Dict[str, float], str]:
+        if not self.is_running:
+            raise RuntimeError("Batcher not running. Call start() first.")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((grades, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.max_wait_ms / 1000.0
+
+                while len(batch) < self.max_batch_size:
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+
+                await self._flush(batch)
+            except asyncio.CancelledError:
+                # Stopped while collecting or flushing: the requests already taken
+                # off the queue would otherwise wait forever
+                self._fail_pending(batch)
+                raise
+
+    async def _predict_batch(self, grades_list: List[Dict[str, float]]) -> Tuple[List[Dict[str, float]], str]:
+        return await self.executor.predict_batch(grades_list)
+
+    async def _flush(self, batch: List[Tuple]):
+        flushed_at = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            wait = flushed_at - enqueued_at
+            self._total_wait += wait
+            self._max_wait_seen = max(self._max_wait_seen, wait)
+
+        self._batches += 1
+        self._requests += len(batch)
+        self._last_batch_size = len(batch)
+        self._largest_batch = max(self._largest_batch, len(batch))
+
+        try:
+            results, model_name = await self._predict_batch([grades for grades, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            # The caller may have gone away (client disconnect) while queued
+            if not future.done():
+                future.set_result((result, model_name))
+
+    def get_stats(self) -> Dict:
+        return {
+            "enabled": self.is_running,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self._batches,
+            "requests": self._requests,
+            "last_batch_size": self._last_batch_size,
+            "largest_batch_size": self._largest_batch,
+            "avg_batch_size": self._requests / self._batches if self._batches else 0.0,
+            "avg_wait_ms": 1000.0 * self._total_wait / self._requests if self._requests else 0.0,
+            "max_wait_ms_observed": 1000.0 * self._max_wait_seen,
+        }
+
+
+batcher = MicroBatcher(executor, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
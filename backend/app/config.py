@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -8,5 +9,78 @@ FEATURE_COLUMNS_PATH = os.getenv("FEATURE_COLUMNS_PATH", str(BASE_DIR / "models"
 TARGET_COLUMNS_PATH = os.getenv("TARGET_COLUMNS_PATH", str(BASE_DIR / "models" / "target_columns.pkl"))
 METADATA_PATH = os.getenv("METADATA_PATH", str(BASE_DIR / "models" / "model_metadata.json"))
 
+# "pickle" loads MODEL_PATH with joblib; "arrays" memory-maps the flattened
+# ensemble written by scripts/export_model_arrays.py to MODEL_ARRAYS_PATH
+MODEL_FORMAT = os.getenv("MODEL_FORMAT", "pickle").lower()
+MODEL_ARRAYS_PATH = os.getenv("MODEL_ARRAYS_PATH", str(BASE_DIR / "models" / "best_model_arrays"))
+
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "")
-MLFLOW_MODEL_NAME = os.getenv("MLFLOW_MODEL_NAME", "grade-predictor")
\ No newline at end of file
+MLFLOW_MODEL_NAME = os.getenv("MLFLOW_MODEL_NAME", "grade-predictor")
+# Registry artifacts are downloaded once per version into this directory and
+# served from it on the next start ("" disables, as does a directory that is not
+# writable); older versions beyond MODEL_CACHE_KEEP are pruned. Kept out of
+# models/, which deployments mount read-only
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "academiq", "registry_cache"))
+MODEL_CACHE_KEEP = int(os.getenv("MODEL_CACHE_KEEP", "3"))
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "10000"))
+
+# Per-student feature vectors written by scripts/build_feature_store.py
+FEATURE_STORE_PATH = os.getenv("FEATURE_STORE_PATH", str(BASE_DIR / "models" / "feature_store"))
+
+# Further model versions served next to the primary one (app/model_pool.py):
+# comma-separated name=source pairs, a source being "mlflow:<version>" or a
+# directory laid out like backend/models. Loaded on first use; the least
+# recently used are unloaded while the pool exceeds MODEL_POOL_MEMORY_MB.
+MODEL_POOL_VERSIONS = os.getenv("MODEL_POOL_VERSIONS", "")
+MODEL_POOL_MEMORY_MB = float(os.getenv("MODEL_POOL_MEMORY_MB", "1024"))
+# Share of unpinned requests routed to pool versions, e.g. "candidate:0.1"
+MODEL_CANARY_WEIGHTS = os.getenv("MODEL_CANARY_WEIGHTS", "")
+# Pool version that also scores every unpinned request in the background, for comparison only
+MODEL_SHADOW_VERSION = os.getenv("MODEL_SHADOW_VERSION", "")
+
+# Dynamic micro-batching of concurrent /predict calls
+BATCHING_ENABLED = os.getenv("BATCHING_ENABLED", "false").lower() == "true"
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "2"))
+
+# Admission control of the inference endpoints (app/admission.py): at most
+# ADMISSION_MAX_IN_FLIGHT requests run at once (0 disables), ADMISSION_MAX_QUEUE
+# more wait for a slot (429 beyond that) for up to ADMISSION_DEADLINE_MS (503 after)
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "64"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "256"))
+ADMISSION_DEADLINE_MS = float(os.getenv("ADMISSION_DEADLINE_MS", "2000"))
+
+# Where model inference runs: "inline" (on the event loop), "thread" or "process"
+INFERENCE_EXECUTOR = os.getenv("INFERENCE_EXECUTOR", "thread").lower()
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+
+# Evaluate tree ensembles through the flattened array engine (app/tree_engine.py)
+COMPILED_INFERENCE = os.getenv("COMPILED_INFERENCE", "true").lower() == "true"
+# Larger batches go to model.predict, which overtakes the engine there
+# (see the crossover reported by scripts/benchmark_tree_engine.py; 0 = no limit)
+COMPILED_INFERENCE_MAX_ROWS = int(os.getenv("COMPILED_INFERENCE_MAX_ROWS", "2048"))
+
+# In-process LRU cache of predictions (size 0 disables it, TTL 0 never expires).
+# With quantization on, inputs are rounded to 0.01 before prediction and lookup.
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "4096"))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", "3600"))
+PREDICTION_CACHE_QUANTIZE = os.getenv("PREDICTION_CACHE_QUANTIZE", "false").lower() == "true"
+
+# Rows per model call when scoring streamed NDJSON/CSV uploads
+STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", "500"))
+# Longest accepted upload row; longer rows are dropped and reported as an error (0 disables)
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))
+
+# Hot reload: seconds between checks of the model source for a new version (0 disables)
+MODEL_RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_INTERVAL", "60"))
+# /admin endpoints require a matching X-Admin-Token header. Without a token
+# they answer 404, unless ADMIN_OPEN=true opens them (local development only)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+ADMIN_OPEN = os.getenv("ADMIN_OPEN", "false").lower() == "true"
+
+# `python -m app.serve`: SERVER_WORKERS > 1 loads the model once and forks
+# that many uvicorn workers sharing its memory copy-on-write
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
@@ -0,0 +1,132 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from app.config import INFERENCE_EXECUTOR, INFERENCE_WORKERS
+from app.predictor import GradePredictor, predictor
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+
+def _init_process_worker():
+    """
+    Runs once in every process-pool worker so each worker loads the model a
+    single time instead of receiving it pickled with every call.
+    """
+    if not predictor.is_loaded:
+        predictor.load_model()
+
+
+def _process_call(method: str, *args):
+    return getattr(predictor, method)(*args)
+
+
+def _process_warmup(delay: float) -> int:
+    time.sleep(delay)
+    return os.getpid()
+
+
+class InferenceExecutor:
+    """
+    Runs model inference away from the asyncio event loop.
+
+    Modes:
+      - inline: call the predictor directly on the event loop
+      - thread: run in a thread pool sharing the in-process model
+      - process: run in a process pool, each worker holding its own model
+    """
+
+    def __init__(self, predictor: GradePredictor, mode: str = "thread", workers: int = 2):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown inference executor mode: {mode} (expected one of {EXECUTOR_MODES})")
+        self.predictor = predictor
+        self.mode = mode
+        self.workers = max(1, workers)
+        self._pool: Optional[Executor] = None
+        self._in_flight = 0
+        self._completed = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._pool is not None
+
+    def start(self):
+        if self._pool is not None or self.mode == "inline":
+            return
+        self._pool = self._create_pool()
+
+    def _create_pool(self) -> Executor:
+        if self.mode == "thread":
+            return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+
+        # spawn rather than fork: forking a process that already initialised
+        # OpenMP (XGBoost, sklearn) threads can deadlock the children.
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process_worker
+        )
+        # Workers are spawned on demand; start them all now so model loading
+        # happens at startup instead of on the first requests.
+        pids = {f.result() for f in [pool.submit(_process_warmup, 0.1) for _ in range(self.workers)]}
+        print(f"✓ Inference process pool ready ({len(pids)} workers)")
+        return pool
+
+    def shutdown(self):
+        if self._pool is None:
+            return
+        self._pool.shutdown(wait=True, cancel_futures=True)
+        self._pool = None
+
+    def restart(self):
+        """
+        Replace the worker pool with a freshly started one, e.g. so process
+        workers pick up a newly loaded model. Calls already running on the old
+        pool finish there; new calls go to the new pool as soon as it is ready.
+        """
+        if self.mode == "inline":
+            return
+        new_pool = self._create_pool()
+        old_pool, self._pool = self._pool, new_pool
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    async def predict(self, grades: Dict[str, float]) -> Tuple[Dict[str, float], str]:
+        results, model_name = await self.predict_batch([grades])
+        return results[0], model_name
+
+    async def predict_batch(self, grades_list: List[Dict[str, float]]) -> Tuple[List[Dict[str, float]], str]:
+        return await self.call("predict_batch", grades_list)
+
+    async def predict_vectors(self, vectors: List[List[float]]) -> Tuple[List[List[float]], str]:
+        return await self.call("predict_vectors", vectors)
+
+    async def call(self, method: str, *args):
+        """Run a GradePredictor method with the given arguments in the configured executor."""
+        self._in_flight += 1
+        try:
+            if self._pool is None:
+                return getattr(self.predictor, method)(*args)
+
+            loop = asyncio.get_running_loop()
+            if self.mode == "thread":
+                return await loop.run_in_executor(self._pool, getattr(self.predictor, method), *args)
+            return await loop.run_in_executor(self._pool, _process_call, method, *args)
+        finally:
+            self._in_flight -= 1
+            self._completed += 1
+
+    def get_stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers if self.mode != "inline" else 0,
+            "running": self.is_running,
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+        }
+
+
+executor = InferenceExecutor(predictor, mode=INFERENCE_EXECUTOR, workers=INFERENCE_WORKERS)
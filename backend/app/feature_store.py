@@ -0,0 +1,174 @@
+"""
+Server-side store of per-student S1-S4 feature vectors, indexed by admi.
+
+The store is a directory of .npy arrays written by scripts/build_feature_store.py
+and memory-mapped at startup:
+  admi      sorted student IDs (binary-searched on lookup)
+  features  float32 matrix, one row per student, columns as in store.json
+  cohort    cohort index of each student into store.json "cohorts"
+Predictions for every stored student are computed once per model generation,
+and per-cohort percentile summaries are cached on top of them.
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.config import FEATURE_STORE_PATH
+from app.predictor import GradePredictor
+
+STORE_META_FILE = "store.json"
+ALL_COHORTS = "all"
+# Label of students whose cohort is not known; distinct from the ALL_COHORTS sentinel
+UNKNOWN_COHORT = "unknown"
+SUMMARY_PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def save_feature_store(path: str, admi: np.ndarray, features: np.ndarray, cohorts: List[str],
+                       feature_columns: List[str]):
+    """Write a store; `cohorts` holds each student's cohort name, in the same order as `admi`."""
+    # Integer IDs stay int64; anything else (e.g. a pandas object column) becomes
+    # fixed-width unicode, since object arrays cannot be memory-mapped
+    admi = np.asarray(admi)
+    admi = admi.astype(np.int64) if np.issubdtype(admi.dtype, np.integer) else admi.astype(str)
+    order = np.argsort(admi, kind="stable")
+    names = sorted(set(cohorts))
+    codes = np.array([names.index(c) for c in cohorts], dtype=np.int16)
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "admi.npy"), admi[order])
+    np.save(os.path.join(path, "features.npy"), np.ascontiguousarray(np.asarray(features, dtype=np.float32)[order]))
+    np.save(os.path.join(path, "cohort.npy"), codes[order])
+    with open(os.path.join(path, STORE_META_FILE), "w") as f:
+        json.dump({
+            "feature_columns": list(feature_columns),
+            "cohorts": names,
+            "n_students": int(len(order)),
+            "built_at": time.time(),
+        }, f, indent=2)
+
+
+class FeatureStore:
+    def __init__(self, path: str):
+        self.path = path
+        self.admi: Optional[np.ndarray] = None
+        self.features: Optional[np.ndarray] = None
+        self.cohort: Optional[np.ndarray] = None
+        self.feature_columns: List[str] = []
+        self.cohorts: List[str] = []
+        self._lock = threading.Lock()
+        # (generation, predictions, target columns)
+        self._predictions: Optional[Tuple[int, np.ndarray, List[str]]] = None
+        self._summaries: Dict[Tuple[int, str], Dict] = {}
+        self.precompute_seconds: Optional[float] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.admi is not None
+
+    def load(self) -> bool:
+        meta_path = os.path.join(self.path, STORE_META_FILE)
+        if not os.path.exists(meta_path):
+            print(f"No feature store at {self.path}; student lookup endpoints disabled")
+            return False
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            self.admi = np.load(os.path.join(self.path, "admi.npy"), mmap_mode="r")
+            self.features = np.load(os.path.join(self.path, "features.npy"), mmap_mode="r")
+            self.cohort = np.load(os.path.join(self.path, "cohort.npy"), mmap_mode="r")
+            self.feature_columns = meta["feature_columns"]
+            self.cohorts = meta["cohorts"]
+        except Exception as e:
+            print(f"Error loading feature store: {e}")
+            self.admi = None
+            return False
+
+        with self._lock:
+            self._predictions = None
+            self._summaries.clear()
+        print(f"✓ Feature store loaded: {len(self.admi)} students, {len(self.cohorts)} cohorts")
+        return True
+
+    def row(self, admi: str) -> Optional[int]:
+        """Row index of a student, or None if the ID is not in the store."""
+        try:
+            key = int(admi) if np.issubdtype(self.admi.dtype, np.integer) else str(admi)
+        except ValueError:
+            return None
+        i = int(np.searchsorted(self.admi, key))
+        if i < len(self.admi) and self.admi[i] == key:
+            return i
+        return None
+
+    def cohort_of(self, row: int) -> str:
+        return self.cohorts[int(self.cohort[row])]
+
+    def cohort_rows(self, cohort: str) -> Optional[np.ndarray]:
+        if cohort == ALL_COHORTS:
+            return np.arange(len(self.admi))
+        if cohort not in self.cohorts:
+            return None
+        return np.flatnonzero(np.asarray(self.cohort) == self.cohorts.index(cohort))
+
+    def predictions(self, predictor: GradePredictor) -> Tuple[np.ndarray, List[str]]:
+        """Predictions for every stored student under the active model, computed once per generation."""
+        cached = self._predictions
+        if cached is not None and cached[0] == predictor.generation:
+            return cached[1], cached[2]
+
+        with self._lock:
+            cached = self._predictions
+            if cached is not None and cached[0] == predictor.generation:
+                return cached[1], cached[2]
+            start = time.perf_counter()
+            predictions, targets, generation = predictor.predict_bulk(self.feature_columns, self.features)
+            self.precompute_seconds = time.perf_counter() - start
+            self._predictions = (generation, predictions, targets)
+            self._summaries = {key: value for key, value in self._summaries.items() if key[0] == generation}
+            return predictions, targets
+
+    def summary(self, predictor: GradePredictor, cohort: str) -> Optional[Dict]:
+        """Per target course mean and percentiles of the predicted grades of a cohort."""
+        rows = self.cohort_rows(cohort)
+        if rows is None:
+            return None
+
+        predictions, targets = self.predictions(predictor)
+        key = (predictor.generation, cohort)
+        cached = self._summaries.get(key)
+        if cached is not None:
+            return cached
+
+        subset = predictions[rows]
+        courses = {}
+        if len(subset):
+            percentiles = np.percentile(subset, SUMMARY_PERCENTILES, axis=0)
+            means = subset.mean(axis=0)
+            for j, course in enumerate(targets):
+                courses[course] = {
+                    "mean": round(float(means[j]), 2),
+                    **{f"p{p}": round(float(percentiles[k, j]), 2) for k, p in enumerate(SUMMARY_PERCENTILES)},
+                }
+        result = {"cohort": cohort, "students": int(len(rows)), "courses": courses}
+        self._summaries[key] = result
+        return result
+
+    def get_stats(self) -> Dict:
+        if not self.is_loaded:
+            return {"loaded": False}
+        return {
+            "loaded": True,
+            "path": self.path,
+            "students": int(len(self.admi)),
+            "cohorts": len(self.cohorts),
+            "predictions_generation": self._predictions[0] if self._predictions else None,
+            "precompute_seconds": self.precompute_seconds,
+            "cached_summaries": len(self._summaries),
+        }
+
+
+feature_store = FeatureStore(FEATURE_STORE_PATH)
@@ -1,15 +1,68 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response, Header, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from typing import Optional
+import asyncio
+import functools
+import math
 
-from app.schemas import GradeInput, GradePrediction, HealthResponse, ModelInfo
+import numpy as np
+
+from fastapi.responses import PlainTextResponse
+from starlette.background import BackgroundTask
+
+# orjson-backed responses when available; they skip pydantic re-serialization
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    from fastapi.responses import JSONResponse as FastJSONResponse
+
+from app.config import MAX_BATCH_SIZE, BATCHING_ENABLED, STREAM_CHUNK_SIZE, STREAM_MAX_LINE_BYTES
+from app.config import ADMIN_TOKEN, ADMIN_OPEN
+from app.schemas import (
+    GradeInput,
+    GradePrediction,
+    BatchGradeInput,
+    BatchGradePrediction,
+    GradeVectorInput,
+    GradeVectorPrediction,
+    SweepInput,
+    SweepPrediction,
+    ExplainInput,
+    ExplainResponse,
+    StudentPrediction,
+    CohortSummary,
+    HealthResponse,
+    ModelInfo
+)
+from app.metrics import REGISTRY, MetricsMiddleware, mark_admitted, mark_handler_start, mark_handler_end
 from app.predictor import predictor
+from app.executor import executor
+from app.batcher import batcher
+from app.reloader import reloader
+from app.feature_store import feature_store
+from app.model_pool import PRIMARY_VERSION, model_pool
+from app.admission import AdmissionRejected, admission
+from app.streaming import STREAM_FORMATS, RequestStreamingResponse, score_stream
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    predictor.load_model()
+    # Pre-forked workers (app/serve.py) inherit the model from the parent
+    if not predictor.is_loaded:
+        predictor.load_model()
+    if not feature_store.is_loaded and feature_store.load() and predictor.is_loaded:
+        await asyncio.to_thread(feature_store.predictions, predictor)
+    executor.start()
+    if BATCHING_ENABLED:
+        await batcher.start()
+    # A model served from the registry cache may be stale: check for a newer one right away
+    await reloader.start(check_now=predictor.from_cache)
     yield
+    await reloader.stop()
+    await batcher.stop()
+    executor.shutdown()
 
 
 app = FastAPI(
@@ -26,6 +79,36 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected(request: Request, exc: AdmissionRejected):
+    detail = "Too many inference requests queued" if exc.reason == "queue_full" \
+        else "No inference slot free within the request deadline"
+    return FastJSONResponse(
+        {"detail": detail},
+        status_code=exc.status_code,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+def _deadline_ms(request: Request) -> Optional[float]:
+    """Queueing deadline a client asked for with X-Request-Deadline-Ms, if any."""
+    try:
+        return float(request.headers["x-request-deadline-ms"])
+    except (KeyError, ValueError):
+        return None
+
+
+async def admit(request: Request):
+    """
+    Hold an admission slot for the duration of an inference request. Time spent
+    queued is recorded as the "admission" stage rather than as validation.
+    """
+    async with admission.slot(_deadline_ms(request)) as waited:
+        mark_admitted(request, waited)
+        yield
 
 
 @app.get("/", response_model=HealthResponse)
@@ -55,18 +138,330 @@ async def get_model_info():
     return ModelInfo(**info)
 
 
-@app.post("/predict", response_model=GradePrediction)
-async def predict_grades(input_data: GradeInput):
+def _route(request: Request):
+    """
+    Model version for a request: pinned with the X-Model-Version header or the
+    model_version query parameter, else chosen by the pool's canary weights.
+    """
+    pinned = request.headers.get("x-model-version") or request.query_params.get("model_version")
+    try:
+        return model_pool.route(pinned)
+    except KeyError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Unknown model version {pinned}; available: {', '.join(model_pool.versions)}"
+        )
+
+
+async def _routed_call(version: str, shadow: Optional[str], method: str, *args):
+    result = await model_pool.call(version, method, *args)
+    if shadow is not None:
+        model_pool.shadow(shadow, method, args, result)
+    return result
+
+
+async def _routed_predictor(version: str):
+    """Predictor of the routed version, for the checks a route makes before calling it."""
+    if version == PRIMARY_VERSION:
+        return predictor
+    try:
+        return await asyncio.to_thread(model_pool.get, version)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@app.post("/predict", response_model=GradePrediction, dependencies=[Depends(admit)])
+async def predict_grades(input_data: GradeInput, request: Request, response: Response):
+    mark_handler_start(request)
     if not predictor.is_loaded:
         raise HTTPException(status_code=503, detail="Model not loaded")
 
+    version, shadow = _route(request)
     try:
-        predictions, model_name = predictor.predict(input_data.grades)
+        if version == PRIMARY_VERSION and batcher.is_running:
+            with model_pool.track(version):
+                predictions, model_name = await batcher.predict(input_data.grades)
+            if shadow is not None:
+                model_pool.shadow(shadow, "predict_batch", ([input_data.grades],), ([predictions], model_name))
+        else:
+            results, model_name = await _routed_call(version, shadow, "predict_batch", [input_data.grades])
+            predictions = results[0]
+        mark_handler_end(request)
+        response.headers["X-Model-Version"] = version
         return GradePrediction(predictions=predictions, model_used=model_name)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/predict/vector", response_model=GradeVectorPrediction, dependencies=[Depends(admit)])
+async def predict_grades_vector(input_data: GradeVectorInput, request: Request):
+    mark_handler_start(request)
+    if not predictor.is_loaded:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    version, shadow = _route(request)
+    if version == PRIMARY_VERSION and len(input_data.grades) != len(predictor.feature_columns):
+        raise HTTPException(
+            status_code=422,
+            detail=f"Expected {len(predictor.feature_columns)} grades ordered like /courses/input"
+        )
+
+    try:
+        predictions, model_name = await _routed_call(version, shadow, "predict_vectors", [input_data.grades])
+        mark_handler_end(request)
+        return FastJSONResponse(
+            {"predictions": predictions[0], "model_used": model_name},
+            headers={"X-Model-Version": version}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/predict/batch", response_model=BatchGradePrediction, dependencies=[Depends(admit)])
+async def predict_grades_batch(input_data: BatchGradeInput, request: Request):
+    mark_handler_start(request)
+    if not predictor.is_loaded:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    if len(input_data.students) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(input_data.students)} students (max {MAX_BATCH_SIZE})"
+        )
+
+    version, shadow = _route(request)
+    try:
+        predictions, model_name = await _routed_call(version, shadow, "predict_batch", input_data.students, False)
+        mark_handler_end(request)
+        return FastJSONResponse(
+            {"predictions": predictions, "model_used": model_name},
+            headers={"X-Model-Version": version}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/predict/sweep", response_model=SweepPrediction, dependencies=[Depends(admit)])
+async def predict_grades_sweep(input_data: SweepInput, request: Request):
+    """
+    What-if sensitivity sweep: predicted S5-S6 curves as one or more S1-S4
+    grades vary around a base grade vector, evaluated in a single model call.
+    """
+    mark_handler_start(request)
+    if not predictor.is_loaded:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    axes = [(axis.course, axis.grid_values()) for axis in input_data.sweep]
+    sizes = [len(values) for _, values in axes]
+    # Python ints: numpy's int64 product wraps around for large grids
+    points = math.prod(sizes) if input_data.grid else sum(sizes)
+    if points > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Sweep too large: {points} points (max {MAX_BATCH_SIZE})"
+        )
+    # Sweeps and explanations are not shadowed: their results are not per-student predictions
+    version, _ = _route(request)
+    routed = await _routed_predictor(version)
+    unknown = [course for course, _ in axes if course not in routed.feature_index]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown input courses: {', '.join(unknown)}")
+    courses = [course for course, _ in axes]
+    duplicates = sorted({course for course in courses if courses.count(course) > 1})
+    if duplicates:
+        raise HTTPException(status_code=422, detail=f"Courses swept more than once: {', '.join(duplicates)}")
+
+    try:
+        result = await model_pool.call(version, "predict_sweep", input_data.grades, axes, input_data.grid)
+        mark_handler_end(request)
+        return FastJSONResponse(result, headers={"X-Model-Version": version})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/explain", response_model=ExplainResponse, dependencies=[Depends(admit)])
+async def explain_grades(input_data: ExplainInput, request: Request):
+    """Which S1-S4 courses drive each predicted S5-S6 grade, for one or more students."""
+    mark_handler_start(request)
+    if not predictor.is_loaded:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    if len(input_data.students) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(input_data.students)} students (max {MAX_BATCH_SIZE})"
+        )
+
+    version, _ = _route(request)
+    if not (await _routed_predictor(version)).can_explain:
+        raise HTTPException(status_code=501, detail="Explanations are only available for tree ensemble models")
+
+    try:
+        result = await model_pool.call(version, "explain", input_data.students, input_data.top)
+        mark_handler_end(request)
+        return FastJSONResponse(result, headers={"X-Model-Version": version})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/predict/stream")
+async def predict_grades_stream(request: Request, output: Optional[str] = None):
+    """
+    Score an NDJSON (application/x-ndjson) or CSV (text/csv) upload of student
+    grade rows. Results are streamed back in chunks while the upload is read.
+    """
+    if not predictor.is_loaded:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+
+    input_format = "csv" if "csv" in request.headers.get("content-type", "") else "ndjson"
+    output_format = output or input_format
+    if output_format not in STREAM_FORMATS:
+        raise HTTPException(status_code=422, detail=f"output must be one of {STREAM_FORMATS}")
+
+    # Whole uploads are routed like single requests but not shadowed
+    version, _ = _route(request)
+    routed = await _routed_predictor(version)
+
+    # A stream holds one slot until its last chunk is written, so the slot is
+    # released by the response itself rather than by a dependency
+    release = None
+    if admission.enabled:
+        await admission.acquire(_deadline_ms(request))
+        release = BackgroundTask(admission.release)
+
+    return RequestStreamingResponse(
+        score_stream(
+            request.stream(),
+            input_format,
+            output_format,
+            functools.partial(model_pool.call, version),
+            routed.target_columns,
+            STREAM_CHUNK_SIZE,
+            STREAM_MAX_LINE_BYTES
+        ),
+        media_type="text/csv" if output_format == "csv" else "application/x-ndjson",
+        headers={"X-Model-Version": version},
+        background=release
+    )
+
+
+# The student and cohort endpoints are not admission-controlled: they slice
+# predictions computed once per model generation (under a lock) and run no
+# per-request inference
+
+def _require_feature_store():
+    if not predictor.is_loaded:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    if not feature_store.is_loaded:
+        raise HTTPException(status_code=503, detail="Feature store not loaded")
+
+
+@app.get("/students/{admi}/predict", response_model=StudentPrediction)
+async def predict_student(admi: str):
+    _require_feature_store()
+    row = feature_store.row(admi)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Student {admi} not found")
+
+    predictions, targets = await asyncio.to_thread(feature_store.predictions, predictor)
+    return FastJSONResponse({
+        "admi": admi,
+        "cohort": feature_store.cohort_of(row),
+        "predictions": dict(zip(targets, predictions[row].tolist())),
+        "model_used": predictor.model_name
+    })
+
+
+@app.get("/cohorts")
+async def list_cohorts():
+    _require_feature_store()
+    counts = np.bincount(feature_store.cohort, minlength=len(feature_store.cohorts))
+    return {"cohorts": [{"name": name, "students": int(n)} for name, n in zip(feature_store.cohorts, counts)]}
+
+
+@app.get("/cohorts/{cohort}/predictions")
+async def predict_cohort(cohort: str):
+    """Precomputed predictions for every student of a cohort ("all" for everyone), ordered like /courses/output."""
+    _require_feature_store()
+    rows = feature_store.cohort_rows(cohort)
+    if rows is None:
+        raise HTTPException(status_code=404, detail=f"Cohort {cohort} not found")
+
+    predictions, targets = await asyncio.to_thread(feature_store.predictions, predictor)
+    return FastJSONResponse({
+        "cohort": cohort,
+        "output_courses": targets,
+        "admi": feature_store.admi[rows].tolist(),
+        "predictions": predictions[rows].tolist(),
+        "model_used": predictor.model_name
+    })
+
+
+@app.get("/cohorts/{cohort}/summary", response_model=CohortSummary)
+async def cohort_summary(cohort: str):
+    _require_feature_store()
+    summary = await asyncio.to_thread(feature_store.summary, predictor, cohort)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"Cohort {cohort} not found")
+    return FastJSONResponse(summary)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Metrics of this process only; under app.serve every worker has its own registry."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/stats")
+async def get_stats():
+    return {
+        "executor": executor.get_stats(),
+        "batching": batcher.get_stats(),
+        "cache": predictor.get_cache_stats(),
+        "model_cache": predictor.get_artifact_cache_stats(),
+        "feature_store": feature_store.get_stats(),
+        "model_pool": model_pool.get_stats(),
+        "admission": admission.get_stats()
+    }
+
+
+def _check_admin_token(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        # Fail closed: no token configured means no admin API, unless explicitly opened
+        if not ADMIN_OPEN:
+            raise HTTPException(status_code=404, detail="Not Found")
+        return
+    if token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@app.get("/admin/model")
+async def get_active_model(x_admin_token: Optional[str] = Header(None)):
+    _check_admin_token(x_admin_token)
+    return reloader.get_status()
+
+
+@app.get("/admin/models")
+async def get_model_pool(x_admin_token: Optional[str] = Header(None)):
+    """Model versions in the pool with their routing, memory and latency."""
+    _check_admin_token(x_admin_token)
+    return model_pool.get_stats()
+
+
+@app.post("/admin/reload")
+async def reload_model(x_admin_token: Optional[str] = Header(None)):
+    _check_admin_token(x_admin_token)
+    if reloader.supervisor_pid is not None:
+        # Pre-forked worker: the parent reloads once and replaces all workers, keeping them in step
+        reloader.request_supervisor_reload()
+        return FastJSONResponse({**reloader.get_status(), "reload": "requested"}, status_code=202)
+    if not await reloader.reload():
+        raise HTTPException(status_code=500, detail="Model reload failed; previous model still active")
+    return reloader.get_status()
+
+
 @app.get("/courses/input")
 async def get_input_courses():
     if not predictor.is_loaded:
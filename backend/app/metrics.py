@@ -0,0 +1,265 @@
+"""
+Minimal Prometheus instrumentation: counters, gauges and histograms rendered
+in the text exposition format on /metrics, plus an ASGI middleware that
+tracks request counts, in-flight requests and latency.
+"""
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = []
+    for name, value in zip(labelnames, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+
+    def register(self, metric: "_Metric"):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def set_function(self, function: Callable[[], Dict[Tuple[str, ...], float]]):
+        """Compute the samples at scrape time; function returns {label values tuple: value}."""
+        self._function = function
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            try:
+                items = list(self._function().items())
+            except Exception:
+                items = []
+        else:
+            with self._lock:
+                items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> [per-bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+                    break
+            data[-2] += value
+            data[-1] += 1
+
+    def time(self, **labels) -> "_Timer":
+        return _Timer(self, labels)
+
+    def get_count(self, **labels) -> float:
+        data = self._values.get(self._key(labels))
+        return data[-1] if data else 0.0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(data)) for key, data in self._values.items()]
+        lines = []
+        for key, data in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(data[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(data[-1])}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+REQUESTS = Counter("http_requests_total", "HTTP requests handled", ["method", "path", "status"])
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being handled")
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "End-to-end HTTP request latency", ["method", "path"])
+STAGE_LATENCY = Histogram(
+    "prediction_stage_duration_seconds",
+    "Time spent per prediction stage: admission, validation, assembly, predict, explain, postprocess, "
+    "output, serialization",
+    ["stage"]
+)
+PREDICTION_ROWS = Counter("prediction_rows_total", "Student rows sent through the predictor")
+MODEL_LOAD_SECONDS = Gauge("model_load_duration_seconds", "Duration of the last successful model load", ["phase"])
+MODEL_INFO = Gauge("model_info", "Active model (value is always 1)", ["model_name", "model_version"])
+VERSION_LATENCY = Histogram(
+    "model_version_request_duration_seconds",
+    "Inference time per pooled model version; role is served or shadow",
+    ["version", "role"]
+)
+VERSION_MEMORY = Gauge("model_version_memory_bytes", "Estimated memory of each loaded model version", ["version"])
+MODEL_CACHE_LOOKUPS = Counter("model_cache_lookups_total", "Registry model artifact cache lookups", ["result"])
+ADMISSION_IN_FLIGHT = Gauge("admission_in_flight", "Inference requests holding an admission slot")
+ADMISSION_QUEUE_DEPTH = Gauge("admission_queue_depth", "Inference requests waiting for an admission slot")
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Inference requests turned away; reason is queue_full (429) or deadline (503)",
+    ["reason"]
+)
+
+
+def mark_handler_start(request):
+    """Record request parsing/validation time; call first thing in an instrumented route."""
+    started = getattr(request.state, "metrics_start", None)
+    if started is not None:
+        STAGE_LATENCY.observe(time.perf_counter() - started, stage="validation")
+
+
+def mark_admitted(request, waited: float):
+    """Leave time queued for an admission slot (its own stage) out of the validation stage."""
+    started = getattr(request.state, "metrics_start", None)
+    if started is not None:
+        request.state.metrics_start = started + waited
+
+
+def mark_handler_end(request):
+    """Mark the end of route logic; the middleware attributes the rest to serialization."""
+    request.state.metrics_handler_end = time.perf_counter()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (does not buffer streaming bodies) recording request metrics."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        state = scope.setdefault("state", {})
+        state["metrics_start"] = start
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                handler_end = state.get("metrics_handler_end")
+                if handler_end is not None:
+                    STAGE_LATENCY.observe(time.perf_counter() - handler_end, stage="serialization")
+            await send(message)
+
+        IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            IN_FLIGHT.dec()
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            REQUESTS.inc(method=scope["method"], path=path, status=status["code"])
+            REQUEST_LATENCY.observe(time.perf_counter() - start, method=scope["method"], path=path)
@@ -0,0 +1,264 @@
+"""
+In-process pool of model versions served side by side.
+
+The primary model (app.predictor.predictor, loaded and hot-reloaded as before)
+is always present as "primary". Further versions are configured with
+MODEL_POOL_VERSIONS and loaded on first use into their own GradePredictor, so
+each keeps its own feature and target columns, metadata and prediction cache.
+When the estimated memory of the loaded versions exceeds the cap, the least
+recently used ones are unloaded until it fits; they load again when next asked for.
+
+Routing: a request pins a version with the X-Model-Version header or the
+model_version query parameter. Unpinned requests go to the primary model or,
+with the MODEL_CANARY_WEIGHTS probabilities, to a canary version. The
+MODEL_SHADOW_VERSION additionally scores every unpinned request in the
+background; only its latency and its difference from the served predictions
+are recorded.
+
+The primary model runs through the inference executor (and the micro-batcher);
+other versions run in threads of this process.
+"""
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app.config import MODEL_CANARY_WEIGHTS, MODEL_POOL_MEMORY_MB, MODEL_POOL_VERSIONS, MODEL_SHADOW_VERSION
+from app.executor import InferenceExecutor, executor
+from app.metrics import VERSION_LATENCY, VERSION_MEMORY
+from app.predictor import GradePredictor, predictor
+
+PRIMARY_VERSION = "primary"
+# Recent latencies kept per version for the percentiles in get_stats()
+LATENCY_WINDOW = 1000
+
+
+def parse_pairs(spec: str, separator: str) -> Dict[str, str]:
+    """Parse "a=x,b=y" style settings."""
+    pairs = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition(separator)
+        if not value:
+            raise ValueError(f"Expected name{separator}value, got {item!r}")
+        pairs[name.strip()] = value.strip()
+    return pairs
+
+
+def _prediction_diff(served, shadow) -> Tuple[float, int]:
+    """Sum of absolute differences over the predicted grades both results share, and their count."""
+    total, count = 0.0, 0
+    for a, b in zip(served, shadow):
+        if isinstance(a, dict):
+            pairs = [(a[k], b[k]) for k in a.keys() & b.keys()]
+        else:
+            pairs = list(zip(a, b))
+        for x, y in pairs:
+            total += abs(x - y)
+            count += 1
+    return total, count
+
+
+class PoolEntry:
+    def __init__(self, name: str, source: str, predictor: Optional[GradePredictor] = None):
+        self.name = name
+        self.source = source
+        self.predictor = predictor
+        self.lock = threading.Lock()
+        self.last_used = 0.0
+        self.loads = 0
+        self.evictions = 0
+        self.requests = 0
+        self.errors = 0
+        self.shadow_requests = 0
+        self.shadow_errors = 0
+        self.shadow_abs_diff = 0.0
+        self.shadow_values = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+
+class ModelPool:
+    def __init__(self, primary: GradePredictor, executor: InferenceExecutor, sources: Dict[str, str],
+                 memory_cap_mb: float = 1024, canary: Optional[Dict[str, float]] = None,
+                 shadow: Optional[str] = None):
+        self.primary = primary
+        self.executor = executor
+        self.memory_cap_bytes = memory_cap_mb * 1e6
+        self.canary = canary or {}
+        self.shadow_version = shadow or None
+
+        self._entries: Dict[str, PoolEntry] = {PRIMARY_VERSION: PoolEntry(PRIMARY_VERSION, "primary", primary)}
+        for name, source in sources.items():
+            self.register(name, source)
+        for name in [*self.canary, self.shadow_version]:
+            if name is not None and name not in self._entries:
+                raise ValueError(f"Unknown pool version in routing settings: {name}")
+        if sum(self.canary.values()) > 1:
+            raise ValueError("Canary weights add up to more than 1")
+
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        self._shadow_tasks = set()
+
+    @property
+    def versions(self):
+        return list(self._entries)
+
+    def register(self, name: str, source: str):
+        """Add a version to the pool; it is loaded on its first request."""
+        if name in self._entries:
+            raise ValueError(f"Model version {name} is already in the pool")
+        self._entries[name] = PoolEntry(name, source)
+
+    def route(self, pinned: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """Version to serve a request with, and the shadow version to copy it to (if any)."""
+        if pinned:
+            if pinned not in self._entries:
+                raise KeyError(pinned)
+            return pinned, None
+
+        name = PRIMARY_VERSION
+        draw, cumulative = self._random.random(), 0.0
+        for version, weight in self.canary.items():
+            cumulative += weight
+            if draw < cumulative:
+                name = version
+                break
+        shadow = self.shadow_version if self.shadow_version != name else None
+        return name, shadow
+
+    def get(self, name: str) -> GradePredictor:
+        """The loaded predictor of a version, loading it (and evicting others) if needed. Blocking."""
+        entry = self._entries[name]
+        entry.last_used = time.monotonic()
+        loaded = entry.predictor
+        if loaded is not None:
+            return loaded
+
+        with entry.lock:
+            loaded = entry.predictor
+            if loaded is None:
+                loaded = GradePredictor(primary=False)
+                if not loaded.load_from(entry.source):
+                    raise RuntimeError(f"Model version {name} could not be loaded from {entry.source}")
+                entry.predictor = loaded
+                entry.loads += 1
+                print(f"✓ Pool version {name} loaded ({loaded.memory_bytes() / 1e6:.1f} MB)")
+        self._evict(keep=name)
+        return loaded
+
+    def _evict(self, keep: str):
+        with self._lock:
+            while self.memory_bytes() > self.memory_cap_bytes:
+                candidates = [
+                    entry for entry in self._entries.values()
+                    if entry.predictor is not None and entry.name not in (PRIMARY_VERSION, keep)
+                ]
+                if not candidates:
+                    return
+                victim = min(candidates, key=lambda entry: entry.last_used)
+                # Requests already running keep their reference until they finish
+                victim.predictor = None
+                victim.evictions += 1
+                print(f"Pool version {victim.name} unloaded (least recently used, pool over memory cap)")
+
+    def memory_by_version(self) -> Dict[Tuple[str], float]:
+        return {
+            (entry.name,): float(entry.predictor.memory_bytes())
+            for entry in self._entries.values() if entry.predictor is not None and entry.predictor.is_loaded
+        }
+
+    def memory_bytes(self) -> float:
+        return sum(self.memory_by_version().values())
+
+    @contextmanager
+    def track(self, name: str, role: str = "served"):
+        """Record one request's latency and outcome against a version."""
+        entry = self._entries[name]
+        entry.last_used = time.monotonic()
+        start = time.perf_counter()
+        try:
+            yield entry
+        except Exception:
+            if role == "served":
+                entry.errors += 1
+            else:
+                entry.shadow_errors += 1
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            if role == "served":
+                entry.requests += 1
+                entry.latencies.append(seconds)
+            else:
+                entry.shadow_requests += 1
+            VERSION_LATENCY.observe(seconds, version=name, role=role)
+
+    async def call(self, name: str, method: str, *args, role: str = "served"):
+        """Run a GradePredictor method on the given version."""
+        with self.track(name, role):
+            if name == PRIMARY_VERSION:
+                return await self.executor.call(method, *args)
+            version_predictor = await asyncio.to_thread(self.get, name)
+            return await asyncio.to_thread(getattr(version_predictor, method), *args)
+
+    def shadow(self, name: str, method: str, args: tuple, served_result):
+        """Score the same input on the shadow version in the background and record the difference."""
+        task = asyncio.get_running_loop().create_task(self._shadow(name, method, args, served_result))
+        self._shadow_tasks.add(task)
+        task.add_done_callback(self._shadow_tasks.discard)
+
+    async def _shadow(self, name: str, method: str, args: tuple, served_result):
+        try:
+            result = await self.call(name, method, *args, role="shadow")
+        except Exception as e:
+            print(f"Shadow request to {name} failed: {e}")
+            return
+        total, count = _prediction_diff(served_result[0], result[0])
+        entry = self._entries[name]
+        entry.shadow_abs_diff += total
+        entry.shadow_values += count
+
+    def get_stats(self) -> Dict:
+        versions = {}
+        for entry in self._entries.values():
+            loaded = entry.predictor is not None and entry.predictor.is_loaded
+            latencies = np.array(entry.latencies) * 1000
+            versions[entry.name] = {
+                "source": entry.source,
+                "loaded": loaded,
+                "model_version": entry.predictor.model_version if loaded else None,
+                "model_name": entry.predictor.model_name if loaded else None,
+                "memory_mb": entry.predictor.memory_bytes() / 1e6 if loaded else 0.0,
+                "loads": entry.loads,
+                "evictions": entry.evictions,
+                "requests": entry.requests,
+                "errors": entry.errors,
+                "latency_p50_ms": float(np.percentile(latencies, 50)) if len(latencies) else None,
+                "latency_p95_ms": float(np.percentile(latencies, 95)) if len(latencies) else None,
+                "canary_weight": self.canary.get(entry.name, 0.0),
+                "shadow": entry.name == self.shadow_version,
+                "shadow_requests": entry.shadow_requests,
+                "shadow_errors": entry.shadow_errors,
+                "shadow_mean_abs_diff": entry.shadow_abs_diff / entry.shadow_values if entry.shadow_values else None,
+            }
+        return {
+            "memory_mb": self.memory_bytes() / 1e6,
+            "memory_cap_mb": self.memory_cap_bytes / 1e6,
+            "versions": versions,
+        }
+
+
+model_pool = ModelPool(
+    predictor,
+    executor,
+    parse_pairs(MODEL_POOL_VERSIONS, "="),
+    memory_cap_mb=MODEL_POOL_MEMORY_MB,
+    canary={name: float(weight) for name, weight in parse_pairs(MODEL_CANARY_WEIGHTS, ":").items()},
+    shadow=MODEL_SHADOW_VERSION,
+)
+VERSION_MEMORY.set_function(model_pool.memory_by_version)
@@ -1,70 +1,211 @@
+import importlib.util
 import joblib
 import json
 import numpy as np
 import os
+import threading
+import time
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 from app.config import (
     MODEL_PATH,
+    MODEL_FORMAT,
+    MODEL_ARRAYS_PATH,
     FEATURE_COLUMNS_PATH,
     TARGET_COLUMNS_PATH,
     METADATA_PATH,
     MLFLOW_TRACKING_URI,
-    MLFLOW_MODEL_NAME
+    MLFLOW_MODEL_NAME,
+    MODEL_CACHE_DIR,
+    MODEL_CACHE_KEEP,
+    COMPILED_INFERENCE,
+    COMPILED_INFERENCE_MAX_ROWS,
+    PREDICTION_CACHE_SIZE,
+    PREDICTION_CACHE_TTL,
+    PREDICTION_CACHE_QUANTIZE
 )
+from app.artifact_cache import ModelArtifactCache, is_writable
+from app.cache import PredictionCache
+from app.metrics import MODEL_INFO, MODEL_LOAD_SECONDS, PREDICTION_ROWS, STAGE_LATENCY
+from app.tree_engine import ARRAYS_META_FILE, CompiledEnsemble, PathExplainer, compile_model
 
-# Lazy import MLflow only if needed
-try:
-    import mlflow
-    import mlflow.pyfunc
-    MLFLOW_AVAILABLE = True
-except ImportError:
-    MLFLOW_AVAILABLE = False
+# Lazy import MLflow only if needed: importing it takes seconds, which
+# dominates cold starts when the registry is not configured
+MLFLOW_AVAILABLE = importlib.util.find_spec("mlflow") is not None
+mlflow = None
+
+
+def _import_mlflow():
+    global mlflow
+    if mlflow is None:
+        import mlflow as _mlflow
+        import mlflow.pyfunc
+        mlflow = _mlflow
+    return mlflow
+
+
+class ModelState:
+    """
+    A loaded model together with everything derived from it. Reloading builds
+    a complete new state off the request path and swaps it in with a single
+    assignment, so in-flight predictions keep using the state they started with.
+    """
+
+    def __init__(self, model=None, feature_columns: Optional[List[str]] = None,
+                 target_columns: Optional[List[str]] = None, metadata: Optional[Dict] = None,
+                 version: Optional[str] = None, source: Optional[str] = None):
+        self.model = model
+        self.feature_columns: List[str] = feature_columns or []
+        self.target_columns: List[str] = target_columns or []
+        self.metadata: Dict = metadata or {}
+        self.version = version
+        self.source = source
+        self.feature_index: Dict[str, int] = {course: i for i, course in enumerate(self.feature_columns)}
+        self.compiled: Optional[CompiledEnsemble] = None
+        self.explainer: Optional[PathExplainer] = None
+        # Loaded from the registry artifact cache without asking the registry
+        self.from_cache = False
+        # Size of the model artifact as loaded, for memory accounting of pickled models
+        self.artifact_bytes = 0
+        # Bumped on activation; part of the prediction cache key
+        self.generation = 0
+        self.loaded_at: Optional[float] = None
+        self.timings: Dict[str, float] = {}
 
 
 class GradePredictor:
-    def __init__(self):
-        self.model = None
-        self.feature_columns: List[str] = []
-        self.target_columns: List[str] = []
-        self.metadata: Dict = {}
-        self._loaded = False
+    def __init__(self, primary: bool = True):
+        # Only the primary model publishes model_info / load-time metrics;
+        # other versions are held by app.model_pool
+        self.primary = primary
+        self._state = ModelState()
+        self._load_lock = threading.Lock()
+        self.cache: Optional[PredictionCache] = None
+        if PREDICTION_CACHE_SIZE > 0:
+            self.cache = PredictionCache(
+                maxsize=PREDICTION_CACHE_SIZE,
+                ttl=PREDICTION_CACHE_TTL,
+                decimals=2 if PREDICTION_CACHE_QUANTIZE else None
+            )
+        self.artifact_cache: Optional[ModelArtifactCache] = None
+        if MODEL_CACHE_DIR and is_writable(MODEL_CACHE_DIR):
+            self.artifact_cache = ModelArtifactCache(MODEL_CACHE_DIR, keep=MODEL_CACHE_KEEP)
+        elif MODEL_CACHE_DIR:
+            # Registry loads still work, they just download on every start
+            print(f"⚠ Model cache directory {MODEL_CACHE_DIR} is not writable; registry artifact cache disabled")
 
     def load_model(self) -> bool:
         """
         Load model from MLflow Model Registry (if configured) or from local files.
         Priority: MLflow Registry > Local Files
+
+        On failure the previously active model, if any, stays in service.
         """
-        try:
-            # Try loading from MLflow Model Registry first
-            if MLFLOW_AVAILABLE and MLFLOW_TRACKING_URI and MLFLOW_MODEL_NAME:
-                try:
-                    print(f"Attempting to load model from MLflow Registry: {MLFLOW_MODEL_NAME}")
-                    return self._load_from_mlflow()
-                except Exception as mlflow_error:
-                    print(f"MLflow loading failed: {mlflow_error}")
-                    print("Falling back to local model files...")
-
-            # Fallback to local files
-            print(f"Loading model from local files: {MODEL_PATH}")
-            self.model = joblib.load(MODEL_PATH)
-            self.feature_columns = joblib.load(FEATURE_COLUMNS_PATH)
-            self.target_columns = joblib.load(TARGET_COLUMNS_PATH)
-
-            with open(METADATA_PATH, 'r') as f:
-                self.metadata = json.load(f)
-
-            self._loaded = True
-            print(f"✓ Model loaded successfully from local files")
-            return True
-        except Exception as e:
-            print(f"✗ Error loading model: {e}")
-            self._loaded = False
-            return False
-
-    def _load_from_mlflow(self) -> bool:
-        """Load model from MLflow Model Registry"""
+        with self._load_lock:
+            try:
+                state = None
+                # Try loading from MLflow Model Registry first
+                if self._mlflow_enabled():
+                    try:
+                        print(f"Attempting to load model from MLflow Registry: {MLFLOW_MODEL_NAME}")
+                        state = self._load_from_mlflow()
+                    except Exception as mlflow_error:
+                        print(f"MLflow loading failed: {mlflow_error}")
+                        print("Falling back to local model files...")
+
+                # Fallback to local files
+                if state is None:
+                    print(f"Loading model from local files: {self._local_artifact_path()}")
+                    state = self._load_from_files()
+                    print(f"✓ Model loaded successfully from local files")
+
+                self._activate(state)
+                return True
+            except Exception as e:
+                print(f"✗ Error loading model: {e}")
+                return False
+
+    def load_from(self, source: str) -> bool:
+        """
+        Load one specific model version instead of the configured source:
+        "mlflow:<version>" from the registry, or a directory laid out like
+        backend/models (best_model.pkl or best_model_arrays/, feature_columns.pkl,
+        target_columns.pkl, model_metadata.json).
+        """
+        with self._load_lock:
+            try:
+                if source.startswith("mlflow:"):
+                    state = self._load_from_mlflow(version=source.split(":", 1)[1])
+                else:
+                    state = self._load_from_directory(source)
+                self._activate(state)
+                return True
+            except Exception as e:
+                print(f"✗ Error loading model from {source}: {e}")
+                return False
+
+    def _mlflow_enabled(self) -> bool:
+        return bool(MLFLOW_AVAILABLE and MLFLOW_TRACKING_URI and MLFLOW_MODEL_NAME)
+
+    def _load_from_files(self) -> ModelState:
+        version = self._local_version()
+        start = time.perf_counter()
+        if MODEL_FORMAT == "arrays":
+            model = CompiledEnsemble.load(MODEL_ARRAYS_PATH, mmap=True)
+        else:
+            model = joblib.load(MODEL_PATH)
+        load_seconds = time.perf_counter() - start
+
+        state = ModelState(
+            model=model,
+            feature_columns=joblib.load(FEATURE_COLUMNS_PATH),
+            target_columns=joblib.load(TARGET_COLUMNS_PATH),
+            metadata=self._read_metadata(),
+            version=version,
+            source=f"local:{MODEL_FORMAT}"
+        )
+        state.timings["load_seconds"] = load_seconds
+        state.artifact_bytes = os.path.getsize(MODEL_PATH) if MODEL_FORMAT != "arrays" else 0
+        return state
+
+    def _load_from_directory(self, path: str) -> ModelState:
+        arrays_path = os.path.join(path, "best_model_arrays")
+        start = time.perf_counter()
+        if os.path.exists(os.path.join(arrays_path, ARRAYS_META_FILE)):
+            model, artifact = CompiledEnsemble.load(arrays_path, mmap=True), os.path.join(arrays_path, ARRAYS_META_FILE)
+        else:
+            artifact = os.path.join(path, "best_model.pkl")
+            model = joblib.load(artifact)
+        load_seconds = time.perf_counter() - start
+
+        with open(os.path.join(path, "model_metadata.json"), "r") as f:
+            metadata = json.load(f)
+        stat = os.stat(artifact)
+        state = ModelState(
+            model=model,
+            feature_columns=joblib.load(os.path.join(path, "feature_columns.pkl")),
+            target_columns=joblib.load(os.path.join(path, "target_columns.pkl")),
+            metadata=metadata,
+            version=f"dir-{os.path.basename(os.path.normpath(path))}-{stat.st_mtime_ns}",
+            source=path
+        )
+        state.timings["load_seconds"] = load_seconds
+        state.artifact_bytes = 0 if isinstance(model, CompiledEnsemble) else stat.st_size
+        return state
+
+    def _local_artifact_path(self) -> str:
+        if MODEL_FORMAT == "arrays":
+            return os.path.join(MODEL_ARRAYS_PATH, ARRAYS_META_FILE)
+        return MODEL_PATH
+
+    def _read_metadata(self) -> Dict:
+        with open(METADATA_PATH, 'r') as f:
+            return json.load(f)
+
+    def _configure_mlflow(self):
+        _import_mlflow()
+
         # Set MLflow tracking URI
         mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
 
@@ -75,39 +216,186 @@ class GradePredictor:
             os.environ['MLFLOW_TRACKING_USERNAME'] = mlflow_user
             os.environ['MLFLOW_TRACKING_PASSWORD'] = mlflow_password
 
-        # Load the latest production model or latest version
-        try:
-            model_uri = f"models:/{MLFLOW_MODEL_NAME}/Production"
-            print(f"Trying to load Production version...")
-            self.model = mlflow.pyfunc.load_model(model_uri)
-        except Exception:
-            # Fallback to latest version if no production model
-            model_uri = f"models:/{MLFLOW_MODEL_NAME}/latest"
-            print(f"No Production model found. Loading latest version...")
-            self.model = mlflow.pyfunc.load_model(model_uri)
+    def _latest_registry_version(self) -> str:
+        """Registry version to serve: the Production version, else the newest registered one."""
+        self._configure_mlflow()
+        client = mlflow.tracking.MlflowClient()
+        production = client.get_latest_versions(MLFLOW_MODEL_NAME, stages=["Production"])
+        if production:
+            return str(production[0].version)
+
+        print(f"No Production model found. Using latest version...")
+        versions = client.search_model_versions(f"name='{MLFLOW_MODEL_NAME}'")
+        if not versions:
+            raise RuntimeError(f"No versions registered for {MLFLOW_MODEL_NAME}")
+        return str(max(int(v.version) for v in versions))
+
+    def _load_from_mlflow(self, version: Optional[str] = None) -> ModelState:
+        """
+        Load model from MLflow Model Registry, through the local artifact cache
+        when enabled. At startup the version served last time is loaded from the
+        cache without contacting the registry; the reloader then checks for a
+        newer version in the background. An explicit version is loaded as is.
+        """
+        self._configure_mlflow()
+        cache = self.artifact_cache
+        pinned, from_cache = version is not None, False
+        if cache is not None and not self.is_loaded and not pinned:
+            version = cache.current(MLFLOW_MODEL_NAME)
+            from_cache = version is not None
+        if version is None:
+            version = self._latest_registry_version()
+        model_uri = f"models:/{MLFLOW_MODEL_NAME}/{version}"
+
+        download_seconds = None
+        if cache is not None:
+            def download(dst: str) -> str:
+                return mlflow.artifacts.download_artifacts(artifact_uri=model_uri, dst_path=dst)
+
+            path, download_seconds = cache.fetch(MLFLOW_MODEL_NAME, version, download)
+            from_cache = from_cache and download_seconds is None
+        else:
+            path = model_uri
+
+        start = time.perf_counter()
+        model = mlflow.pyfunc.load_model(path)
+        load_seconds = time.perf_counter() - start
+        if cache is not None and not pinned:
+            cache.set_current(MLFLOW_MODEL_NAME, version)
+            cache.prune(MLFLOW_MODEL_NAME)
 
         # Load metadata from local files (features and targets)
         # Note: In a full MLflow setup, these could also be logged as artifacts
-        self.feature_columns = joblib.load(FEATURE_COLUMNS_PATH)
-        self.target_columns = joblib.load(TARGET_COLUMNS_PATH)
+        state = ModelState(
+            model=model,
+            feature_columns=joblib.load(FEATURE_COLUMNS_PATH),
+            target_columns=joblib.load(TARGET_COLUMNS_PATH),
+            metadata=self._read_metadata(),
+            version=f"mlflow-{version}",
+            source=model_uri
+        )
+        state.timings["load_seconds"] = load_seconds
+        if download_seconds is not None:
+            state.timings["download_seconds"] = download_seconds
+        state.from_cache = from_cache
+        if cache is not None:
+            state.artifact_bytes = sum(
+                os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files
+            )
+        print(f"✓ Model loaded successfully from MLflow Registry: {model_uri}"
+              f"{' (local cache, registry not contacted)' if from_cache else ''}")
+        return state
 
-        with open(METADATA_PATH, 'r') as f:
-            self.metadata = json.load(f)
+    def _local_version(self) -> str:
+        stat = os.stat(self._local_artifact_path())
+        return f"local-{stat.st_mtime_ns}-{stat.st_size}"
+
+    def get_available_version(self) -> Optional[str]:
+        """Version the configured source would load now, without loading it."""
+        if self._mlflow_enabled():
+            try:
+                return f"mlflow-{self._latest_registry_version()}"
+            except Exception as e:
+                # Unknown rather than the local version, so an unreachable
+                # registry does not trigger a reload on every poll
+                print(f"MLflow version check failed: {e}")
+                return None
+        try:
+            return self._local_version()
+        except OSError:
+            return None
 
-        self._loaded = True
-        print(f"✓ Model loaded successfully from MLflow Registry: {model_uri}")
-        return True
+    def _activate(self, state: ModelState):
+        """Finish preparing a freshly loaded state and make it the active one."""
+        start = time.perf_counter()
+        if isinstance(state.model, CompiledEnsemble):
+            state.compiled = state.model
+        elif COMPILED_INFERENCE:
+            state.compiled = compile_model(state.model)
+            if state.compiled is not None:
+                print(f"✓ Compiled {state.compiled.n_trees} trees for array inference")
+        state.timings["compile_seconds"] = time.perf_counter() - start
+
+        # Path structures for /explain, built here so requests only traverse
+        start = time.perf_counter()
+        explained = state.compiled if state.compiled is not None else compile_model(state.model)
+        if explained is not None:
+            state.explainer = PathExplainer(explained)
+        state.timings["explainer_seconds"] = time.perf_counter() - start
+        state.generation = self._state.generation + 1
+        state.loaded_at = time.time()
+
+        self._state = state
+        if self.cache is not None:
+            self.cache.clear()
+
+        if not self.primary:
+            return
+        for phase, seconds in state.timings.items():
+            MODEL_LOAD_SECONDS.set(seconds, phase=phase.replace("_seconds", ""))
+        MODEL_INFO.clear()
+        MODEL_INFO.set(1, model_name=state.metadata.get("best_model", "Unknown"), model_version=state.version or "")
 
     @property
     def is_loaded(self) -> bool:
-        return self._loaded
+        return self._state.model is not None
+
+    @property
+    def model(self):
+        return self._state.model
+
+    @property
+    def compiled(self) -> Optional[CompiledEnsemble]:
+        return self._state.compiled
+
+    @property
+    def feature_columns(self) -> List[str]:
+        return self._state.feature_columns
+
+    @property
+    def feature_index(self) -> Dict[str, int]:
+        return self._state.feature_index
+
+    @property
+    def target_columns(self) -> List[str]:
+        return self._state.target_columns
+
+    @property
+    def metadata(self) -> Dict:
+        return self._state.metadata
+
+    def memory_bytes(self) -> int:
+        """Estimated memory held by the active model: compiled arrays, explainer and the pickled artifact."""
+        state = self._state
+        total = state.artifact_bytes
+        if state.compiled is not None:
+            total += state.compiled.nbytes
+        if state.explainer is not None:
+            total += state.explainer.nbytes
+        return total
+
+    @property
+    def from_cache(self) -> bool:
+        return self._state.from_cache
+
+    @property
+    def can_explain(self) -> bool:
+        return self._state.explainer is not None
+
+    @property
+    def model_version(self) -> Optional[str]:
+        return self._state.version
+
+    @property
+    def generation(self) -> int:
+        return self._state.generation
 
     @property
     def model_name(self) -> str:
         return self.metadata.get("best_model", "Unknown")
 
     def get_model_info(self) -> Dict:
-        if not self._loaded:
+        if not self.is_loaded:
             return {}
 
         best_model_key = self.model_name.lower().replace(" ", "_")
@@ -124,18 +412,245 @@ class GradePredictor:
             }
         }
 
+    def get_version_info(self) -> Dict:
+        state = self._state
+        return {
+            "model_loaded": state.model is not None,
+            "model_name": state.metadata.get("best_model", "Unknown") if state.model is not None else None,
+            "model_version": state.version,
+            "source": state.source,
+            "from_cache": state.from_cache,
+            "loaded_at": state.loaded_at,
+            "generation": state.generation,
+            "timings": state.timings,
+        }
+
     def predict(self, grades: Dict[str, float]) -> Tuple[Dict[str, float], str]:
-        if not self._loaded:
+        if not self.is_loaded:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+
+        results, model_name = self.predict_batch([grades])
+        return results[0], model_name
+
+    def predict_batch(self, grades_list: List[Dict[str, float]],
+                      cached: bool = True) -> Tuple[List[Dict[str, float]], str]:
+        """
+        Predict grades for several students with a single model call.
+        Results are returned in the same order as the input rows. Bulk callers
+        (/predict/batch, streamed uploads) pass cached=False so their rows do not
+        evict the hot single-student entries from the prediction cache.
+        """
+        state = self._state
+        if state.model is None:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+
+        model_name = state.metadata.get("best_model", "Unknown")
+        if not grades_list:
+            return [], model_name
+
+        with STAGE_LATENCY.time(stage="assembly"):
+            input_array = self._assemble_matrix(state, grades_list)
+        predictions = self._predict_matrix(state, input_array, cached)
+        with STAGE_LATENCY.time(stage="output"):
+            results = [dict(zip(state.target_columns, row)) for row in predictions.tolist()]
+        return results, model_name
+
+    def predict_vectors(self, vectors: List[List[float]]) -> Tuple[List[List[float]], str]:
+        """
+        Predict from dense grade vectors ordered like feature_columns.
+        Each returned row is ordered like target_columns.
+        """
+        state = self._state
+        if state.model is None:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+
+        input_array = np.asarray(vectors, dtype=np.float64)
+        if input_array.ndim != 2 or input_array.shape[1] != len(state.feature_columns):
+            raise ValueError(f"Expected grade vectors of length {len(state.feature_columns)}")
+
+        predictions = self._predict_matrix(state, input_array)
+        with STAGE_LATENCY.time(stage="output"):
+            results = predictions.tolist()
+        return results, state.metadata.get("best_model", "Unknown")
+
+    def predict_matrix(self, input_array: np.ndarray) -> np.ndarray:
+        """Predict clipped, rounded grades for an (N, n_features) matrix, going through the cache."""
+        return self._predict_matrix(self._state, input_array)
+
+    def predict_bulk(self, columns: List[str], input_array: np.ndarray) -> Tuple[np.ndarray, List[str], int]:
+        """
+        Predict a large matrix whose columns are named by `columns`, bypassing the
+        prediction cache. Columns are mapped onto the model's feature order (missing
+        ones default to 50.0). Returns predictions, their target columns and the
+        model generation that produced them.
+        """
+        state = self._state
+        if state.model is None:
             raise RuntimeError("Model not loaded. Call load_model() first.")
 
-        input_array = np.array([[grades.get(c, 50.0) for c in self.feature_columns]])
-        predictions = self.model.predict(input_array)[0]
+        if list(columns) == state.feature_columns:
+            matrix = np.asarray(input_array, dtype=np.float64)
+        else:
+            matrix = np.full((len(input_array), len(state.feature_columns)), 50.0)
+            for j, course in enumerate(columns):
+                i = state.feature_index.get(course)
+                if i is not None:
+                    matrix[:, i] = input_array[:, j]
+
+        PREDICTION_ROWS.inc(len(matrix))
+        return self._predict_array(state, matrix), state.target_columns, state.generation
+
+    def predict_sweep(self, grades: Dict[str, float], axes: List[Tuple[str, List[float]]],
+                      grid: bool = False) -> Dict:
+        """
+        What-if sweep around one student's grades. `axes` lists (course, values)
+        pairs. Each course is varied on its own with the other grades held at
+        their base values, or, with `grid`, over the full cartesian product of
+        all axes. Every point plus the base row goes through one model call;
+        the cache is bypassed since sweep points are rarely asked for twice.
+        """
+        state = self._state
+        if state.model is None:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+
+        columns = []
+        for course, _ in axes:
+            if course not in state.feature_index:
+                raise ValueError(f"Unknown input course: {course}")
+            columns.append(state.feature_index[course])
+        values = [np.asarray(v, dtype=np.float64) for _, v in axes]
+
+        base = self._assemble_matrix(state, [grades])
+        if grid:
+            mesh = np.meshgrid(*values, indexing="ij")
+            points = np.repeat(base, mesh[0].size + 1, axis=0)
+            for column, axis_values in zip(columns, mesh):
+                points[:-1, column] = axis_values.ravel()
+        else:
+            sizes = [len(v) for v in values]
+            points = np.repeat(base, sum(sizes) + 1, axis=0)
+            offset = 0
+            for column, axis_values in zip(columns, values):
+                points[offset:offset + len(axis_values), column] = axis_values
+                offset += len(axis_values)
+
+        PREDICTION_ROWS.inc(len(points))
+        predictions = self._predict_array(state, points)
+        targets = state.target_columns
+
+        result = {
+            "base": dict(zip(targets, predictions[-1].tolist())),
+            "axes": [{"course": course, "values": v.tolist()} for (course, _), v in zip(axes, values)],
+            "output_courses": targets,
+            "model_used": state.metadata.get("best_model", "Unknown"),
+        }
+        if grid:
+            shape = tuple(len(v) for v in values)
+            result["grid"] = {
+                target: predictions[:-1, j].reshape(shape).tolist() for j, target in enumerate(targets)
+            }
+        else:
+            curves = {}
+            offset = 0
+            for (course, _), axis_values in zip(axes, values):
+                block = predictions[offset:offset + len(axis_values)]
+                curves[course] = {target: block[:, j].tolist() for j, target in enumerate(targets)}
+                offset += len(axis_values)
+            result["curves"] = curves
+        return result
+
+    def explain(self, grades_list: List[Dict[str, float]], top: Optional[int] = None) -> Dict:
+        """
+        Per-course contributions to every predicted grade of several students.
+        For each target, expected_value + the sum of its contributions equals
+        the model output before clipping to 0-100. With `top`, only the courses
+        with the largest absolute contributions are returned per target.
+        """
+        state = self._state
+        if state.model is None:
+            raise RuntimeError("Model not loaded. Call load_model() first.")
+        if state.explainer is None:
+            raise RuntimeError("Explanations are only available for tree ensemble models")
+
+        input_array = self._assemble_matrix(state, grades_list)
+        PREDICTION_ROWS.inc(len(input_array))
+        with STAGE_LATENCY.time(stage="explain"):
+            contributions, raw = state.explainer.explain(input_array)
+        served = np.round(np.clip(raw, 0, 100), 2)
+        contributions = np.round(contributions, 4)
+
+        courses = state.feature_columns
+        if top is not None:
+            keep = np.argsort(-np.abs(contributions), axis=2, kind="stable")[:, :, :top]
+
+        explanations = []
+        for i in range(len(input_array)):
+            per_target = {}
+            for j, target in enumerate(state.target_columns):
+                row = contributions[i, j]
+                columns = keep[i, j] if top is not None else range(len(courses))
+                per_target[target] = {courses[c]: float(row[c]) for c in columns}
+            explanations.append({
+                "predictions": dict(zip(state.target_columns, served[i].tolist())),
+                "contributions": per_target,
+            })
+
+        return {
+            "expected_value": dict(zip(state.target_columns, np.round(state.explainer.expected_value, 4).tolist())),
+            "explanations": explanations,
+            "model_used": state.metadata.get("best_model", "Unknown"),
+        }
+
+    def _predict_matrix(self, state: ModelState, input_array: np.ndarray, cached: bool = True) -> np.ndarray:
+        PREDICTION_ROWS.inc(len(input_array))
+        if self.cache is None or not cached:
+            return self._predict_array(state, input_array)
+
+        if self.cache.decimals is not None:
+            input_array = np.round(input_array, self.cache.decimals)
+        keys = [self.cache.make_key(state.generation, row) for row in input_array]
+        rows = [self.cache.get(key) for key in keys]
+        missing = [i for i, row in enumerate(rows) if row is None]
+        if missing:
+            for i, row in zip(missing, self._predict_array(state, input_array[missing])):
+                self.cache.put(keys[i], row)
+                rows[i] = row
+        return np.vstack(rows)
+
+    def _assemble_matrix(self, state: ModelState, grades_list: List[Dict[str, float]]) -> np.ndarray:
+        """Build the (N, n_features) input matrix; unknown courses are ignored, missing ones default to 50.0."""
+        index = state.feature_index
+        defaults = [50.0] * len(state.feature_columns)
+        rows = []
+        for grades in grades_list:
+            row = defaults.copy()
+            for course, grade in grades.items():
+                i = index.get(course)
+                if i is not None:
+                    row[i] = grade
+            rows.append(row)
+        return np.array(rows, dtype=np.float64)
+
+    def _predict_array(self, state: ModelState, input_array: np.ndarray) -> np.ndarray:
+        """Run the model on an (N, n_features) matrix and clip/round the outputs."""
+        with STAGE_LATENCY.time(stage="predict"):
+            small = COMPILED_INFERENCE_MAX_ROWS <= 0 or len(input_array) <= COMPILED_INFERENCE_MAX_ROWS
+            if state.compiled is not None and small and np.isfinite(input_array).all():
+                predictions = state.compiled.predict(input_array)
+            else:
+                predictions = np.asarray(state.model.predict(input_array)).reshape(len(input_array), -1)
+        with STAGE_LATENCY.time(stage="postprocess"):
+            return np.round(np.clip(predictions, 0, 100), 2)
 
-        result = {}
-        for i, course in enumerate(self.target_columns):
-            result[course] = round(float(np.clip(predictions[i], 0, 100)), 2)
+    def get_cache_stats(self) -> Dict:
+        if self.cache is None:
+            return {"enabled": False}
+        return self.cache.get_stats()
 
-        return result, self.model_name
+    def get_artifact_cache_stats(self) -> Dict:
+        if self.artifact_cache is None:
+            return {"enabled": False}
+        return self.artifact_cache.get_stats(MLFLOW_MODEL_NAME)
 
 
-predictor = GradePredictor()
\ No newline at end of file
+predictor = GradePredictor()
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import signal
+import time
+from typing import Dict, Optional
+
+from app.config import MODEL_RELOAD_INTERVAL
+from app.executor import InferenceExecutor, executor
+from app.predictor import GradePredictor, predictor
+
+
+class ModelReloader:
+    """
+    Background hot reload. Every `interval` seconds the configured model
+    source (MLflow registry or MODEL_PATH) is asked for its current version;
+    when it differs from the active one the new model is loaded in a worker
+    thread and swapped in atomically by GradePredictor.
+    """
+
+    def __init__(self, predictor: GradePredictor, executor: InferenceExecutor, interval: float = 60.0):
+        self.predictor = predictor
+        self.executor = executor
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # Set in pre-forked workers (app/serve.py): reloads are delegated to this parent process
+        self.supervisor_pid: Optional[int] = None
+
+        self.checks = 0
+        self.reloads = 0
+        self.failures = 0
+        self.last_check_at: Optional[float] = None
+        self.last_reload_at: Optional[float] = None
+        self.last_reload_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self, check_now: bool = False):
+        """
+        Start polling. With check_now the first check runs immediately, even
+        when polling is disabled, e.g. after starting from a cached model.
+        Pre-forked workers never check: their parent checks once and replaces them.
+        """
+        if self.supervisor_pid is not None:
+            return
+        if (self.interval > 0 or check_now) and not self.is_running:
+            self._task = asyncio.create_task(self._run(check_now))
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self, check_now: bool = False):
+        if not check_now:
+            await asyncio.sleep(self.interval)
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"Model update check failed: {e}")
+            if self.interval <= 0:
+                return
+            await asyncio.sleep(self.interval)
+
+    async def check(self) -> bool:
+        """Reload if the source has a version other than the active one. Returns True if reloaded."""
+        available = await asyncio.to_thread(self.predictor.get_available_version)
+        self.checks += 1
+        self.last_check_at = time.time()
+        if available is None or available == self.predictor.model_version:
+            return False
+
+        print(f"New model version available: {available} (active: {self.predictor.model_version})")
+        return await self.reload()
+
+    async def reload(self) -> bool:
+        """Load the current model from the source and swap it in. The old model serves until then."""
+        async with self._lock:
+            start = time.perf_counter()
+            loaded = await asyncio.to_thread(self.predictor.load_model)
+            if not loaded:
+                self.failures += 1
+                self.last_error = "Model load failed; previous model still active"
+                return False
+
+            if self.executor.mode == "process":
+                await asyncio.to_thread(self.executor.restart)
+
+            self.reloads += 1
+            self.last_reload_at = time.time()
+            self.last_reload_seconds = time.perf_counter() - start
+            self.last_error = None
+            return True
+
+    def request_supervisor_reload(self):
+        """Ask the pre-fork parent to reload once and replace every worker (SIGHUP)."""
+        os.kill(self.supervisor_pid, signal.SIGHUP)
+
+    def get_status(self) -> Dict:
+        return {
+            **self.predictor.get_version_info(),
+            "supervisor_pid": self.supervisor_pid,
+            "polling": self.is_running,
+            "poll_interval_seconds": self.interval,
+            "checks": self.checks,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_check_at": self.last_check_at,
+            "last_reload_at": self.last_reload_at,
+            "last_reload_seconds": self.last_reload_seconds,
+            "last_error": self.last_error,
+        }
+
+
+reloader = ModelReloader(predictor, executor, interval=MODEL_RELOAD_INTERVAL)
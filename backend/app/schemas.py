@@ -59,6 +59,158 @@ class GradePrediction(BaseModel):
     )
 
 
+class BatchGradeInput(BaseModel):
+    students: List[Dict[str, float]] = Field(
+        ...,
+        min_length=1,
+        description="List of per-student course-to-grade dictionaries. Missing courses default to 50.0."
+    )
+
+
+class BatchGradePrediction(BaseModel):
+    predictions: List[Dict[str, float]] = Field(
+        ...,
+        description="Predicted S5-S6 grades for each student, in input order"
+    )
+    model_used: str = Field(
+        ...,
+        description="Name of the model used for prediction"
+    )
+
+
+class GradeVectorInput(BaseModel):
+    grades: List[float] = Field(
+        ...,
+        description="Dense grade vector ordered like /courses/input. All S1-S4 courses required."
+    )
+
+
+class GradeVectorPrediction(BaseModel):
+    predictions: List[float] = Field(
+        ...,
+        description="Predicted grades ordered like /courses/output"
+    )
+    model_used: str = Field(
+        ...,
+        description="Name of the model used for prediction"
+    )
+
+
+class SweepAxis(BaseModel):
+    course: str = Field(..., description="S1-S4 course to vary")
+    values: Optional[List[float]] = Field(
+        None,
+        min_length=1,
+        description="Grades to try. When omitted, `num` evenly spaced grades from `start` to `stop`."
+    )
+    start: float = 0.0
+    stop: float = 100.0
+    num: int = Field(21, ge=1, le=1001)
+
+    def grid_values(self) -> List[float]:
+        if self.values is not None:
+            return self.values
+        if self.num == 1:
+            return [self.start]
+        step = (self.stop - self.start) / (self.num - 1)
+        return [self.start + i * step for i in range(self.num)]
+
+
+class SweepInput(BaseModel):
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "grades": {"M1100": 70.0, "M1101": 65.0, "I1100": 72.0},
+                "sweep": [
+                    {"course": "M1101", "start": 50.0, "stop": 100.0, "num": 11},
+                    {"course": "I1100", "values": [60.0, 75.0, 90.0]}
+                ],
+                "grid": False
+            }
+        }
+    )
+
+    grades: Dict[str, float] = Field(
+        ...,
+        description="Base S1-S4 grades. Missing courses default to 50.0."
+    )
+    sweep: List[SweepAxis] = Field(..., min_length=1)
+    grid: bool = Field(
+        False,
+        description="Vary all swept courses jointly (cartesian product) instead of one at a time"
+    )
+
+
+class SweepPrediction(BaseModel):
+    base: Dict[str, float] = Field(..., description="Predicted S5-S6 grades for the unmodified grades")
+    axes: List[Dict] = Field(..., description="Swept courses and the grades tried for each")
+    output_courses: List[str]
+    curves: Optional[Dict[str, Dict[str, List[float]]]] = Field(
+        None,
+        description="Without grid: per swept course, per S5-S6 course, the prediction at each swept grade"
+    )
+    grid: Optional[Dict[str, List]] = Field(
+        None,
+        description="With grid: per S5-S6 course, predictions nested in axis order"
+    )
+    model_used: str
+
+
+class ExplainInput(BaseModel):
+    students: List[Dict[str, float]] = Field(
+        ...,
+        min_length=1,
+        description="List of per-student course-to-grade dictionaries. Missing courses default to 50.0."
+    )
+    top: Optional[int] = Field(
+        None,
+        ge=1,
+        description="Only return the courses with the largest absolute contributions to each prediction"
+    )
+
+
+class StudentExplanation(BaseModel):
+    predictions: Dict[str, float] = Field(..., description="Predicted S5-S6 grades")
+    contributions: Dict[str, Dict[str, float]] = Field(
+        ...,
+        description="Per S5-S6 course, the contribution of each S1-S4 course to its predicted grade"
+    )
+
+
+class ExplainResponse(BaseModel):
+    expected_value: Dict[str, float] = Field(
+        ...,
+        description=(
+            "Per S5-S6 course, the model's average prediction; "
+            "adding the contributions gives the unclipped prediction"
+        )
+    )
+    explanations: List[StudentExplanation] = Field(..., description="One explanation per student, in input order")
+    model_used: str
+
+
+class StudentPrediction(BaseModel):
+    admi: str = Field(..., description="Student ID")
+    cohort: str = Field(..., description="Cohort the student belongs to")
+    predictions: Dict[str, float] = Field(
+        ...,
+        description="Predicted S5-S6 grades from the student's stored S1-S4 record"
+    )
+    model_used: str = Field(
+        ...,
+        description="Name of the model used for prediction"
+    )
+
+
+class CohortSummary(BaseModel):
+    cohort: str
+    students: int
+    courses: Dict[str, Dict[str, float]] = Field(
+        ...,
+        description="Per S5-S6 course: mean and p10/p25/p50/p75/p90 of the predicted grades"
+    )
+
+
 class HealthResponse(BaseModel):
     status: str
     model_loaded: bool
@@ -0,0 +1,166 @@
+"""
+Pre-fork server entry point: python -m app.serve
+
+With SERVER_WORKERS > 1 the parent process loads the model, binds the listening
+socket and forks the uvicorn workers. The workers inherit the model already in
+memory and share its pages copy-on-write instead of each unpickling its own copy.
+The parent supervises the workers, restarts any that die, and owns hot reload:
+when a new model version appears (or on SIGHUP) it loads the model once more and
+replaces the workers one at a time, so the new model is shared as well.
+POST /admin/reload in a worker only signals the parent with SIGHUP.
+
+Each worker keeps its own in-process metrics registry, so /metrics and /stats
+describe only the worker that answered; scrape every worker (or aggregate
+across scrapes) for totals.
+
+With SERVER_WORKERS = 1 it simply runs uvicorn in-process.
+"""
+import gc
+import os
+import signal
+import sys
+import time
+from typing import Dict
+
+import uvicorn
+
+from app.config import SERVER_HOST, SERVER_PORT, SERVER_WORKERS, MODEL_RELOAD_INTERVAL
+from app.main import app
+from app.feature_store import feature_store
+from app.predictor import predictor
+from app.reloader import reloader
+
+
+class PreforkServer:
+    def __init__(self, workers: int, host: str, port: int, reload_interval: float = 60.0):
+        self.workers = workers
+        self.reload_interval = reload_interval
+        self.config = uvicorn.Config(app, host=host, port=port, timeout_graceful_shutdown=30)
+        self.socket = None
+        self.children: Dict[int, int] = {}  # pid -> model generation it was forked with
+        self.should_exit = False
+        self.reload_requested = False
+
+    def run(self):
+        if not predictor.load_model():
+            sys.exit("Model could not be loaded; not starting workers")
+        if feature_store.load():
+            feature_store.predictions(predictor)
+
+        # Workers serve the model they were forked with; the parent polls for new versions
+        reloader.interval = 0
+
+        self.socket = self.config.bind_socket()
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+
+        self._freeze()
+        for _ in range(self.workers):
+            self._spawn()
+        print(f"✓ Serving {predictor.model_name} ({predictor.model_version}) with {self.workers} workers "
+              f"on http://{self.config.host}:{self.config.port} (parent pid {os.getpid()})")
+
+        try:
+            self._supervise()
+        finally:
+            self._stop_all()
+            self.socket.close()
+
+    def _freeze(self):
+        # Move everything allocated so far (the model included) out of the collector's reach,
+        # so garbage collection in the workers does not write to the shared pages
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+
+    def _spawn(self) -> int:
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGHUP, signal.SIG_DFL)
+            reloader.supervisor_pid = os.getppid()
+            code = 0
+            try:
+                uvicorn.Server(self.config).run(sockets=[self.socket])
+            except BaseException as e:
+                print(f"Worker {os.getpid()} crashed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+
+        self.children[pid] = predictor.generation
+        return pid
+
+    def _supervise(self):
+        last_check = time.monotonic()
+        # A model served from the registry cache may be stale: check once right away
+        check_now = predictor.from_cache
+        while not self.should_exit:
+            self._reap()
+
+            due = self.reload_interval > 0 and time.monotonic() - last_check >= self.reload_interval
+            if self.reload_requested or due or check_now:
+                force, self.reload_requested, check_now = self.reload_requested, False, False
+                last_check = time.monotonic()
+                try:
+                    self._check_for_update(force)
+                except Exception as e:
+                    print(f"Model update check failed: {e}")
+
+            time.sleep(0.5)
+
+    def _reap(self):
+        while self.children:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            if self.children.pop(pid, None) is not None and not self.should_exit:
+                print(f"Worker {pid} exited with status {status}; starting a replacement")
+                self._spawn()
+
+    def _check_for_update(self, force: bool):
+        available = predictor.get_available_version()
+        if not force and (available is None or available == predictor.model_version):
+            return
+
+        print(f"Reloading model (active: {predictor.model_version}, available: {available})")
+        if not predictor.load_model():
+            print("Model reload failed; workers keep serving the previous model")
+            return
+        if feature_store.is_loaded:
+            feature_store.predictions(predictor)
+
+        self._freeze()
+        # Rolling replacement: start a new worker before stopping each old one
+        for pid in [pid for pid, generation in self.children.items() if generation != predictor.generation]:
+            self._spawn()
+            self._stop(pid)
+
+    def _stop(self, pid: int):
+        self.children.pop(pid, None)
+        try:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+        except (ChildProcessError, ProcessLookupError):
+            pass
+
+    def _stop_all(self):
+        for pid in list(self.children):
+            self._stop(pid)
+
+    def _handle_exit(self, signum, frame):
+        self.should_exit = True
+
+    def _handle_reload(self, signum, frame):
+        self.reload_requested = True
+
+
+def main():
+    if SERVER_WORKERS <= 1:
+        uvicorn.run(app, host=SERVER_HOST, port=SERVER_PORT)
+        return
+    PreforkServer(SERVER_WORKERS, SERVER_HOST, SERVER_PORT, reload_interval=MODEL_RELOAD_INTERVAL).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Incremental bulk scoring of NDJSON / CSV uploads.
+
+Rows are parsed as the request body arrives, scored in fixed-size chunks
+by the routed model version and written back as soon as each chunk is
+done, so memory use does not grow with the size of the upload.
+"""
+import csv
+import io
+import json
+import math
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+STREAM_FORMATS = ("ndjson", "csv")
+ID_COLUMNS = ("id", "admi")
+
+# (line number, student id, grades, parse error)
+Record = Tuple[int, Optional[str], Dict[str, float], Optional[str]]
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body is produced while the request body is still
+    being read. The stock class listens for disconnects on receive() in
+    parallel, which would swallow the upload's body messages. The background
+    task also runs when streaming fails, since it releases the admission slot.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.stream_response(send)
+        finally:
+            if self.background is not None:
+                await self.background()
+
+
+async def iter_lines(byte_stream: AsyncIterator[bytes], max_line_bytes: int = 0) -> AsyncIterator[Optional[bytes]]:
+    """
+    Split an async byte stream into raw lines without buffering the whole body.
+    Lines are left undecoded so invalid UTF-8 only fails its own row. A line
+    longer than max_line_bytes (0 for no limit) is discarded as it arrives and
+    yielded as None, so one huge row cannot exhaust memory.
+    """
+    buffer = b""
+    dropping = False
+    async for chunk in byte_stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if dropping:
+                # End of a line already reported as too long
+                dropping = False
+            elif max_line_bytes and len(line) > max_line_bytes:
+                yield None
+            else:
+                yield line.rstrip(b"\r")
+        if max_line_bytes and len(buffer) > max_line_bytes:
+            if not dropping:
+                yield None
+                dropping = True
+            buffer = b""
+    if buffer and not dropping:
+        yield buffer.rstrip(b"\r")
+
+
+def _to_grade(course: str, value) -> float:
+    grade = float(value)
+    if not math.isfinite(grade):
+        raise ValueError(f"Grade for {course} is not a finite number")
+    return grade
+
+
+def _parse_ndjson(line: str) -> Tuple[Optional[str], Dict[str, float]]:
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("Expected a JSON object")
+
+    if "grades" in record:
+        student_id, grades = record.get("id"), record["grades"]
+    else:
+        student_id = next((record[c] for c in ID_COLUMNS if c in record), None)
+        grades = {k: v for k, v in record.items() if k not in ID_COLUMNS}
+
+    return (
+        str(student_id) if student_id is not None else None,
+        {course: _to_grade(course, grade) for course, grade in grades.items() if grade is not None}
+    )
+
+
+def _parse_csv(header: List[str], line: str) -> Tuple[Optional[str], Dict[str, float]]:
+    values = next(csv.reader([line]))
+    if len(values) != len(header):
+        raise ValueError(f"Expected {len(header)} columns, got {len(values)}")
+
+    student_id, grades = None, {}
+    for column, value in zip(header, values):
+        if column in ID_COLUMNS:
+            student_id = value or None
+        elif value.strip():
+            grades[column] = _to_grade(column, value)
+    return student_id, grades
+
+
+async def iter_records(byte_stream: AsyncIterator[bytes], fmt: str, max_line_bytes: int = 0) -> AsyncIterator[Record]:
+    """
+    Parse NDJSON objects ({"id": ..., "grades": {...}} or flat course keys)
+    or CSV rows (course columns plus an optional id/admi column).
+    Malformed or over-long rows are yielded with an error instead of aborting the stream.
+    """
+    header = None
+    line_number = 0
+    async for raw in iter_lines(byte_stream, max_line_bytes):
+        line_number += 1
+        if raw is None:
+            yield line_number, None, {}, f"Line exceeds {max_line_bytes} bytes"
+            continue
+        if not raw.strip():
+            continue
+
+        if fmt == "csv" and header is None:
+            # Undecodable column names just match no course
+            header = [column.strip() for column in next(csv.reader([raw.decode("utf-8", errors="replace")]))]
+            continue
+
+        try:
+            line = raw.decode("utf-8", errors="strict")
+            if fmt == "csv":
+                student_id, grades = _parse_csv(header, line)
+            else:
+                student_id, grades = _parse_ndjson(line)
+            yield line_number, student_id, grades, None
+        except (ValueError, TypeError, AttributeError) as e:
+            yield line_number, None, {}, str(e)
+
+
+class ResultWriter:
+    """Formats scored rows as NDJSON lines or CSV rows."""
+
+    def __init__(self, fmt: str, target_columns: List[str]):
+        self.fmt = fmt
+        self.target_columns = target_columns
+        self.header_written = False
+
+    def write(self, records: List[Record], predictions: List[Optional[Dict[str, float]]], model_name: str) -> bytes:
+        out = io.StringIO()
+        if self.fmt == "csv":
+            writer = csv.writer(out, lineterminator="\n")
+            if not self.header_written:
+                writer.writerow(["line", "id", *self.target_columns, "error"])
+                self.header_written = True
+            for (line_number, student_id, _, error), result in zip(records, predictions):
+                values = [result[c] for c in self.target_columns] if result else [""] * len(self.target_columns)
+                writer.writerow([line_number, student_id or "", *values, error or ""])
+        else:
+            for (line_number, student_id, _, error), result in zip(records, predictions):
+                if error:
+                    row = {"line": line_number, "id": student_id, "error": error}
+                else:
+                    row = {"line": line_number, "id": student_id, "predictions": result, "model_used": model_name}
+                out.write(json.dumps(row))
+                out.write("\n")
+        return out.getvalue().encode("utf-8")
+
+
+async def score_stream(byte_stream: AsyncIterator[bytes], fmt: str, output_fmt: str,
+                       call, target_columns: List[str], chunk_size: int,
+                       max_line_bytes: int = 0) -> AsyncIterator[bytes]:
+    """
+    Yield formatted results chunk by chunk while the upload is still being parsed.
+    call(method, *args) runs a predictor method on the model version serving the upload.
+    """
+    writer = ResultWriter(output_fmt, target_columns)
+    chunk: List[Record] = []
+
+    async def flush() -> bytes:
+        valid = [record[2] for record in chunk if record[3] is None]
+        # Uploads bypass the prediction cache, which is sized for single-student traffic
+        results, model_name = await call("predict_batch", valid, False) if valid else ([], "")
+        results = iter(results)
+        predictions = [next(results) if record[3] is None else None for record in chunk]
+        return writer.write(chunk, predictions, model_name)
+
+    async for record in iter_records(byte_stream, fmt, max_line_bytes):
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield await flush()
+            chunk = []
+
+    if chunk or (output_fmt == "csv" and not writer.header_written):
+        yield await flush()
@@ -0,0 +1,479 @@
+"""
+Array-backed inference for fitted tree ensembles.
+
+The loaded model (a MultiOutputRegressor of Random Forests / XGBoost
+regressors, or a natively multi-output Random Forest) is flattened into
+contiguous NumPy arrays holding every node of every tree of every target.
+Prediction walks all trees for all rows at once, one tree level per step,
+instead of going through sklearn's per-estimator and per-tree dispatch.
+"""
+import json
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Rows are evaluated in chunks so the per-level working set stays in cache
+ROW_CHUNK = 256
+
+ARRAY_FIELDS = ("feature", "threshold", "left", "right", "value", "roots", "tree_target", "tree_weight", "bias")
+ARRAYS_META_FILE = "ensemble.json"
+
+# (feature, threshold, left, right, value, max_depth) for one tree, with
+# node indices local to the tree. Leaves point to themselves.
+TreeArrays = Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, int]
+
+
+class CompiledEnsemble:
+    """
+    Flattened tree ensemble.
+
+    Node arrays (length n_nodes, indices global across all trees):
+      feature, threshold (float32), left, right, value (float32, n_nodes x k)
+    Children are stored next to each other (right == left + 1) and leaves
+    point to themselves with an infinite threshold, so one traversal step is
+    node = left[node] + (x[feature[node]] > threshold[node]).
+    Tree arrays (length n_trees):
+      roots, tree_target (first target column the tree writes to), tree_weight
+    A tree with k outputs contributes tree_weight * value[leaf] to targets
+    tree_target .. tree_target + k - 1; bias is added per target.
+
+    Internal nodes keep the mean target value of the samples reaching them,
+    which lets the same arrays serve depth truncation and path contributions.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, tree_target,
+                 tree_weight, bias, max_depth: int, n_features: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.tree_target = tree_target
+        self.tree_weight = tree_weight
+        self.bias = bias
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+        self._prepare()
+
+    def _prepare(self):
+        self.n_trees = len(self.roots)
+        self.n_targets = len(self.bias)
+        self.n_tree_outputs = self.value.shape[1]
+        # Single-output trees are stored grouped by target, so the per-target
+        # sums are a reduceat over contiguous tree ranges.
+        if self.n_tree_outputs == 1:
+            self._target_starts = np.searchsorted(self.tree_target, np.arange(self.n_targets))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (
+            self.feature, self.threshold, self.left, self.right, self.value,
+            self.roots, self.tree_target, self.tree_weight, self.bias
+        ))
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Return the leaf index reached in every tree, shape (n_rows, n_trees)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+
+        if X.shape[0] <= ROW_CHUNK:
+            return self._apply_chunk(X)
+        return np.concatenate([self._apply_chunk(X[i:i + ROW_CHUNK]) for i in range(0, X.shape[0], ROW_CHUNK)])
+
+    def _apply_chunk(self, X: np.ndarray) -> np.ndarray:
+        flat = X.ravel()
+        row_offsets = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        node = np.tile(self.roots, (X.shape[0], 1))
+        for _ in range(self.max_depth):
+            go_right = flat.take(row_offsets + self.feature.take(node)) > self.threshold.take(node)
+            node = self.left.take(node) + go_right
+        return node
+
+    def aggregate(self, node_values: np.ndarray) -> np.ndarray:
+        """Combine per-tree values of shape (n_rows, n_trees, k) into (n_rows, n_targets)."""
+        weighted = node_values.astype(np.float64) * self.tree_weight[None, :, None]
+        if self.n_tree_outputs == self.n_targets:
+            return weighted.sum(axis=1) + self.bias
+        return np.add.reduceat(weighted[:, :, 0], self._target_starts, axis=1) + self.bias
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.aggregate(self.value[self.apply(X)])
+
+    def save(self, path: str):
+        """Write every array as a raw .npy file under `path` so it can be memory-mapped back."""
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAY_FIELDS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(path, ARRAYS_META_FILE), "w") as f:
+            json.dump({"max_depth": self.max_depth, "n_features": self.n_features, "n_trees": self.n_trees}, f)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "CompiledEnsemble":
+        """
+        Load an ensemble written by save(). With mmap the arrays are mapped
+        read-only instead of read, so startup does not scale with model size
+        and processes serving the same files share the pages.
+        """
+        with open(os.path.join(path, ARRAYS_META_FILE)) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r" if mmap else None)
+            for name in ARRAY_FIELDS
+        }
+        return cls(**arrays, max_depth=meta["max_depth"], n_features=meta["n_features"])
+
+
+class PathExplainer:
+    """
+    Per-feature contributions to every prediction of a CompiledEnsemble
+    (Saabas path attribution): walking a tree from the root, each split
+    credits its feature with the change in node value it causes. Per target,
+    expected_value + contributions.sum(features) equals the raw prediction.
+
+    Each node's parent split feature and value change are precomputed once,
+    so an explanation is a single level-by-level traversal of all trees for
+    all rows, like CompiledEnsemble.apply.
+    """
+
+    def __init__(self, ensemble: CompiledEnsemble):
+        self.ensemble = ensemble
+        internal = np.flatnonzero(ensemble.left != np.arange(len(ensemble.left)))
+        parent = np.arange(len(ensemble.left))
+        parent[ensemble.left[internal]] = internal
+        parent[ensemble.right[internal]] = internal
+
+        # Roots are their own parent: zero change, never credited
+        self.split_feature = ensemble.feature[parent]
+        self.delta = (ensemble.value.astype(np.float64) - ensemble.value[parent]) * \
+            np.repeat(ensemble.tree_weight, np.diff(np.append(ensemble.roots, len(parent))))[:, None]
+        self.expected_value = ensemble.aggregate(ensemble.value[ensemble.roots][None, :, :])[0]
+
+        k = ensemble.n_tree_outputs
+        # Output column of every (tree, tree output) pair
+        self._tree_columns = ensemble.tree_target[:, None] + np.arange(k)[None, :]
+
+    @property
+    def nbytes(self) -> int:
+        return self.split_feature.nbytes + self.delta.nbytes
+
+    def explain(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return contributions (n_rows, n_targets, n_features) and raw predictions (n_rows, n_targets)."""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.ensemble.n_features:
+            raise ValueError(f"Expected {self.ensemble.n_features} features, got {X.shape[1]}")
+
+        contributions = np.concatenate([
+            self._explain_chunk(X[i:i + ROW_CHUNK]) for i in range(0, X.shape[0], ROW_CHUNK)
+        ])
+        return contributions, self.expected_value + contributions.sum(axis=2)
+
+    def _explain_chunk(self, X: np.ndarray) -> np.ndarray:
+        ens = self.ensemble
+        n_rows, n_features, n_targets = X.shape[0], ens.n_features, ens.n_targets
+        flat = X.ravel()
+        row_offsets = (np.arange(n_rows) * n_features)[:, None]
+        # Flat output slot of (row, target, feature) is (row * n_targets + target) * n_features + feature
+        slot_base = ((np.arange(n_rows) * n_targets)[:, None, None] + self._tree_columns[None, :, :]) * n_features
+
+        totals = np.zeros(n_rows * n_targets * n_features)
+        node = np.tile(ens.roots, (n_rows, 1))
+        for _ in range(ens.max_depth):
+            go_right = flat.take(row_offsets + ens.feature.take(node)) > ens.threshold.take(node)
+            child = ens.left.take(node) + go_right
+            # Leaves point to themselves: only actual steps down are credited
+            moved = (child != node)[:, :, None]
+            node = child
+            slots = slot_base + self.split_feature.take(node)[:, :, None]
+            weights = np.where(moved, self.delta[node], 0.0)
+            totals += np.bincount(slots.ravel(), weights=weights.ravel(), minlength=totals.size)
+        return totals.reshape(n_rows, n_targets, n_features)
+
+
+def _sklearn_tree_arrays(tree) -> TreeArrays:
+    t = tree.tree_
+    is_leaf = t.children_left < 0
+    local = np.arange(t.node_count, dtype=np.int32)
+
+    feature = np.where(is_leaf, 0, t.feature).astype(np.int32)
+    # sklearn compares float32 inputs against float64 thresholds with <=.
+    # Rounding the threshold down to float32 keeps the comparison exact.
+    threshold = t.threshold.astype(np.float32)
+    too_high = threshold.astype(np.float64) > t.threshold
+    threshold[too_high] = np.nextafter(threshold[too_high], np.float32(-np.inf))
+    threshold[is_leaf] = np.inf
+
+    left = np.where(is_leaf, local, t.children_left).astype(np.int32)
+    right = np.where(is_leaf, local, t.children_right).astype(np.int32)
+    value = t.value[:, :, 0].astype(np.float32)
+    return feature, threshold, left, right, value, int(t.max_depth)
+
+
+def _xgb_tree_arrays(tree: dict, feature_index: dict) -> TreeArrays:
+    nodes = {}
+
+    def walk(node, depth):
+        nodes[node["nodeid"]] = (node, depth)
+        for child in node.get("children", []):
+            walk(child, depth + 1)
+
+    walk(tree, 0)
+    order = sorted(nodes)
+    local = {nodeid: i for i, nodeid in enumerate(order)}
+    n = len(order)
+
+    feature = np.zeros(n, dtype=np.int32)
+    threshold = np.full(n, np.inf, dtype=np.float32)
+    left = np.arange(n, dtype=np.int32)
+    right = np.arange(n, dtype=np.int32)
+    value = np.zeros((n, 1), dtype=np.float64)
+    cover = np.zeros(n, dtype=np.float64)
+
+    for nodeid in order:
+        node, _ = nodes[nodeid]
+        i = local[nodeid]
+        cover[i] = node.get("cover", 1.0)
+        if "leaf" in node:
+            value[i, 0] = node["leaf"]
+            continue
+        feature[i] = feature_index[node["split"]]
+        # XGBoost sends x < split to "yes"; for float32 x that is x <= prev_float(split)
+        threshold[i] = np.nextafter(np.float32(node["split_condition"]), np.float32(-np.inf))
+        left[i] = local[node["yes"]]
+        right[i] = local[node["no"]]
+
+    # Internal node value: cover-weighted mean of its subtree, filled bottom-up
+    for nodeid in sorted(order, key=lambda nid: -nodes[nid][1]):
+        node, _ = nodes[nodeid]
+        if "leaf" in node:
+            continue
+        i, l, r = local[nodeid], local[node["yes"]], local[node["no"]]
+        total = cover[l] + cover[r]
+        value[i, 0] = (cover[l] * value[l, 0] + cover[r] * value[r, 0]) / total if total else 0.0
+
+    max_depth = max(depth for _, depth in nodes.values())
+    return feature, threshold, left, right, value.astype(np.float32), max_depth
+
+
+def _breadth_first(tree: TreeArrays) -> TreeArrays:
+    """Renumber a tree's nodes breadth-first so every right child directly follows its left sibling."""
+    feature, threshold, left, right, value, max_depth = tree
+    order, level = [], [0]
+    while level:
+        order.extend(level)
+        level = [child for node in level if left[node] != node for child in (left[node], right[node])]
+    order = np.array(order)
+    new_index = np.empty(len(order), dtype=np.int32)
+    new_index[order] = np.arange(len(order), dtype=np.int32)
+    return (
+        feature[order],
+        threshold[order],
+        new_index[left[order]],
+        new_index[right[order]],
+        value[order],
+        max_depth,
+    )
+
+
+def _compile_sklearn_forest(model) -> Tuple[List[TreeArrays], List[float], int]:
+    trees = [_sklearn_tree_arrays(est) for est in model.estimators_]
+    return trees, [1.0 / len(trees)] * len(trees), int(model.n_outputs_)
+
+
+def _xgb_multi_target_arrays(tree: dict) -> TreeArrays:
+    """Arrays for a vector-leaf tree (multi_strategy="multi_output_tree") from the booster's JSON model."""
+    left = np.asarray(tree["left_children"], dtype=np.int32)
+    right = np.asarray(tree["right_children"], dtype=np.int32)
+    n = len(left)
+    is_leaf = left < 0
+    local = np.arange(n, dtype=np.int32)
+
+    feature = np.where(is_leaf, 0, tree["split_indices"]).astype(np.int32)
+    threshold = np.nextafter(np.asarray(tree["split_conditions"], dtype=np.float32), np.float32(-np.inf))
+    threshold[is_leaf] = np.inf
+    # Every node carries its (learning-rate scaled) weight vector, internal nodes included
+    value = np.asarray(tree["base_weights"], dtype=np.float32).reshape(n, -1)
+
+    level, max_depth = [0], 0
+    while level:
+        level = [child for node in level if not is_leaf[node] for child in (left[node], right[node])]
+        if level:
+            max_depth += 1
+
+    left = np.where(is_leaf, local, left)
+    right = np.where(is_leaf, local, right)
+    return feature, threshold, left, right, value, max_depth
+
+
+def _compile_xgboost(model) -> Tuple[List[TreeArrays], List[float], List[int], np.ndarray]:
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    config = json.loads(booster.save_config())
+    if config["learner"]["gradient_booster"]["name"] != "gbtree":
+        raise ValueError("Only gbtree boosters can be compiled")
+    params = config["learner"]["learner_model_param"]
+    n_targets = max(1, int(params.get("num_target", "1")))
+    base_score = float(params["base_score"])
+    num_parallel = int(config["learner"]["gradient_booster"]["gbtree_model_param"].get("num_parallel_tree", "1"))
+    best_iteration = getattr(model, "best_iteration", None)
+
+    if config["learner"].get("learner_train_param", {}).get("multi_strategy") == "multi_output_tree":
+        # One vector-leaf tree per round; these cannot be dumped, so read the JSON model
+        raw = json.loads(booster.save_raw("json"))["learner"]["gradient_booster"]["model"]["trees"]
+        if best_iteration is not None:
+            raw = raw[:(best_iteration + 1) * num_parallel]
+        trees = [_xgb_multi_target_arrays(tree) for tree in raw]
+        return trees, [1.0] * len(trees), [0] * len(trees), np.full(n_targets, base_score)
+
+    names = booster.feature_names or [f"f{i}" for i in range(booster.num_features())]
+    feature_index = {name: i for i, name in enumerate(names)}
+
+    dump = booster.get_dump(dump_format="json", with_stats=True)
+    if best_iteration is not None:
+        dump = dump[:(best_iteration + 1) * n_targets * num_parallel]
+
+    trees = [_xgb_tree_arrays(json.loads(tree), feature_index) for tree in dump]
+    # With one tree per target per round, trees cycle through the targets
+    targets = [i % n_targets for i in range(len(trees))]
+    return trees, [1.0] * len(trees), targets, np.full(n_targets, base_score)
+
+
+def _unwrap(model):
+    """Return the underlying estimator of an MLflow pyfunc model, if any."""
+    impl = getattr(model, "_model_impl", None)
+    if impl is not None:
+        return getattr(impl, "sklearn_model", impl)
+    return model
+
+
+def _split_trees(ensemble: CompiledEnsemble) -> List[TreeArrays]:
+    """Cut a compiled ensemble back into per-tree arrays with tree-local node indices."""
+    ends = list(ensemble.roots[1:]) + [len(ensemble.feature)]
+    return [
+        (
+            ensemble.feature[start:end],
+            ensemble.threshold[start:end],
+            ensemble.left[start:end] - start,
+            ensemble.right[start:end] - start,
+            ensemble.value[start:end],
+            ensemble.max_depth,
+        )
+        for start, end in zip(ensemble.roots, ends)
+    ]
+
+
+def _assemble(trees: List[TreeArrays], weights: List[float], targets: List[int],
+              bias: np.ndarray, n_features: int) -> CompiledEnsemble:
+    # Keep single-output trees grouped by target (stable, so tree order is preserved)
+    order = sorted(range(len(trees)), key=lambda i: targets[i])
+    trees = [_breadth_first(trees[i]) for i in order]
+    weights = [weights[i] for i in order]
+    targets = [targets[i] for i in order]
+
+    sizes = np.array([len(t[0]) for t in trees])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+
+    return CompiledEnsemble(
+        feature=np.concatenate([t[0] for t in trees]),
+        threshold=np.concatenate([t[1] for t in trees]),
+        left=np.concatenate([t[2] + off for t, off in zip(trees, offsets)]).astype(np.int32),
+        right=np.concatenate([t[3] + off for t, off in zip(trees, offsets)]).astype(np.int32),
+        value=np.ascontiguousarray(np.concatenate([t[4] for t in trees])),
+        roots=offsets,
+        tree_target=np.array(targets, dtype=np.int32),
+        tree_weight=np.array(weights, dtype=np.float32),
+        bias=np.asarray(bias, dtype=np.float64),
+        max_depth=max(t[5] for t in trees),
+        n_features=n_features,
+    )
+
+
+def compile_model(model) -> Optional[CompiledEnsemble]:
+    """
+    Flatten a fitted tree ensemble into a CompiledEnsemble.
+
+    Supported: MultiOutputRegressor of Random Forest / Extra Trees / decision
+    tree / XGBoost regressors, or any of those used directly. Returns None for
+    anything else so callers can fall back to model.predict.
+    """
+    model = _unwrap(model)
+    if isinstance(model, CompiledEnsemble):
+        return model
+    try:
+        n_features = int(model.n_features_in_)
+        if hasattr(model, "estimators_") and isinstance(model.estimators_, list) \
+                and hasattr(model, "n_outputs_") and hasattr(model.estimators_[0], "tree_"):
+            trees, weights, n_outputs = _compile_sklearn_forest(model)
+            return _assemble(trees, weights, [0] * len(trees), np.zeros(n_outputs), n_features)
+
+        if hasattr(model, "tree_"):
+            return _assemble([_sklearn_tree_arrays(model)], [1.0], [0], np.zeros(int(model.n_outputs_)), n_features)
+
+        if hasattr(model, "get_booster"):
+            trees, weights, targets, bias = _compile_xgboost(model)
+            return _assemble(trees, weights, targets, bias, n_features)
+
+        if hasattr(model, "estimators_"):
+            # MultiOutputRegressor: one single-output estimator per target
+            trees, weights, targets, bias = [], [], [], []
+            for target, estimator in enumerate(model.estimators_):
+                sub = compile_model(estimator)
+                if sub is None or sub.n_targets != 1:
+                    return None
+                trees.extend(_split_trees(sub))
+                weights.extend(sub.tree_weight.tolist())
+                targets.extend([target] * sub.n_trees)
+                bias.append(sub.bias[0])
+            return _assemble(trees, weights, targets, np.array(bias), n_features)
+    except Exception as e:
+        print(f"Tree ensemble compilation failed: {e}")
+    return None
+
+
+def select_trees(ensemble: CompiledEnsemble, n_trees: int) -> CompiledEnsemble:
+    """
+    Keep the first n_trees trees of every target (of the whole ensemble when
+    trees are multi-output). Averaging ensembles (forests, whose tree weights
+    sum to 1 per target) are re-weighted to average the trees that remain;
+    boosted ensembles keep their weights, which truncates the boosting rounds.
+    """
+    split = _split_trees(ensemble)
+    trees, weights, targets = [], [], []
+    for target in np.unique(ensemble.tree_target):
+        group = np.flatnonzero(ensemble.tree_target == target)
+        kept = group[:n_trees]
+        scale = 1.0
+        if np.isclose(ensemble.tree_weight[group].sum(), 1.0):
+            scale = ensemble.tree_weight[group].sum() / ensemble.tree_weight[kept].sum()
+        trees.extend(split[i] for i in kept)
+        weights.extend((ensemble.tree_weight[kept] * scale).tolist())
+        targets.extend([int(target)] * len(kept))
+    return _assemble(trees, weights, targets, ensemble.bias, ensemble.n_features)
+
+
+def truncate_depth(ensemble: CompiledEnsemble, max_depth: int) -> CompiledEnsemble:
+    """
+    Cap every tree at max_depth. Nodes at that depth become leaves that
+    predict the value stored for them (the mean of the samples reaching them).
+    """
+    trees = []
+    for feature, threshold, left, right, value, _ in _split_trees(ensemble):
+        threshold, left, right = threshold.copy(), left.copy(), right.copy()
+        local = np.arange(len(left), dtype=left.dtype)
+        level, depth = [0], 0
+        while True:
+            if depth == max_depth:
+                left[level], right[level], threshold[level] = local[level], local[level], np.inf
+                break
+            children = [child for node in level if left[node] != node for child in (left[node], right[node])]
+            if not children:
+                break
+            level, depth = children, depth + 1
+        trees.append((feature, threshold, left, right, value, depth))
+    return _assemble(trees, ensemble.tree_weight.tolist(), ensemble.tree_target.tolist(),
+                     ensemble.bias, ensemble.n_features)
@@ -1,5 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
+from unittest.mock import patch
 import sys
 import os
 
@@ -9,11 +10,15 @@ from app.main import app
 from app.predictor import predictor
 
 
+ADMIN_HEADERS = {"X-Admin-Token": "test-token"}
+
+
 @pytest.fixture(scope="module", autouse=True)
 def setup_model():
     """Ensure model is loaded before tests"""
     predictor.load_model()
-    yield
+    with patch("app.main.ADMIN_TOKEN", ADMIN_HEADERS["X-Admin-Token"]):
+        yield
 
 
 client = TestClient(app)
@@ -60,4 +65,263 @@ class TestAPIEndToEnd:
         assert "output_courses" in data
         assert "metrics" in data
         assert len(data["input_courses"]) == 30
-        assert len(data["output_courses"]) == 17
\ No newline at end of file
+        assert len(data["output_courses"]) == 17
+
+    def test_batch_prediction_endpoint(self):
+        """Test batch prediction returns one result per student in order"""
+        input_courses = client.get("/courses/input").json()["courses"]
+        students = [
+            {course: 55.0 for course in input_courses},
+            {course: 85.0 for course in input_courses[:5]},
+        ]
+
+        response = client.post("/predict/batch", json={"students": students})
+        assert response.status_code == 200
+
+        result = response.json()
+        assert len(result["predictions"]) == 2
+        for grades, predictions in zip(students, result["predictions"]):
+            single = client.post("/predict", json={"grades": grades}).json()
+            assert predictions == single["predictions"]
+
+    def test_vector_prediction_endpoint(self):
+        """Test the positional wire format end to end"""
+        input_courses = client.get("/courses/input").json()["courses"]
+        output_courses = client.get("/courses/output").json()["courses"]
+
+        response = client.post("/predict/vector", json={"grades": [75.0] * len(input_courses)})
+        assert response.status_code == 200
+        assert len(response.json()["predictions"]) == len(output_courses)
+
+        bad_response = client.post("/predict/vector", json={"grades": [75.0]})
+        assert bad_response.status_code == 422
+
+    def test_sweep_endpoint(self):
+        """Test the what-if sweep returns one curve point per swept grade"""
+        input_courses = client.get("/courses/input").json()["courses"]
+        grades = {course: 70.0 for course in input_courses}
+        sweep = [{"course": input_courses[0], "start": 50, "stop": 100, "num": 6},
+                 {"course": input_courses[1], "values": [60, 80]}]
+
+        response = client.post("/predict/sweep", json={"grades": grades, "sweep": sweep})
+        assert response.status_code == 200
+        result = response.json()
+        assert result["axes"][0]["values"] == [50.0, 60.0, 70.0, 80.0, 90.0, 100.0]
+        curve = result["curves"][input_courses[0]]
+        assert set(curve) == set(result["output_courses"])
+        assert all(len(points) == 6 for points in curve.values())
+
+        grid = client.post("/predict/sweep", json={"grades": grades, "sweep": sweep, "grid": True}).json()
+        assert len(grid["grid"][result["output_courses"][0]]) == 6
+
+        bad = client.post("/predict/sweep", json={"grades": grades, "sweep": [{"course": "NOPE"}]})
+        assert bad.status_code == 422
+
+        twice = [{"course": input_courses[0], "values": [60]}, {"course": input_courses[0], "values": [80]}]
+        assert client.post("/predict/sweep", json={"grades": grades, "sweep": twice}).status_code == 422
+
+        # 1001**7 overflows int64; the size cap must still apply
+        huge = [{"course": course, "num": 1001} for course in input_courses[:7]]
+        assert client.post("/predict/sweep", json={"grades": grades, "sweep": huge, "grid": True}).status_code == 413
+
+    def test_explain_endpoint(self):
+        """Test explanations add up to the predictions and honour top"""
+        input_courses = client.get("/courses/input").json()["courses"]
+        students = [{course: 60.0 + i for i, course in enumerate(input_courses)}, {input_courses[0]: 90.0}]
+
+        response = client.post("/explain", json={"students": students})
+        assert response.status_code == 200
+        result = response.json()
+        assert len(result["explanations"]) == 2
+
+        single = client.post("/predict", json={"grades": students[0]}).json()["predictions"]
+        first = result["explanations"][0]
+        assert first["predictions"] == single
+        for course, contributions in first["contributions"].items():
+            assert len(contributions) == len(input_courses)
+            total = result["expected_value"][course] + sum(contributions.values())
+            assert abs(min(max(total, 0), 100) - single[course]) < 0.05
+
+        top = client.post("/explain", json={"students": students[:1], "top": 3}).json()
+        assert all(len(c) == 3 for c in top["explanations"][0]["contributions"].values())
+
+    def test_model_version_pinning(self):
+        """Test requests pinned to a pool version by header or query parameter"""
+        from app.model_pool import model_pool
+
+        if "candidate" not in model_pool.versions:
+            models_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+            model_pool.register("candidate", models_dir)
+        grades = {"grades": {"M1100": 80.0}}
+
+        primary = client.post("/predict", json=grades)
+        pinned = client.post("/predict", json=grades, headers={"X-Model-Version": "candidate"})
+        by_query = client.post("/predict/batch?model_version=candidate", json={"students": [grades["grades"]]})
+
+        assert primary.headers["X-Model-Version"] == "primary"
+        assert pinned.headers["X-Model-Version"] == "candidate"
+        assert pinned.json()["predictions"] == primary.json()["predictions"]
+        assert by_query.json()["predictions"][0] == primary.json()["predictions"]
+        assert client.post("/predict", json=grades, headers={"X-Model-Version": "nope"}).status_code == 404
+
+        # Sweeps, explanations and streamed uploads honour the pin too
+        pin = {"X-Model-Version": "candidate"}
+        sweep = client.post("/predict/sweep", headers=pin,
+                            json={**grades, "sweep": [{"course": "M1100", "values": [60, 80]}]})
+        explain = client.post("/explain", json={"students": [grades["grades"]]}, headers=pin)
+        stream = client.post("/predict/stream", content='{"M1100": 80}\n',
+                             headers={**pin, "content-type": "application/x-ndjson"})
+        assert [r.headers["X-Model-Version"] for r in (sweep, explain, stream)] == ["candidate"] * 3
+        assert all(r.status_code == 200 for r in (sweep, explain, stream))
+        assert client.post("/explain", json={"students": [grades["grades"]]},
+                           headers={"X-Model-Version": "nope"}).status_code == 404
+
+        stats = client.get("/admin/models", headers=ADMIN_HEADERS).json()["versions"]["candidate"]
+        assert stats["loaded"] is True and stats["requests"] == 5
+
+    def test_admission_rejection(self):
+        """Test that a saturated server answers 429 with Retry-After instead of queueing"""
+        from app.admission import admission
+
+        saved = admission.max_in_flight, admission.max_queue, admission.in_flight
+        admission.max_in_flight, admission.max_queue, admission.in_flight = 1, 0, 1
+        try:
+            response = client.post("/predict", json={"grades": {"M1100": 80.0}})
+            stream = client.post("/predict/stream", content='{"M1100": 80}\n',
+                                 headers={"content-type": "application/x-ndjson"})
+        finally:
+            admission.max_in_flight, admission.max_queue, admission.in_flight = saved
+
+        assert response.status_code == 429
+        assert int(response.headers["Retry-After"]) >= 1
+        assert stream.status_code == 429
+        assert client.post("/predict", json={"grades": {"M1100": 80.0}}).status_code == 200
+        assert client.get("/stats").json()["admission"]["rejected_queue_full"] >= 2
+
+        # An admitted stream gives its slot back once the response is complete
+        stream = client.post("/predict/stream", content='{"M1100": 80}\n',
+                             headers={"content-type": "application/x-ndjson"})
+        assert stream.status_code == 200
+        assert admission.in_flight == saved[2]
+        assert 'prediction_stage_duration_seconds_count{stage="admission"}' in client.get("/metrics").text
+
+    def test_stream_ndjson_scoring(self):
+        """Test NDJSON bulk scoring returns one line per input row, in order"""
+        import json
+
+        input_courses = client.get("/courses/input").json()["courses"]
+        rows = [{"id": f"s{i}", "grades": {c: 60.0 + i for c in input_courses}} for i in range(5)]
+        body = "\n".join(json.dumps(row) for row in rows) + "\nnot json\n"
+
+        response = client.post(
+            "/predict/stream",
+            content=body,
+            headers={"content-type": "application/x-ndjson"}
+        )
+        assert response.status_code == 200
+
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["id"] for line in lines[:5]] == [f"s{i}" for i in range(5)]
+        assert "error" in lines[5]
+
+    def test_stream_csv_scoring(self):
+        """Test CSV bulk scoring returns a CSV with a header and one row per student"""
+        input_courses = client.get("/courses/input").json()["courses"]
+        output_courses = client.get("/courses/output").json()["courses"]
+        body = "admi," + ",".join(input_courses) + "\n"
+        body += "\n".join(f"{i}," + ",".join(["70"] * len(input_courses)) for i in range(3))
+
+        response = client.post("/predict/stream", content=body, headers={"content-type": "text/csv"})
+        assert response.status_code == 200
+
+        lines = response.text.strip().splitlines()
+        assert lines[0].split(",") == ["line", "id", *output_courses, "error"]
+        assert len(lines) == 4
+
+    def test_admin_reload_endpoint(self):
+        """Test that an admin reload keeps serving and reports the active version"""
+        before = client.get("/admin/model", headers=ADMIN_HEADERS).json()
+
+        response = client.post("/admin/reload", headers=ADMIN_HEADERS)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["model_loaded"] is True
+        assert data["model_version"] is not None
+        assert data["generation"] > before["generation"]
+
+        assert client.get("/health").json()["model_loaded"] is True
+
+    def test_admin_reload_delegated_to_prefork_parent(self):
+        """Test that a pre-forked worker signals the parent instead of reloading itself"""
+        import signal
+        from app.reloader import reloader
+
+        generation = predictor.generation
+        with patch.object(reloader, "supervisor_pid", 4242), patch("app.reloader.os.kill") as kill:
+            response = client.post("/admin/reload", headers=ADMIN_HEADERS)
+
+        assert response.status_code == 202
+        assert response.json()["reload"] == "requested"
+        kill.assert_called_once_with(4242, signal.SIGHUP)
+        assert predictor.generation == generation
+
+    def test_admin_endpoints_fail_closed(self):
+        """Test that admin endpoints reject bad tokens and are hidden when no token is configured"""
+        assert client.post("/admin/reload", headers={"X-Admin-Token": "wrong"}).status_code == 403
+        assert client.get("/admin/model").status_code == 403
+
+        with patch("app.main.ADMIN_TOKEN", ""):
+            assert client.post("/admin/reload").status_code == 404
+            assert client.get("/admin/models").status_code == 404
+            with patch("app.main.ADMIN_OPEN", True):
+                assert client.get("/admin/model").status_code == 200
+
+    def test_metrics_endpoint(self):
+        """Test that /metrics exposes request counts and per-stage latencies"""
+        client.post("/predict", json={"grades": {"M1100": 61.0}})
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+
+        text = response.text
+        assert 'http_requests_total{method="POST",path="/predict",status="200"}' in text
+        for stage in ["validation", "assembly", "serialization"]:
+            assert f'prediction_stage_duration_seconds_count{{stage="{stage}"}}' in text
+        assert "model_info{" in text
+
+    def test_student_and_cohort_endpoints(self, tmp_path):
+        """Test lookup-by-ID prediction and precomputed cohort predictions/summaries"""
+        import numpy as np
+        from app.feature_store import feature_store, save_feature_store
+
+        features = np.full((3, len(predictor.feature_columns)), 70.0)
+        features[2] = 90.0
+        save_feature_store(str(tmp_path), np.array([30, 10, 20]), features, ["G2023", "G2022", "G2023"],
+                           predictor.feature_columns)
+        feature_store.path = str(tmp_path)
+        assert feature_store.load()
+        try:
+            response = client.get("/students/20/predict")
+            assert response.status_code == 200
+            data = response.json()
+            assert data["cohort"] == "G2023"
+            expected, _ = predictor.predict(dict(zip(predictor.feature_columns, features[2])))
+            assert data["predictions"] == pytest.approx(expected)
+
+            assert client.get("/students/99/predict").status_code == 404
+            assert client.get("/cohorts").json()["cohorts"] == [
+                {"name": "G2022", "students": 1}, {"name": "G2023", "students": 2}
+            ]
+
+            cohort = client.get("/cohorts/G2023/predictions").json()
+            assert cohort["admi"] == [20, 30]
+            assert len(cohort["predictions"][0]) == len(predictor.target_columns)
+
+            summary = client.get("/cohorts/all/summary").json()
+            assert summary["students"] == 3
+            course = summary["courses"][predictor.target_columns[0]]
+            assert course["p10"] <= course["p50"] <= course["p90"]
+            assert client.get("/cohorts/G1999/summary").status_code == 404
+        finally:
+            feature_store.admi = None
@@ -48,4 +48,294 @@ class TestPredictionIntegration:
         predictions2, _ = self.predictor.predict(grades)
 
         for course in predictions1:
-            assert predictions1[course] == predictions2[course]
\ No newline at end of file
+            assert predictions1[course] == predictions2[course]
+
+    def test_batch_prediction_preserves_order(self):
+        """Test that batch predictions match single predictions row by row"""
+        students = [
+            {course: grade for course in self.predictor.feature_columns}
+            for grade in (40.0, 65.0, 90.0)
+        ]
+
+        batch_predictions, model_name = self.predictor.predict_batch(students)
+
+        assert len(batch_predictions) == len(students)
+        for grades, predictions in zip(students, batch_predictions):
+            single_predictions, _ = self.predictor.predict(grades)
+            assert predictions == single_predictions
+
+    def test_batch_prediction_empty(self):
+        """Test that an empty batch returns no predictions"""
+        predictions, model_name = self.predictor.predict_batch([])
+
+        assert predictions == []
+
+    def test_process_executor_matches_in_process_predictions(self):
+        """Test that process-pool workers load the model and predict identically"""
+        import asyncio
+        from app.executor import InferenceExecutor
+
+        grades = {course: 72.5 for course in self.predictor.feature_columns}
+        expected, _ = self.predictor.predict(grades)
+
+        executor = InferenceExecutor(self.predictor, mode="process", workers=1)
+        executor.start()
+        try:
+            predictions, model_name = asyncio.run(executor.predict(grades))
+        finally:
+            executor.shutdown()
+
+        assert predictions == expected
+        assert model_name == self.predictor.model_name
+
+    def test_compiled_engine_matches_model(self):
+        """Test that the compiled engine reproduces model.predict on the loaded model"""
+        if self.predictor.compiled is None:
+            pytest.skip("Loaded model is not supported by the tree engine")
+
+        rng = np.random.default_rng(7)
+        X = rng.uniform(0, 100, size=(64, len(self.predictor.feature_columns)))
+
+        np.testing.assert_allclose(
+            self.predictor.compiled.predict(X),
+            self.predictor.model.predict(X),
+            atol=1e-3
+        )
+
+    def test_prediction_cache_hits_and_invalidation(self):
+        """Test that repeated inputs hit the cache and reloading the model invalidates it"""
+        if self.predictor.cache is None:
+            pytest.skip("Prediction cache disabled")
+
+        grades = {course: 66.0 for course in self.predictor.feature_columns}
+        first, _ = self.predictor.predict(grades)
+        hits_before = self.predictor.cache.hits
+        second, _ = self.predictor.predict(grades)
+
+        assert second == first
+        assert self.predictor.cache.hits == hits_before + 1
+
+        self.predictor.load_model()
+        assert len(self.predictor.cache) == 0
+
+    def test_bulk_predictions_bypass_cache(self):
+        """Test that uncached batch predictions neither read nor fill the cache"""
+        if self.predictor.cache is None:
+            pytest.skip("Prediction cache disabled")
+
+        students = [{course: 40.0 + i for course in self.predictor.feature_columns} for i in range(5)]
+        size, misses = len(self.predictor.cache), self.predictor.cache.misses
+        uncached, _ = self.predictor.predict_batch(students, cached=False)
+
+        assert len(self.predictor.cache) == size
+        assert self.predictor.cache.misses == misses
+        assert uncached == self.predictor.predict_batch(students)[0]
+
+    def test_vector_prediction_matches_dict_prediction(self):
+        """Test that the positional vector path agrees with the dict path"""
+        grades = {course: 50.0 + i for i, course in enumerate(self.predictor.feature_columns)}
+        vector = [grades[course] for course in self.predictor.feature_columns]
+
+        dict_predictions, _ = self.predictor.predict(grades)
+        vector_predictions, _ = self.predictor.predict_vectors([vector])
+
+        assert vector_predictions[0] == [dict_predictions[c] for c in self.predictor.target_columns]
+
+    def test_vector_prediction_rejects_wrong_length(self):
+        """Test that vectors of the wrong width are rejected"""
+        with pytest.raises(ValueError):
+            self.predictor.predict_vectors([[70.0, 80.0]])
+
+    def test_sweep_matches_individual_predictions(self):
+        """Test that sweep curves and grids equal predicting every perturbed vector separately"""
+        first, second = self.predictor.feature_columns[:2]
+        grades = {course: 70.0 for course in self.predictor.feature_columns}
+        axes = [(first, [40.0, 60.0, 90.0]), (second, [55.0, 95.0])]
+
+        curves = self.predictor.predict_sweep(grades, axes)
+        grid = self.predictor.predict_sweep(grades, axes, grid=True)
+
+        assert curves["base"] == self.predictor.predict(grades)[0]
+        target = self.predictor.target_columns[0]
+        for course, values in axes:
+            expected = [self.predictor.predict({**grades, course: v})[0][target] for v in values]
+            assert curves["curves"][course][target] == expected
+        assert grid["grid"][target][2][1] == self.predictor.predict({**grades, first: 90.0, second: 95.0})[0][target]
+
+        with pytest.raises(ValueError):
+            self.predictor.predict_sweep(grades, [("NOPE", [50.0])])
+
+    def test_failed_reload_keeps_active_model(self):
+        """Test that a failing reload leaves the previous model in service"""
+        from unittest.mock import patch
+
+        model_before = self.predictor.model
+        with patch("app.predictor.joblib.load", side_effect=OSError("disk gone")):
+            assert self.predictor.load_model() is False
+
+        assert self.predictor.is_loaded
+        assert self.predictor.model is model_before
+
+    def test_reloader_picks_up_new_version(self):
+        """Test that the reloader swaps in a model when the source version changes"""
+        import asyncio
+        from unittest.mock import patch
+        from app.executor import InferenceExecutor
+        from app.reloader import ModelReloader
+
+        reloader = ModelReloader(self.predictor, InferenceExecutor(self.predictor, mode="inline"), interval=0)
+        assert asyncio.run(reloader.check()) is False
+
+        generation = self.predictor.get_version_info()["generation"]
+        with patch.object(self.predictor, "_local_version", return_value="local-new"):
+            assert asyncio.run(reloader.check()) is True
+
+        assert self.predictor.model_version == "local-new"
+        assert self.predictor.get_version_info()["generation"] == generation + 1
+        assert reloader.get_status()["reloads"] == 1
+
+    def test_forked_worker_skips_startup_check(self):
+        """Test that a pre-forked worker leaves the cached-model check to its parent"""
+        import asyncio
+        from app.executor import InferenceExecutor
+        from app.reloader import ModelReloader
+
+        reloader = ModelReloader(self.predictor, InferenceExecutor(self.predictor, mode="inline"), interval=0)
+        reloader.supervisor_pid = 4242
+
+        async def run():
+            await reloader.start(check_now=True)
+            return reloader.is_running
+
+        assert asyncio.run(run()) is False
+
+    def test_startup_reuses_preloaded_model(self):
+        """Test that app startup keeps a model loaded by the pre-fork parent"""
+        import asyncio
+        from unittest.mock import patch
+        from app.main import app, lifespan
+        from app.predictor import predictor
+
+        predictor.load_model()
+
+        async def run():
+            async with lifespan(app):
+                pass
+
+        with patch.object(predictor, "load_model") as load_model:
+            asyncio.run(run())
+
+        load_model.assert_not_called()
+        assert predictor.is_loaded
+
+
+class TestRegistryArtifactCache:
+    """Integration tests for loading registry models through the artifact cache"""
+
+    def test_file_store_registry_round_trip(self, tmp_path, monkeypatch):
+        """Test download, offline start from the cache and pick-up of a new version"""
+        mlflow = pytest.importorskip("mlflow")
+        import mlflow.sklearn
+        import joblib
+        from unittest.mock import patch
+        import app.predictor as predictor_module
+        from app.artifact_cache import ModelArtifactCache
+        from app.config import MODEL_PATH
+
+        uri = f"file:{tmp_path / 'mlruns'}"
+        name = "grade-predictor-test"
+        monkeypatch.setattr(predictor_module, "MLFLOW_AVAILABLE", True)
+        monkeypatch.setattr(predictor_module, "MLFLOW_TRACKING_URI", uri)
+        monkeypatch.setattr(predictor_module, "MLFLOW_MODEL_NAME", name)
+
+        mlflow.set_tracking_uri(uri)
+        model = joblib.load(MODEL_PATH)
+
+        def register():
+            with mlflow.start_run():
+                mlflow.sklearn.log_model(model, "model", registered_model_name=name)
+
+        def new_predictor():
+            p = predictor_module.GradePredictor()
+            p.artifact_cache = ModelArtifactCache(str(tmp_path / "cache"))
+            return p
+
+        register()
+        first = new_predictor()
+        assert first.load_model()
+        assert first.model_version == "mlflow-1"
+        assert first.from_cache is False
+        assert first.get_artifact_cache_stats()["downloads"] == 1
+
+        # Next start: served from the cache without asking the registry
+        offline = new_predictor()
+        with patch.object(offline, "_latest_registry_version", side_effect=RuntimeError("registry down")):
+            assert offline.load_model()
+        assert offline.from_cache is True
+        assert offline.model_version == "mlflow-1"
+        assert offline.get_artifact_cache_stats()["downloads"] == 0
+
+        register()
+        assert offline.get_available_version() == "mlflow-2"
+        assert offline.load_model()
+        assert offline.model_version == "mlflow-2"
+        assert offline.get_artifact_cache_stats()["current_version"] == "2"
+
+
+class TestModelPool:
+    """Integration tests for serving several model versions in one process"""
+
+    @pytest.fixture
+    def pool(self):
+        from app.executor import InferenceExecutor
+        from app.model_pool import ModelPool
+        from app.predictor import GradePredictor
+
+        primary = GradePredictor()
+        primary.load_model()
+        models_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+        return ModelPool(primary, InferenceExecutor(primary, mode="inline"),
+                         {"a": models_dir, "b": models_dir}, memory_cap_mb=1e-6)
+
+    def test_pinned_versions_load_on_demand_and_evict_lru(self, pool):
+        """Test that pinned versions load lazily and the least recently used is unloaded over the cap"""
+        import asyncio
+        from app.model_pool import PRIMARY_VERSION
+
+        grades = [{course: 70.0 for course in pool.primary.feature_columns}]
+        primary_result = asyncio.run(pool.call(PRIMARY_VERSION, "predict_batch", grades))
+        a_result = asyncio.run(pool.call("a", "predict_batch", grades))
+        assert a_result == primary_result
+
+        asyncio.run(pool.call("b", "predict_batch", grades))
+        stats = pool.get_stats()["versions"]
+        assert stats["a"]["loaded"] is False and stats["a"]["evictions"] == 1
+        assert stats["b"]["loaded"] is True and stats["b"]["requests"] == 1
+        assert stats[PRIMARY_VERSION]["loaded"] is True
+
+        with pytest.raises(KeyError):
+            pool.route("missing")
+
+    def test_canary_and_shadow_routing(self, pool):
+        """Test canary weights and that shadow requests record their difference from the served result"""
+        import asyncio
+        from app.model_pool import PRIMARY_VERSION
+
+        pool.canary = {"a": 1.0}
+        assert pool.route() == ("a", None)
+        pool.canary, pool.shadow_version = {}, "b"
+        assert pool.route() == (PRIMARY_VERSION, "b")
+        assert pool.route("a") == ("a", None)
+
+        grades = [{course: 60.0 for course in pool.primary.feature_columns}]
+
+        async def run():
+            result = await pool.call(PRIMARY_VERSION, "predict_batch", grades)
+            pool.shadow("b", "predict_batch", (grades,), result)
+            await asyncio.gather(*pool._shadow_tasks)
+
+        asyncio.run(run())
+        stats = pool.get_stats()["versions"]["b"]
+        assert stats["shadow_requests"] == 1
+        assert stats["shadow_mean_abs_diff"] == 0.0
+        assert stats["requests"] == 0
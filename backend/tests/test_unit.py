@@ -47,4 +47,532 @@ class TestGradePredictor:
         assert "output_courses" in info
         assert "metrics" in info
         assert "rmse" in info["metrics"]
-        assert "r2" in info["metrics"]
\ No newline at end of file
+        assert "r2" in info["metrics"]
+
+
+class TestMicroBatcher:
+    """Unit tests for the MicroBatcher scheduler"""
+
+    def _fake_predictor(self):
+        fake = MagicMock()
+        fake.predict_batch.side_effect = lambda grades_list: (
+            [{"OUT": grades["IN"] * 2} for grades in grades_list],
+            "Fake"
+        )
+        return fake
+
+    def test_concurrent_requests_share_one_model_call(self):
+        """Test that concurrent requests are merged and each caller gets its own row"""
+        import asyncio
+        from app.batcher import MicroBatcher
+        from app.executor import InferenceExecutor
+
+        fake = self._fake_predictor()
+        batcher = MicroBatcher(InferenceExecutor(fake, mode="inline"), max_batch_size=8, max_wait_ms=50)
+
+        async def run():
+            await batcher.start()
+            try:
+                return await asyncio.gather(*(batcher.predict({"IN": float(i)}) for i in range(5)))
+            finally:
+                await batcher.stop()
+
+        results = asyncio.run(run())
+
+        assert fake.predict_batch.call_count == 1
+        assert [r[0]["OUT"] for r in results] == [0.0, 2.0, 4.0, 6.0, 8.0]
+        stats = batcher.get_stats()
+        assert stats["batches"] == 1
+        assert stats["requests"] == 5
+        assert stats["largest_batch_size"] == 5
+
+    def test_flush_at_max_batch_size(self):
+        """Test that a full batch is flushed without waiting for the timeout"""
+        import asyncio
+        from app.batcher import MicroBatcher
+        from app.executor import InferenceExecutor
+
+        fake = self._fake_predictor()
+        batcher = MicroBatcher(InferenceExecutor(fake, mode="inline"), max_batch_size=2, max_wait_ms=10000)
+
+        async def run():
+            await batcher.start()
+            try:
+                return await asyncio.wait_for(
+                    asyncio.gather(*(batcher.predict({"IN": float(i)}) for i in range(4))),
+                    timeout=5
+                )
+            finally:
+                await batcher.stop()
+
+        results = asyncio.run(run())
+
+        assert len(results) == 4
+        assert fake.predict_batch.call_count == 2
+        assert batcher.get_stats()["queue_depth"] == 0
+
+    def test_stop_during_flush_fails_in_flight_requests(self):
+        """Test that stopping the batcher mid-flush fails the batch instead of leaving callers waiting"""
+        import asyncio
+        from app.batcher import MicroBatcher
+
+        class SlowExecutor:
+            def __init__(self):
+                self.started = asyncio.Event()
+
+            async def predict_batch(self, grades_list):
+                self.started.set()
+                await asyncio.sleep(60)
+
+        async def run():
+            executor = SlowExecutor()
+            batcher = MicroBatcher(executor, max_batch_size=2, max_wait_ms=1)
+            await batcher.start()
+            requests = [asyncio.ensure_future(batcher.predict({"IN": float(i)})) for i in range(2)]
+            await asyncio.wait_for(executor.started.wait(), timeout=5)
+            await batcher.stop()
+            return await asyncio.wait_for(asyncio.gather(*requests, return_exceptions=True), timeout=5)
+
+        results = asyncio.run(run())
+
+        assert all(isinstance(r, RuntimeError) and "stopped" in str(r) for r in results)
+
+
+class TestInferenceExecutor:
+    """Unit tests for the InferenceExecutor"""
+
+    def test_rejects_unknown_mode(self):
+        """Test that an unsupported executor mode is rejected"""
+        from app.executor import InferenceExecutor
+
+        with pytest.raises(ValueError):
+            InferenceExecutor(MagicMock(), mode="gpu")
+
+    def test_thread_mode_runs_off_event_loop(self):
+        """Test that thread mode runs inference outside the event loop thread"""
+        import asyncio
+        import threading
+        from app.executor import InferenceExecutor
+
+        fake = MagicMock()
+        fake.predict_batch.side_effect = lambda grades_list: (
+            [{"thread": threading.current_thread().name}], "Fake"
+        )
+        executor = InferenceExecutor(fake, mode="thread", workers=1)
+        executor.start()
+        try:
+            result, model_name = asyncio.run(executor.predict({"IN": 1.0}))
+        finally:
+            executor.shutdown()
+
+        assert result["thread"].startswith("inference")
+        assert model_name == "Fake"
+
+
+class TestTreeEngine:
+    """Unit tests for the compiled array tree engine"""
+
+    @pytest.fixture
+    def data(self):
+        rng = np.random.default_rng(0)
+        X = rng.uniform(0, 100, size=(200, 6)).round(1)
+        y = np.column_stack([X[:, 0] * 0.5 + X[:, 1], X[:, 2] - X[:, 3], X[:, 4]])
+        return X, y + rng.normal(0, 2, size=y.shape)
+
+    def test_multioutput_random_forest_matches_sklearn(self, data):
+        """Test compiled MultiOutputRegressor(RandomForest) against model.predict"""
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.multioutput import MultiOutputRegressor
+        from app.tree_engine import compile_model
+
+        X, y = data
+        model = MultiOutputRegressor(RandomForestRegressor(n_estimators=10, max_depth=6, random_state=0)).fit(X, y)
+        compiled = compile_model(model)
+
+        assert compiled.n_trees == 30
+        assert compiled.threshold.dtype == np.float32
+        np.testing.assert_allclose(compiled.predict(X), model.predict(X), atol=1e-4)
+
+    def test_native_multioutput_forest_matches_sklearn(self, data):
+        """Test compiled multi-output RandomForest against model.predict"""
+        from sklearn.ensemble import RandomForestRegressor
+        from app.tree_engine import compile_model
+
+        X, y = data
+        model = RandomForestRegressor(n_estimators=10, random_state=0).fit(X, y)
+
+        np.testing.assert_allclose(compile_model(model).predict(X[:1]), model.predict(X[:1]), atol=1e-4)
+
+    def test_xgboost_matches_booster(self, data):
+        """Test compiled MultiOutputRegressor(XGBRegressor) against model.predict"""
+        import xgboost as xgb
+        from sklearn.multioutput import MultiOutputRegressor
+        from app.tree_engine import compile_model
+
+        X, y = data
+        model = MultiOutputRegressor(xgb.XGBRegressor(n_estimators=20, max_depth=4)).fit(X, y)
+
+        np.testing.assert_allclose(compile_model(model).predict(X), model.predict(X), atol=1e-3)
+
+    def test_native_multioutput_xgboost_matches_booster(self, data):
+        """Test compiled vector-leaf XGBRegressor (multi_output_tree) against model.predict"""
+        import xgboost as xgb
+        from app.tree_engine import compile_model
+
+        X, y = data
+        model = xgb.XGBRegressor(n_estimators=20, max_depth=4, tree_method="hist",
+                                 multi_strategy="multi_output_tree").fit(X, y)
+        compiled = compile_model(model)
+
+        assert compiled.n_trees == 20
+        np.testing.assert_allclose(compiled.predict(X), model.predict(X), atol=1e-3)
+
+    def test_unsupported_model_returns_none(self):
+        """Test that models without trees are left to model.predict"""
+        from sklearn.linear_model import LinearRegression
+        from app.tree_engine import compile_model
+
+        model = LinearRegression().fit(np.eye(3), np.arange(3))
+
+        assert compile_model(model) is None
+
+    def test_save_and_memory_mapped_load(self, data, tmp_path):
+        """Test that exported arrays load memory-mapped and predict identically"""
+        from sklearn.ensemble import RandomForestRegressor
+        from app.tree_engine import CompiledEnsemble, compile_model
+
+        X, y = data
+        compiled = compile_model(RandomForestRegressor(n_estimators=5, random_state=0).fit(X, y))
+        compiled.save(str(tmp_path / "arrays"))
+
+        loaded = CompiledEnsemble.load(str(tmp_path / "arrays"), mmap=True)
+
+        assert isinstance(loaded.value, np.memmap)
+        assert compile_model(loaded) is loaded
+        np.testing.assert_array_equal(loaded.predict(X), compiled.predict(X))
+
+    def test_select_trees_and_truncate_depth(self, data):
+        """Test tree pruning against sub-forests and depth capping against sklearn node values"""
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.multioutput import MultiOutputRegressor
+        from app.tree_engine import compile_model, select_trees, truncate_depth
+
+        X, y = data
+        model = MultiOutputRegressor(RandomForestRegressor(n_estimators=8, random_state=0)).fit(X, y)
+        compiled = compile_model(model)
+
+        pruned = select_trees(compiled, 3)
+        expected = np.column_stack([
+            np.mean([tree.predict(X) for tree in est.estimators_[:3]], axis=0) for est in model.estimators_
+        ])
+        assert pruned.n_trees == 9
+        np.testing.assert_allclose(pruned.predict(X), expected, atol=1e-4)
+
+        np.testing.assert_array_equal(truncate_depth(compiled, 100).predict(X), compiled.predict(X))
+
+        shallow = truncate_depth(compiled, 2)
+        expected = []
+        for est in model.estimators_:
+            per_tree = []
+            for tree in est.estimators_:
+                path = tree.decision_path(X).toarray()
+                depth = np.cumsum(path, axis=1)
+                node = np.where(depth <= 3, path, 0).nonzero()
+                deepest = np.zeros(len(X), dtype=int)
+                np.maximum.at(deepest, node[0], node[1])
+                per_tree.append(tree.tree_.value[deepest, 0, 0])
+            expected.append(np.mean(per_tree, axis=0))
+        assert shallow.nbytes < compiled.nbytes
+        np.testing.assert_allclose(shallow.predict(X), np.column_stack(expected), atol=1e-4)
+
+    def test_path_contributions(self, data):
+        """Test path contributions against a manual walk and that they add up to the prediction"""
+        import xgboost as xgb
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.multioutput import MultiOutputRegressor
+        from sklearn.tree import DecisionTreeRegressor
+        from app.tree_engine import PathExplainer, compile_model
+
+        X, y = data
+        tree = DecisionTreeRegressor(max_depth=5, random_state=0).fit(X, y[:, 0])
+        contributions, _ = PathExplainer(compile_model(tree)).explain(X[:10])
+        expected = np.zeros((10, X.shape[1]))
+        for i in range(10):
+            path = tree.decision_path(X[i:i + 1]).indices
+            value = tree.tree_.value[:, 0, 0]
+            for parent, child in zip(path[:-1], path[1:]):
+                expected[i, tree.tree_.feature[parent]] += value[child] - value[parent]
+        np.testing.assert_allclose(contributions[:, 0, :], expected, atol=1e-3)
+
+        for model in (MultiOutputRegressor(RandomForestRegressor(n_estimators=5, random_state=0)).fit(X, y),
+                      MultiOutputRegressor(xgb.XGBRegressor(n_estimators=10, max_depth=3)).fit(X, y)):
+            explainer = PathExplainer(compile_model(model))
+            contributions, raw = explainer.explain(X)
+
+            assert contributions.shape == (len(X), 3, X.shape[1])
+            reconstructed = explainer.expected_value + contributions.sum(axis=2)
+            np.testing.assert_allclose(reconstructed, model.predict(X), atol=1e-3)
+
+
+class TestPredictionCache:
+    """Unit tests for the PredictionCache"""
+
+    def test_lru_eviction_and_counters(self):
+        """Test that the least recently used entry is evicted first"""
+        from app.cache import PredictionCache
+
+        cache = PredictionCache(maxsize=2)
+        keys = [cache.make_key(1, np.array([float(i)])) for i in range(3)]
+
+        cache.put(keys[0], np.array([0.0]))
+        cache.put(keys[1], np.array([1.0]))
+        assert cache.get(keys[0]) is not None
+        cache.put(keys[2], np.array([2.0]))
+
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[2])[0] == 2.0
+        stats = cache.get_stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+        assert stats["evictions"] == 1
+        assert stats["size"] == 2
+
+    def test_generation_is_part_of_key(self):
+        """Test that the same vector under a different model generation misses"""
+        from app.cache import PredictionCache
+
+        cache = PredictionCache(maxsize=8)
+        vector = np.array([70.0, 80.0])
+        cache.put(cache.make_key(1, vector), np.array([1.0]))
+
+        assert cache.get(cache.make_key(2, vector)) is None
+
+    def test_ttl_expiry(self):
+        """Test that expired entries are dropped"""
+        from app.cache import PredictionCache
+
+        cache = PredictionCache(maxsize=8, ttl=0.01)
+        key = cache.make_key(1, np.array([1.0]))
+        cache.put(key, np.array([1.0]))
+
+        with patch("app.cache.time.monotonic", return_value=1e12):
+            assert cache.get(key) is None
+        assert cache.get_stats()["expirations"] == 1
+
+
+class TestFeatureStore:
+    """Unit tests for the memory-mapped student feature store"""
+
+    def test_string_ids_round_trip(self, tmp_path):
+        """Test that object-dtype string IDs are saved memory-mappable and found again"""
+        from app.feature_store import FeatureStore, save_feature_store
+
+        admi = np.array(["B2", "A1", "C30"], dtype=object)
+        features = np.arange(6, dtype=np.float64).reshape(3, 2)
+        save_feature_store(str(tmp_path), admi, features, ["G2023", "unknown", "G2023"], ["X", "Y"])
+
+        store = FeatureStore(str(tmp_path))
+        assert store.load()
+        assert store.admi.dtype.kind == "U"
+        row = store.row("B2")
+        assert list(store.features[row]) == [0.0, 1.0]
+        assert store.cohort_of(store.row("A1")) == "unknown"
+        assert store.row("Z9") is None
+        assert len(store.cohort_rows("all")) == 3
+
+
+class TestStreamingParser:
+    """Unit tests for the incremental NDJSON/CSV parser"""
+
+    @staticmethod
+    def _collect(chunks, fmt, max_line_bytes=0):
+        import asyncio
+        from app.streaming import iter_records
+
+        async def stream():
+            for chunk in chunks:
+                yield chunk
+
+        async def run():
+            return [record async for record in iter_records(stream(), fmt, max_line_bytes)]
+
+        return asyncio.run(run())
+
+    def test_lines_split_across_chunks(self):
+        """Test that rows split across body chunks are reassembled"""
+        records = self._collect([b'{"id": "a", "M1100": 7', b'0}\n{"id": "b", "M1100": 80}'], "ndjson")
+
+        assert [(r[1], r[2]) for r in records] == [("a", {"M1100": 70.0}), ("b", {"M1100": 80.0})]
+
+    def test_csv_blank_cells_and_bad_rows(self):
+        """Test that blank CSV cells are omitted and malformed rows carry an error"""
+        records = self._collect([b"admi,M1100,M1101\r\n1,70,\r\n2,abc,60\r\n"], "csv")
+
+        assert records[0][1:] == ("1", {"M1100": 70.0}, None)
+        assert records[1][3] is not None
+
+    def test_invalid_utf8_fails_only_its_row(self):
+        """Test that undecodable bytes yield an error record and parsing continues"""
+        records = self._collect([b'{"id": "a", "M1100": 70}\n{"id": "\xff"}\n{"id": "c", "M1100": 80}\n'], "ndjson")
+
+        assert [r[0] for r in records] == [1, 2, 3]
+        assert "utf-8" in records[1][3]
+        assert records[2][1:] == ("c", {"M1100": 80.0}, None)
+
+    def test_huge_line_is_dropped_with_an_error(self):
+        """Test that a row over the line limit is discarded as it streams in and reported on its own"""
+        huge = [b'{"id": "big", "M1100": "'] + [b"9" * 4096] * 64 + [b'"}\n{"id": "c", "M1100": 80}\n']
+        records = self._collect([b'{"id": "a", "M1100": 70}\n'] + huge, "ndjson", max_line_bytes=1024)
+
+        assert [r[0] for r in records] == [1, 2, 3]
+        assert records[0][1:] == ("a", {"M1100": 70.0}, None)
+        assert "exceeds 1024 bytes" in records[1][3]
+        assert records[2][1:] == ("c", {"M1100": 80.0}, None)
+
+
+class TestMetrics:
+    """Unit tests for the Prometheus metrics registry"""
+
+    def test_render_counter_and_histogram(self):
+        """Test the text exposition format for labelled counters and histograms"""
+        from app.metrics import Counter, Histogram, Registry
+
+        registry = Registry()
+        counter = Counter("test_total", "A counter", ["path"], registry=registry)
+        histogram = Histogram("test_seconds", "A histogram", ["stage"], buckets=(0.1, 1.0), registry=registry)
+
+        counter.inc(path="/predict")
+        counter.inc(2, path="/predict")
+        histogram.observe(0.05, stage="predict")
+        histogram.observe(0.5, stage="predict")
+
+        text = registry.render()
+        assert "# TYPE test_total counter" in text
+        assert 'test_total{path="/predict"} 3.0' in text
+        assert 'test_seconds_bucket{stage="predict",le="0.1"} 1.0' in text
+        assert 'test_seconds_bucket{stage="predict",le="1.0"} 2.0' in text
+        assert 'test_seconds_bucket{stage="predict",le="+Inf"} 2.0' in text
+        assert 'test_seconds_count{stage="predict"} 2.0' in text
+
+
+class TestAdmissionController:
+    """Unit tests for inference admission control"""
+
+    def test_queue_full_and_deadline_rejections(self):
+        """Test that excess requests queue, then get 429 (queue full) or 503 (deadline)"""
+        import asyncio
+        from app.admission import AdmissionController, AdmissionRejected
+
+        admission = AdmissionController(max_in_flight=1, max_queue=1, deadline_ms=50)
+
+        async def run():
+            await admission.acquire()
+            waiting = asyncio.ensure_future(admission.acquire())
+            await asyncio.sleep(0)
+            assert admission.queue_depth == 1
+
+            with pytest.raises(AdmissionRejected) as full:
+                await admission.acquire()
+            with pytest.raises(AdmissionRejected) as late:
+                await waiting
+            return full.value, late.value
+
+        full, late = asyncio.run(run())
+
+        assert full.status_code == 429 and full.reason == "queue_full"
+        assert late.status_code == 503 and late.reason == "deadline"
+        assert full.retry_after >= 1
+        stats = admission.get_stats()
+        assert stats["in_flight"] == 1 and stats["queue_depth"] == 0
+        assert stats["rejected_queue_full"] == 1 and stats["rejected_deadline"] == 1
+
+    def test_queue_wait_excluded_from_validation_stage(self):
+        """Test that time queued for a slot is taken out of the validation stage"""
+        from types import SimpleNamespace
+        from app.metrics import mark_admitted
+
+        request = SimpleNamespace(state=SimpleNamespace(metrics_start=100.0))
+        mark_admitted(request, 2.5)
+
+        assert request.state.metrics_start == 102.5
+
+    def test_slot_handed_to_oldest_waiter(self):
+        """Test that a released slot goes to the queued requests in arrival order"""
+        import asyncio
+        from app.admission import AdmissionController
+
+        admission = AdmissionController(max_in_flight=1, max_queue=4, deadline_ms=5000)
+        order = []
+
+        async def request(i):
+            async with admission.slot():
+                order.append(i)
+                await asyncio.sleep(0.01)
+
+        async def run():
+            await asyncio.gather(*(request(i) for i in range(4)))
+
+        asyncio.run(run())
+
+        assert order == [0, 1, 2, 3]
+        stats = admission.get_stats()
+        assert stats["in_flight"] == 0 and stats["admitted"] == 4 and stats["queued"] == 3
+        assert stats["avg_hold_ms"] > 0
+
+
+class TestModelArtifactCache:
+    """Unit tests for the registry artifact cache"""
+
+    def _downloader(self, content, calls):
+        def download(dst):
+            calls.append(dst)
+            with open(os.path.join(dst, "MLmodel"), "w") as f:
+                f.write(content)
+            return dst
+        return download
+
+    def test_download_once_then_hit(self, tmp_path):
+        """Test that a version is downloaded once, then served from the cache"""
+        from app.artifact_cache import ModelArtifactCache
+
+        cache = ModelArtifactCache(str(tmp_path))
+        calls = []
+
+        path, seconds = cache.fetch("model", "1", self._downloader("v1", calls))
+        again, again_seconds = cache.fetch("model", "1", self._downloader("v1", calls))
+
+        assert len(calls) == 1
+        assert seconds is not None and again_seconds is None
+        assert again == path
+        assert open(os.path.join(path, "MLmodel")).read() == "v1"
+        assert os.listdir(tmp_path / "tmp") == []
+        assert cache.get_stats()["hits"] == 1 and cache.get_stats()["misses"] == 1
+
+    def test_identical_versions_share_a_blob_and_prune(self, tmp_path):
+        """Test content addressing, the current pointer and pruning of old versions"""
+        from app.artifact_cache import ModelArtifactCache
+
+        cache = ModelArtifactCache(str(tmp_path), keep=1)
+        calls = []
+        first, _ = cache.fetch("model", "1", self._downloader("same", calls))
+        second, _ = cache.fetch("model", "2", self._downloader("same", calls))
+        third, _ = cache.fetch("model", "3", self._downloader("new", calls))
+        assert first == second != third
+
+        cache.set_current("model", "3")
+        cache.prune("model")
+
+        assert cache.current("model") == "3"
+        assert [v["version"] for v in cache.versions("model")] == ["3"]
+        assert cache.lookup("model", "1") is None
+        assert cache.lookup("model", "3") == third
+
+    def test_unwritable_root_is_detected(self, tmp_path):
+        """Test that a cache root that cannot be created is reported as not writable"""
+        from app.artifact_cache import is_writable
+
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+
+        assert is_writable(str(tmp_path / "cache"))
+        assert not is_writable(str(blocker / "cache"))
@@ -0,0 +1,221 @@
+"""
+Latency / throughput benchmarks for the serving path, run against the local model artifacts
+Saves machine-readable results and can compare them against a saved baseline
+
+Examples:
+    python scripts/benchmark_serving.py --save benchmarks/baseline.json
+    python scripts/benchmark_serving.py --compare benchmarks/baseline.json --threshold 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+# Benchmarks measure the model path, not the cache or the hot-reload poller
+os.environ.setdefault('PREDICTION_CACHE_SIZE', '0')
+os.environ.setdefault('MODEL_RELOAD_INTERVAL', '0')
+
+# Metric name suffix -> whether larger values are better
+HIGHER_IS_BETTER = {
+    'rows_per_sec': True,
+    'requests_per_sec': True,
+    '_ms': False,
+    '_mb': False,
+}
+
+MEMORY_PROBE = r"""
+import resource
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+before = rss_mb()
+from app.predictor import predictor
+predictor.load_model()
+predictor.predict({c: 70.0 for c in predictor.feature_columns})
+after = rss_mb()
+print(before, after, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+"""
+
+
+def percentiles(samples):
+    ms = np.asarray(samples) * 1000
+    return {
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p95_ms': float(np.percentile(ms, 95)),
+        'p99_ms': float(np.percentile(ms, 99)),
+    }
+
+
+def random_students(feature_columns, n, seed):
+    rng = np.random.default_rng(seed)
+    grades = rng.uniform(30, 100, size=(n, len(feature_columns))).round(2)
+    return [dict(zip(feature_columns, row)) for row in grades.tolist()]
+
+
+def bench_single(predictor, iterations):
+    students = random_students(predictor.feature_columns, iterations, seed=1)
+    predictor.predict(students[0])
+    timings = []
+    for grades in students:
+        start = time.perf_counter()
+        predictor.predict(grades)
+        timings.append(time.perf_counter() - start)
+    return percentiles(timings)
+
+
+def bench_batches(predictor, batch_sizes, min_seconds):
+    results = {}
+    for size in batch_sizes:
+        students = random_students(predictor.feature_columns, size, seed=size)
+        predictor.predict_batch(students)
+        rows, start = 0, time.perf_counter()
+        while time.perf_counter() - start < min_seconds:
+            predictor.predict_batch(students)
+            rows += size
+        results[f'batch_{size}.rows_per_sec'] = rows / (time.perf_counter() - start)
+    return results
+
+
+async def bench_asgi(requests, concurrency):
+    import httpx
+    from app.main import app
+    from app.predictor import predictor
+
+    async with app.router.lifespan_context(app):
+        students = random_students(predictor.feature_columns, requests, seed=3)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+            await client.post('/predict', json={'grades': students[0]})
+            semaphore = asyncio.Semaphore(concurrency)
+            timings = []
+
+            async def one(grades):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post('/predict', json={'grades': grades})
+                    timings.append(time.perf_counter() - start)
+                    response.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one(grades) for grades in students))
+            elapsed = time.perf_counter() - start
+
+    return {**percentiles(timings), 'requests_per_sec': requests / elapsed}
+
+
+def bench_memory():
+    out = subprocess.run(
+        [sys.executable, '-c', MEMORY_PROBE], cwd=BACKEND_DIR,
+        capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1]
+    before, after, peak = map(float, out.split())
+    return {'rss_baseline_mb': before, 'rss_loaded_mb': after, 'model_rss_mb': after - before, 'peak_rss_mb': peak}
+
+
+def run(args):
+    from app.predictor import GradePredictor
+    import sklearn
+
+    predictor = GradePredictor()
+    if not predictor.load_model():
+        sys.exit("[ERROR] Could not load the model")
+
+    results = {}
+    print("[INFO] Single-row predict latency...")
+    results.update({f'predict_single.{k}': v for k, v in bench_single(predictor, args.iterations).items()})
+    print("[INFO] Batch throughput...")
+    results.update(bench_batches(predictor, args.batch_sizes, args.min_seconds))
+    for concurrency in args.concurrency:
+        print(f"[INFO] ASGI /predict at concurrency {concurrency}...")
+        asgi = asyncio.run(bench_asgi(args.requests, concurrency))
+        results.update({f'asgi_c{concurrency}.{k}': v for k, v in asgi.items()})
+    print("[INFO] Memory per worker...")
+    results.update({f'memory.{k}': v for k, v in bench_memory().items()})
+
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'sklearn': sklearn.__version__,
+            'cpu_count': os.cpu_count(),
+            'model_name': predictor.model_name,
+            'model_version': predictor.model_version,
+            'compiled_inference': predictor.compiled is not None,
+        },
+        'results': results,
+    }
+
+
+def higher_is_better(metric):
+    for suffix, higher in HIGHER_IS_BETTER.items():
+        if metric.endswith(suffix):
+            return higher
+    return False
+
+
+def compare(current, baseline, threshold):
+    """Print a comparison table and return the metrics that regressed beyond the threshold."""
+    regressions = []
+    print(f"\n{'Metric':<36} {'Baseline':<12} {'Current':<12} {'Change':<10}")
+    print("-" * 72)
+    for metric, value in current['results'].items():
+        base = baseline['results'].get(metric)
+        if base is None or base == 0:
+            continue
+        change = (value - base) / abs(base)
+        worse = -change if higher_is_better(metric) else change
+        # Interpreter RSS before the model import is reported for context only
+        flagged = worse > threshold and metric != 'memory.rss_baseline_mb'
+        if flagged:
+            regressions.append(metric)
+        print(f"{metric:<36} {base:<12.3f} {value:<12.3f} {change:+.1%}{'  REGRESSION' if flagged else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the prediction serving path")
+    parser.add_argument('--iterations', type=int, default=500, help="single-row predict calls")
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 8, 64, 512, 4096])
+    parser.add_argument('--min-seconds', type=float, default=1.0, help="minimum run time per batch size")
+    parser.add_argument('--requests', type=int, default=500, help="ASGI requests per concurrency level")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16])
+    parser.add_argument('--save', help="write results JSON to this path")
+    parser.add_argument('--compare', help="baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2, help="relative slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    current = run(args)
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or '.', exist_ok=True)
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"[OK] Results saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n[FAIL] {len(regressions)} metric(s) regressed by more than {args.threshold:.0%}: "
+                  f"{', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n[OK] No regressions beyond {args.threshold:.0%}")
+    else:
+        print(json.dumps(current['results'], indent=2))
+
+
+if __name__ == '__main__':
+    main()
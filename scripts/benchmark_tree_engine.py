@@ -0,0 +1,78 @@
+"""
+Compare the compiled array tree engine against model.predict
+Checks that both give the same outputs and times single-row and batch inputs
+"""
+import joblib
+import numpy as np
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from app.config import COMPILED_INFERENCE_MAX_ROWS  # noqa: E402
+from app.tree_engine import compile_model  # noqa: E402
+
+
+def time_call(fn, X, repeats):
+    fn(X)
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    model_path = os.getenv('MODEL_PATH', 'backend/models/best_model.pkl')
+    print(f"[INFO] Loading model from {model_path}")
+    model = joblib.load(model_path)
+
+    start = time.perf_counter()
+    compiled = compile_model(model)
+    compile_time = time.perf_counter() - start
+    if compiled is None:
+        print("[ERROR] Model type is not supported by the tree engine")
+        return
+
+    print(f"[OK] Compiled {compiled.n_trees} trees, {len(compiled.feature)} nodes, "
+          f"{compiled.nbytes / 1024:.1f} KB in {compile_time * 1000:.1f} ms")
+
+    rng = np.random.default_rng(42)
+    X = rng.uniform(0, 100, size=(4096, compiled.n_features)).round(2)
+    if os.path.exists('data/processed/test.csv'):
+        import pandas as pd
+        feature_columns = joblib.load('backend/models/feature_columns.pkl')
+        X = np.vstack([pd.read_csv('data/processed/test.csv')[feature_columns].to_numpy(), X])
+
+    diff = np.abs(np.asarray(model.predict(X)) - compiled.predict(X)).max()
+    print(f"[OK] Max abs difference vs model.predict over {len(X)} rows: {diff:.2e}")
+
+    if len(X) < 16384:
+        X = np.vstack([X, rng.uniform(0, 100, size=(16384 - len(X), compiled.n_features)).round(2)])
+
+    print(f"\n{'Batch':<8} {'sklearn (ms)':<14} {'compiled (ms)':<15} {'Speedup':<8}")
+    print("-" * 48)
+    crossover, faster_up_to = None, 0
+    for batch_size in [1, 8, 64, 512, 1024, 2048, 4096, 8192, 16384]:
+        batch = X[:batch_size]
+        repeats = 50 if batch_size <= 64 else 10 if batch_size <= 4096 else 3
+        base = time_call(model.predict, batch, repeats)
+        fast = time_call(compiled.predict, batch, repeats)
+        print(f"{batch_size:<8} {base * 1000:<14.3f} {fast * 1000:<15.3f} {base / fast:<8.1f}x")
+        if crossover is None:
+            if fast >= base:
+                crossover = batch_size
+            else:
+                faster_up_to = batch_size
+
+    if crossover is None:
+        print("\n[OK] Compiled engine is faster at every batch size; COMPILED_INFERENCE_MAX_ROWS=0 (no limit)")
+    else:
+        print(f"\n[INFO] model.predict catches up at {crossover} rows; "
+              f"set COMPILED_INFERENCE_MAX_ROWS={faster_up_to} (currently {COMPILED_INFERENCE_MAX_ROWS})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Compare the single-process server with the pre-fork multi-worker mode (app/serve.py)
+Starts the server for each worker count, drives /predict from separate client processes
+and reports total throughput plus per-worker RSS / PSS / shared memory from /proc
+
+Examples:
+    python scripts/benchmark_workers.py --workers 1 4
+    python scripts/benchmark_workers.py --workers 1 2 4 --clients 16 --duration 20 --save workers.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_healthy(url, process, timeout=120):
+    import httpx
+
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            sys.exit(f"[ERROR] Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).json().get('model_loaded'):
+                return
+        except Exception:
+            pass
+        time.sleep(0.5)
+    sys.exit("[ERROR] Server did not become healthy")
+
+
+def client(args):
+    """One load-generating process: sequential keep-alive requests for `duration` seconds"""
+    import httpx
+
+    url, feature_columns, duration, seed = args
+    rng = np.random.default_rng(seed)
+    latencies = []
+    with httpx.Client(base_url=url, timeout=30) as http:
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            grades = dict(zip(feature_columns, rng.uniform(30, 100, len(feature_columns)).round(2).tolist()))
+            start = time.perf_counter()
+            http.post('/predict', json={'grades': grades}).raise_for_status()
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def memory(pid):
+    """RSS, PSS and shared/private totals in MB from /proc/<pid>/smaps_rollup"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss_mb': values.get('Rss', 0.0),
+        'pss_mb': values.get('Pss', 0.0),
+        'shared_mb': values.get('Shared_Clean', 0.0) + values.get('Shared_Dirty', 0.0),
+        'private_mb': values.get('Private_Clean', 0.0) + values.get('Private_Dirty', 0.0),
+    }
+
+
+def worker_pids(parent_pid):
+    with open(f'/proc/{parent_pid}/task/{parent_pid}/children') as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def run(workers, clients, duration):
+    import httpx
+
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        'SERVER_WORKERS': str(workers),
+        'SERVER_HOST': '127.0.0.1',
+        'SERVER_PORT': str(port),
+        'MODEL_RELOAD_INTERVAL': '0',
+        'PREDICTION_CACHE_SIZE': '0',
+    }
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'app.serve'], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_healthy(url, server)
+        feature_columns = httpx.get(f"{url}/courses/input").json()['courses']
+
+        with Pool(clients) as pool:
+            start = time.perf_counter()
+            results = pool.map(client, [(url, feature_columns, duration, seed) for seed in range(clients)])
+            elapsed = time.perf_counter() - start
+
+        # Single-process mode serves from the launched process itself
+        pids = worker_pids(server.pid) if workers > 1 else [server.pid]
+        per_worker = [memory(pid) for pid in pids]
+        parent = memory(server.pid) if workers > 1 else None
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+    latencies = np.concatenate([np.asarray(r) for r in results]) * 1000
+    total_pss = sum(m['pss_mb'] for m in per_worker) + (parent['pss_mb'] if parent else 0.0)
+    return {
+        'workers': workers,
+        'requests': int(len(latencies)),
+        'requests_per_sec': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'worker_rss_mb': float(np.mean([m['rss_mb'] for m in per_worker])),
+        'worker_pss_mb': float(np.mean([m['pss_mb'] for m in per_worker])),
+        'worker_shared_mb': float(np.mean([m['shared_mb'] for m in per_worker])),
+        'worker_private_mb': float(np.mean([m['private_mb'] for m in per_worker])),
+        'parent_pss_mb': parent['pss_mb'] if parent else None,
+        'total_pss_mb': total_pss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-process vs pre-fork multi-worker serving")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 2])
+    parser.add_argument('--clients', type=int, default=8, help="load-generating client processes")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds of load per configuration")
+    parser.add_argument('--save', help="write results JSON to this path")
+    args = parser.parse_args()
+
+    rows = []
+    for workers in args.workers:
+        print(f"[INFO] {workers} worker(s): {args.clients} clients for {args.duration:.0f}s...")
+        rows.append(run(workers, args.clients, args.duration))
+
+    print(f"\n{'Workers':<9} {'Req/s':<10} {'p50 ms':<9} {'p99 ms':<9} {'RSS/w MB':<10} "
+          f"{'PSS/w MB':<10} {'Shared/w MB':<12} {'Total PSS MB':<12}")
+    print("-" * 85)
+    for row in rows:
+        print(f"{row['workers']:<9} {row['requests_per_sec']:<10.0f} {row['p50_ms']:<9.2f} {row['p99_ms']:<9.2f} "
+              f"{row['worker_rss_mb']:<10.1f} {row['worker_pss_mb']:<10.1f} {row['worker_shared_mb']:<12.1f} "
+              f"{row['total_pss_mb']:<12.1f}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            summary = {'cpu_count': os.cpu_count(), 'clients': args.clients, 'duration': args.duration, 'results': rows}
+            json.dump(summary, f, indent=2)
+        print(f"\n[OK] Results saved to {args.save}")
+
+
+if __name__ == '__main__':
+    main()
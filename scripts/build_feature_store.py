@@ -0,0 +1,70 @@
+"""
+Build the API's student feature store from the prepared datasets
+Writes every student's S1-S4 grade vector (already imputed by prepare_data) as
+memory-mappable arrays indexed by admi, tagged with the student's cohort when
+cohort partitions exist (scripts/ingest_cohorts.py), otherwise with "unknown"
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+
+def student_cohorts(manifest_path):
+    """admi -> cohort name from the ingested partitions, if any"""
+    if not os.path.exists(manifest_path):
+        return {}
+    from convert_data import read_cache
+
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    cohorts = {}
+    for cohort, entry in sorted(manifest['cohorts'].items()):
+        for admi in read_cache(entry['grades'])['admi'].tolist():
+            cohorts.setdefault(admi, cohort)
+    return cohorts
+
+
+def main():
+    from app.feature_store import UNKNOWN_COHORT, save_feature_store
+
+    parser = argparse.ArgumentParser(description="Build the student feature store served by the API")
+    parser.add_argument('--data-dir', default='data/processed')
+    parser.add_argument('--metadata', default='models/model_metadata.json')
+    parser.add_argument('--manifest', default='data/partitions/manifest.json')
+    parser.add_argument('--output', default='models/feature_store')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open(args.metadata, 'r') as f:
+        input_courses = json.load(f)['input_courses']
+
+    data = pd.concat([
+        pd.read_csv(os.path.join(args.data_dir, 'train.csv')),
+        pd.read_csv(os.path.join(args.data_dir, 'test.csv')),
+    ]).drop_duplicates(subset='admi')
+
+    cohorts = student_cohorts(args.manifest)
+    labels = [str(cohorts.get(admi, UNKNOWN_COHORT)) for admi in data['admi'].tolist()]
+    features = data.reindex(columns=input_courses).fillna(50.0).to_numpy()
+
+    save_feature_store(args.output, data['admi'].to_numpy(), features, labels, input_courses)
+
+    print(f"\n{'='*50}")
+    print("Feature store built")
+    print(f"{'='*50}")
+    print(f"Students: {len(data)}")
+    print(f"Cohorts: {', '.join(sorted(set(labels)))}")
+    print(f"Features: {len(input_courses)}")
+    print(f"Output: {args.output}")
+    print(f"Elapsed: {time.perf_counter() - start:.2f}s")
+    print(f"{'='*50}\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Compact the trained model within an accuracy budget
+Builds smaller variants of the tree ensemble as float32 arrays (see backend/app/tree_engine.py):
+  --trees      keep the first N trees of every target
+  --max-depth  cap every tree at depth D (cut nodes predict their stored mean)
+  --distill    fit a single multi-output Random Forest ("trees:depth") on the model's predictions
+and reports artifact size, load time, predict latency and the RMSE/R2 change against the
+pickled model's own test score. Every variant is saved as an arrays directory servable with MODEL_FORMAT=arrays
+
+Example:
+    python scripts/compact_model.py --trees 25 50 100 --max-depth 8 10 --distill 50:12 --max-r2-drop 0.01
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from app.tree_engine import CompiledEnsemble, compile_model, select_trees, truncate_depth
+
+
+def directory_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def serve(predictions):
+    """Post-process like the API does"""
+    return np.round(np.clip(np.asarray(predictions), 0, 100), 2)
+
+
+def measure(name, path, load, X_test, y_test, iterations):
+    start = time.perf_counter()
+    model = load(path)
+    model.predict(X_test[:1])
+    load_ms = (time.perf_counter() - start) * 1000
+
+    timings = []
+    for i in range(iterations):
+        row = X_test[i % len(X_test)][None, :]
+        start = time.perf_counter()
+        model.predict(row)
+        timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    predictions = serve(model.predict(X_test))
+    batch_seconds = time.perf_counter() - start
+
+    rmse = float(np.sqrt(mean_squared_error(y_test, predictions)))
+    r2 = float(r2_score(y_test, predictions))
+    return {
+        'variant': name,
+        'path': path,
+        'size_mb': directory_size(path) / 1e6,
+        'load_ms': load_ms,
+        'predict_p50_ms': float(np.median(timings) * 1000),
+        'batch_rows_per_sec': len(X_test) / batch_seconds,
+        'rmse': rmse,
+        'r2': r2,
+    }
+
+
+def distill(teacher, X_train, n_trees, max_depth, augment, noise, random_state):
+    """Fit one multi-output forest to the teacher's predictions on jittered copies of the training rows"""
+    rng = np.random.default_rng(random_state)
+    copies = [X_train] + [np.clip(X_train + rng.normal(0, noise, X_train.shape), 0, 100) for _ in range(augment)]
+    X = np.vstack(copies)
+    student = RandomForestRegressor(n_estimators=n_trees, max_depth=max_depth, n_jobs=-1, random_state=random_state)
+    student.fit(X, teacher.predict(X))
+    return compile_model(student)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the tree ensemble and report size/speed/accuracy")
+    parser.add_argument('--model', default='backend/models/best_model.pkl')
+    parser.add_argument('--metadata', default='backend/models/model_metadata.json')
+    parser.add_argument('--data-dir', default='data/processed')
+    parser.add_argument('--output-dir', default='backend/models/compact')
+    parser.add_argument('--trees', type=int, nargs='*', default=[])
+    parser.add_argument('--max-depth', type=int, nargs='*', default=[])
+    parser.add_argument('--distill', nargs='*', default=[], help="student forests as trees:depth")
+    parser.add_argument('--distill-augment', type=int, default=4, help="jittered copies of the training rows")
+    parser.add_argument('--distill-noise', type=float, default=5.0, help="std of the jitter in grade points")
+    parser.add_argument('--max-r2-drop', type=float, default=0.01)
+    parser.add_argument('--max-rmse-increase', type=float, default=0.1)
+    parser.add_argument('--iterations', type=int, default=200, help="single-row predictions timed per variant")
+    parser.add_argument('--random-state', type=int, default=42)
+    args = parser.parse_args()
+
+    with open(args.metadata, 'r') as f:
+        metadata = json.load(f)
+    input_courses, output_courses = metadata['input_courses'], metadata['output_courses']
+
+    train = pd.read_csv(os.path.join(args.data_dir, 'train.csv'))
+    test = pd.read_csv(os.path.join(args.data_dir, 'test.csv'))
+    X_train = train[input_courses].to_numpy(dtype=np.float64)
+    X_test = test[input_courses].to_numpy(dtype=np.float64)
+    y_test = test[output_courses].to_numpy(dtype=np.float64)
+
+    compiled = compile_model(joblib.load(args.model))
+    if compiled is None:
+        sys.exit("[ERROR] Model type is not supported by the tree engine")
+
+    variants = {'arrays': compiled}
+    for n_trees in args.trees:
+        variants[f'trees{n_trees}'] = select_trees(compiled, n_trees)
+    for depth in args.max_depth:
+        variants[f'depth{depth}'] = truncate_depth(compiled, depth)
+        for n_trees in args.trees:
+            variants[f'trees{n_trees}_depth{depth}'] = truncate_depth(variants[f'trees{n_trees}'], depth)
+    for spec in args.distill:
+        n_trees, depth = (int(v) for v in spec.split(':'))
+        print(f"[INFO] Distilling into {n_trees} trees of depth {depth}...")
+        variants[f'distill{n_trees}_depth{depth}'] = distill(
+            compiled, X_train, n_trees, depth, args.distill_augment, args.distill_noise, args.random_state
+        )
+
+    if os.path.exists(args.output_dir):
+        shutil.rmtree(args.output_dir)
+    os.makedirs(args.output_dir)
+
+    # The deployed pickle scored on this same test split is the baseline; the metadata's
+    # scores are rewritten by search.py and evaluate.py and need not describe this file
+    rows = [measure('pickle', args.model, joblib.load, X_test, y_test, args.iterations)]
+    baseline = {'rmse': rows[0]['rmse'], 'r2': rows[0]['r2']}
+    print(f"[INFO] Baseline (pickled model on the test split): RMSE {baseline['rmse']:.4f}, R2 {baseline['r2']:.4f}")
+    for name, ensemble in variants.items():
+        path = os.path.join(args.output_dir, name)
+        ensemble.save(path)
+        rows.append(measure(name, path, CompiledEnsemble.load, X_test, y_test, args.iterations))
+
+    for row in rows:
+        row['delta_rmse'] = row['rmse'] - baseline['rmse']
+        row['delta_r2'] = row['r2'] - baseline['r2']
+        row['within_budget'] = bool(-row['delta_r2'] <= args.max_r2_drop
+                                    and row['delta_rmse'] <= args.max_rmse_increase)
+
+    print(f"\n{'Variant':<22} {'Size MB':<9} {'Load ms':<9} {'p50 ms':<8} {'Rows/s':<10} "
+          f"{'RMSE':<8} {'dRMSE':<8} {'R2':<8} {'dR2':<8} {'OK':<3}")
+    print("-" * 100)
+    for row in rows:
+        print(f"{row['variant']:<22} {row['size_mb']:<9.2f} {row['load_ms']:<9.1f} {row['predict_p50_ms']:<8.3f} "
+              f"{row['batch_rows_per_sec']:<10.0f} {row['rmse']:<8.4f} {row['delta_rmse']:<+8.4f} "
+              f"{row['r2']:<8.4f} {row['delta_r2']:<+8.4f} {'yes' if row['within_budget'] else 'no':<3}")
+
+    with open(os.path.join(args.output_dir, 'report.json'), 'w') as f:
+        json.dump({'baseline': baseline, 'max_r2_drop': args.max_r2_drop,
+                   'max_rmse_increase': args.max_rmse_increase, 'variants': rows}, f, indent=2)
+
+    candidates = [row for row in rows if row['within_budget'] and row['variant'] != 'pickle']
+    if candidates:
+        best = min(candidates, key=lambda row: row['size_mb'])
+        print(f"\n[OK] Smallest variant within budget: {best['variant']} ({best['size_mb']:.2f} MB)")
+        print(f"     Serve it with MODEL_FORMAT=arrays MODEL_ARRAYS_PATH={os.path.abspath(best['path'])}")
+    else:
+        print("\n[WARN] No compacted variant is within the accuracy budget")
+
+
+if __name__ == '__main__':
+    main()
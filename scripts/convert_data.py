@@ -0,0 +1,70 @@
+"""
+Convert the long-format grades workbook into a typed columnar cache
+Parsing the Excel file dominates data preparation; the cache stores the same
+rows as Parquet with categorical course/semester codes and loads in a fraction
+of the time. Falls back to a pandas pickle when pyarrow is not installed.
+"""
+import importlib.util
+import os
+import time
+
+import pandas as pd
+
+SOURCE_PATH = 'data/cleaned_data.xlsx'
+CACHE_DIR = 'data/cache'
+GRADE_COLUMNS = ['admi', 'code', 'simester', 'note']
+
+PARQUET_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+CACHE_EXT = '.parquet' if PARQUET_AVAILABLE else '.pkl'
+CACHE_PATH = os.path.join(CACHE_DIR, f'grades{CACHE_EXT}')
+
+
+def to_typed(df):
+    """Keep the grade columns with compact dtypes: categorical codes, float grades"""
+    df = df[GRADE_COLUMNS].copy()
+    df['code'] = df['code'].astype('category')
+    df['simester'] = df['simester'].astype('category')
+    df['note'] = pd.to_numeric(df['note'])
+    return df
+
+
+def write_cache(df, path=CACHE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    if path.endswith('.parquet'):
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def read_cache(path=CACHE_PATH):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def convert(source=SOURCE_PATH, path=CACHE_PATH):
+    start = time.perf_counter()
+    df = to_typed(pd.read_excel(source))
+    write_cache(df, path)
+    print(f"Converted {len(df)} rows from {source} to {path} in {time.perf_counter() - start:.2f}s")
+    return df
+
+
+def load_grades(source=SOURCE_PATH, path=CACHE_PATH):
+    """Read the cached grades, converting the workbook first if the cache is missing or older"""
+    if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+        start = time.perf_counter()
+        df = read_cache(path)
+        print(f"Loaded {len(df)} rows from {path} in {time.perf_counter() - start:.2f}s")
+        return df
+    return convert(source, path)
+
+
+def main():
+    convert()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Evaluate the trained model per target course
+Scores models/best_model.pkl on the held-out test split and runs k-fold cross-validation
+of the same configuration on the training split. Each fold's matrices are written once
+as .npy files and memory-mapped read-only by the worker processes, which evaluate folds
+in parallel. Per-course RMSE/R2, fold timings and the hashes of the model, data, params
+and this script go to models/evaluation.json, the stage's only output. The file is kept
+between runs (persist in dvc.yaml), so when DVC reruns the stage for a dependency change
+that leaves those hashes equal, e.g. train reproducing an identical model, the
+evaluation is skipped
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import yaml
+from sklearn.base import clone
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import KFold
+
+from train import load_data
+
+MODEL_PATH = 'models/best_model.pkl'
+DATA_PATHS = ['data/processed/train.csv', 'data/processed/test.csv']
+OUTPUT_PATH = 'models/evaluation.json'
+
+
+def file_hash(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def per_course(y_true, y_pred, courses):
+    """RMSE and R2 of every target column"""
+    rmse = np.sqrt(((y_true - y_pred) ** 2).mean(axis=0))
+    r2 = r2_score(y_true, y_pred, multioutput='raw_values')
+    return {course: {'rmse': float(rmse[j]), 'r2': float(r2[j])} for j, course in enumerate(courses)}
+
+
+def model_family(model):
+    """Model family as named in model_metadata.json: xgboost, random_forest, ..."""
+    estimator = getattr(model, 'estimator', model)
+    name = type(estimator).__name__
+    if name.startswith('XGB'):
+        return 'xgboost'
+    if name == 'RandomForestRegressor':
+        return 'random_forest'
+    return name.lower()
+
+
+def single_threaded(model):
+    """Unfitted copy with every n_jobs set to 1, so parallel folds do not oversubscribe the cores"""
+    model = clone(model)
+    n_jobs = {key: 1 for key in model.get_params(deep=True) if key.split('__')[-1] == 'n_jobs'}
+    return model.set_params(**n_jobs)
+
+
+def write_folds(X, y, n_folds, random_state, directory):
+    """Build every fold's train/validation matrices once; returns the validation row indices per fold"""
+    splits = list(KFold(n_splits=n_folds, shuffle=True, random_state=random_state).split(X))
+    for k, (train_idx, val_idx) in enumerate(splits):
+        for name, array in (('X_train', X[train_idx]), ('y_train', y[train_idx]),
+                            ('X_val', X[val_idx]), ('y_val', y[val_idx])):
+            np.save(os.path.join(directory, f'fold{k}_{name}.npy'), np.ascontiguousarray(array))
+    return [val_idx for _, val_idx in splits]
+
+
+def evaluate_fold(template, directory, k):
+    """Fit and score one fold from its memory-mapped matrices (runs in a worker process)"""
+    def load(name):
+        return np.load(os.path.join(directory, f'fold{k}_{name}.npy'), mmap_mode='r')
+
+    model = clone(template)
+    start = time.perf_counter()
+    model.fit(load('X_train'), load('y_train'))
+    fit_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = np.asarray(model.predict(load('X_val')))
+    predict_seconds = time.perf_counter() - start
+    return k, fit_seconds, predict_seconds, y_pred
+
+
+def cross_validate(model, X, y, courses, n_folds, n_jobs, random_state):
+    workers = min(n_folds, os.cpu_count() if n_jobs in (None, -1) else n_jobs)
+    template = single_threaded(model)
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix='folds-') as directory:
+        val_indices = write_folds(X, y, n_folds, random_state, directory)
+        ctx = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            results = list(pool.map(evaluate_fold, [template] * n_folds, [directory] * n_folds, range(n_folds)))
+    wall_seconds = time.perf_counter() - start
+
+    oof = np.empty_like(y, dtype=np.float64)
+    folds = []
+    for k, fit_seconds, predict_seconds, y_pred in sorted(results, key=lambda r: r[0]):
+        val_idx = val_indices[k]
+        oof[val_idx] = y_pred
+        folds.append({
+            'fold': k,
+            'rows': int(len(val_idx)),
+            'rmse': float(np.sqrt(mean_squared_error(y[val_idx], y_pred))),
+            'r2': float(r2_score(y[val_idx], y_pred)),
+            'fit_seconds': round(fit_seconds, 3),
+            'predict_seconds': round(predict_seconds, 4),
+            'per_course': per_course(y[val_idx], y_pred, courses),
+        })
+
+    r2s = np.array([fold['r2'] for fold in folds])
+    rmses = np.array([fold['rmse'] for fold in folds])
+    return {
+        'folds': n_folds,
+        'workers': workers,
+        'r2_mean': float(r2s.mean()),
+        'r2_std': float(r2s.std()),
+        'rmse_mean': float(rmses.mean()),
+        'rmse_std': float(rmses.std()),
+        # Out-of-fold: every training row predicted by the fold that held it out
+        'oof_rmse': float(np.sqrt(mean_squared_error(y, oof))),
+        'oof_r2': float(r2_score(y, oof)),
+        'per_course': {
+            course: {
+                'rmse_mean': float(np.mean([fold['per_course'][course]['rmse'] for fold in folds])),
+                'r2_mean': float(np.mean([fold['per_course'][course]['r2'] for fold in folds])),
+            }
+            for course in courses
+        },
+        'wall_seconds': round(wall_seconds, 2),
+        'fold_details': folds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-course holdout and k-fold evaluation of the trained model")
+    parser.add_argument('--force', action='store_true', help="evaluate even if nothing it reads changed")
+    args = parser.parse_args()
+
+    with open('params.yaml', 'r') as f:
+        params = yaml.safe_load(f)['evaluate']
+
+    inputs = {
+        'model_sha256': file_hash(MODEL_PATH),
+        'data_sha256': file_hash(*DATA_PATHS),
+        'params': params,
+        'script_sha256': file_hash(os.path.abspath(__file__)),
+    }
+    if not args.force and os.path.exists(OUTPUT_PATH):
+        with open(OUTPUT_PATH, 'r') as f:
+            previous = json.load(f)
+        if previous.get('inputs') == inputs:
+            print("[OK] Inputs unchanged since the last evaluation; skipping (--force to rerun)")
+            return
+
+    X_train, y_train, X_test, y_test, _, output_courses = load_data()
+    model = joblib.load(MODEL_PATH)
+
+    start = time.perf_counter()
+    y_pred = np.asarray(model.predict(X_test))
+    holdout = {
+        'rmse': float(np.sqrt(mean_squared_error(y_test, y_pred))),
+        'r2': float(r2_score(y_test, y_pred)),
+        'predict_seconds': round(time.perf_counter() - start, 4),
+        'per_course': per_course(y_test, y_pred, output_courses),
+    }
+
+    print(f"[INFO] {params['cv_folds']}-fold cross-validation of {type(model).__name__}...")
+    cv = cross_validate(model, X_train, y_train, output_courses,
+                        params['cv_folds'], params.get('n_jobs', -1), params['random_state'])
+
+    family = model_family(model)
+    with open(OUTPUT_PATH, 'w') as f:
+        json.dump({'inputs': inputs, 'model_family': family, 'holdout': holdout, 'cv': cv}, f, indent=2)
+
+    print(f"\n{'Course':<10} {'Test RMSE':<11} {'Test R2':<9} {'CV RMSE':<9} {'CV R2':<8}")
+    print("-" * 50)
+    for course in output_courses:
+        test, fold = holdout['per_course'][course], cv['per_course'][course]
+        print(f"{course:<10} {test['rmse']:<11.4f} {test['r2']:<9.4f} "
+              f"{fold['rmse_mean']:<9.4f} {fold['r2_mean']:<8.4f}")
+
+    print(f"\n{'='*50}")
+    print("Evaluation completed")
+    print(f"{'='*50}")
+    print(f"Test RMSE: {holdout['rmse']:.4f}, R2: {holdout['r2']:.4f}")
+    print(f"CV RMSE: {cv['rmse_mean']:.4f} ± {cv['rmse_std']:.4f}, R2: {cv['r2_mean']:.4f} ± {cv['r2_std']:.4f}")
+    print(f"Folds: {cv['folds']} on {cv['workers']} workers in {cv['wall_seconds']:.2f}s "
+          f"(fit {sum(f['fit_seconds'] for f in cv['fold_details']):.2f}s total)")
+    print(f"Saved {OUTPUT_PATH} [{family}]")
+    print(f"{'='*50}\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""
+Export the trained model as memory-mappable arrays for fast API cold starts
+Serve the result with MODEL_FORMAT=arrays (see backend/app/config.py)
+"""
+import argparse
+import joblib
+import numpy as np
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from app.tree_engine import CompiledEnsemble, compile_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export best_model.pkl as memory-mappable arrays")
+    parser.add_argument('--model', default='backend/models/best_model.pkl')
+    parser.add_argument('--output', default='backend/models/best_model_arrays')
+    args = parser.parse_args()
+
+    print(f"[INFO] Loading model from {args.model}")
+    model = joblib.load(args.model)
+    compiled = compile_model(model)
+    if compiled is None:
+        print("[ERROR] Model type is not supported by the tree engine; keep MODEL_FORMAT=pickle")
+        sys.exit(1)
+
+    compiled.save(args.output)
+
+    # Check the exported arrays reproduce the pickled model
+    X = np.random.default_rng(0).uniform(0, 100, size=(256, compiled.n_features))
+    diff = np.abs(CompiledEnsemble.load(args.output).predict(X) - np.asarray(model.predict(X))).max()
+
+    print(f"[OK] Exported {compiled.n_trees} trees ({compiled.nbytes / 1024:.1f} KB) to {args.output}")
+    print(f"[OK] Max abs difference vs pickled model: {diff:.2e}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Incremental ingestion of the yearly cohort workbooks (data/G2022.xlsx ...)
+Each file is fingerprinted by content hash; only new or changed cohorts are parsed
+and written as a partition under data/partitions/<cohort>/:
+  grades   - the cohort's student x course matrix (first grade of each pair)
+  counts   - per-course counts of each distinct grade, merged across cohorts for the medians
+The manifest records hashes, sizes and course order so the training matrix and the
+imputation medians are assembled from partitions without touching raw rows
+"""
+import glob
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from convert_data import CACHE_EXT, read_cache, to_typed, write_cache
+
+PARTITIONS_DIR = 'data/partitions'
+MANIFEST_PATH = os.path.join(PARTITIONS_DIR, 'manifest.json')
+DEFAULT_PATTERN = 'data/G*.xlsx'
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        return {'cohorts': {}}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def partition_paths(cohort):
+    base = os.path.join(PARTITIONS_DIR, cohort)
+    return os.path.join(base, f'grades{CACHE_EXT}'), os.path.join(base, f'counts{CACHE_EXT}')
+
+
+def grade_counts(matrix):
+    """Long table (code, note, count) of how often each grade occurs per course"""
+    long = matrix.melt(var_name='code', value_name='note').dropna(subset=['note'])
+    return long.groupby(['code', 'note']).size().rename('count').reset_index()
+
+
+def ingest_cohort(cohort, path):
+    """Parse one cohort workbook into its partition; returns its manifest entry"""
+    from prepare_data import build_grade_matrix
+
+    df = to_typed(pd.read_excel(path))
+    matrix = build_grade_matrix(df)
+    grades_path, counts_path = partition_paths(cohort)
+    write_cache(matrix.reset_index(), grades_path)
+    write_cache(grade_counts(matrix), counts_path)
+
+    pairs = df[['simester', 'code']].drop_duplicates().astype(str)
+    return {
+        'source': path,
+        'rows': len(df),
+        'students': len(matrix),
+        'grades': grades_path,
+        'counts': counts_path,
+        # (semester, course) pairs in order of first appearance, for the course lists
+        'courses': pairs.values.tolist(),
+    }
+
+
+def ingest(pattern=DEFAULT_PATTERN, manifest_path=MANIFEST_PATH):
+    """Bring the partitions up to date with the cohort files matching `pattern`"""
+    manifest = load_manifest(manifest_path)
+    cohorts = {}
+    for path in sorted(glob.glob(pattern)):
+        cohort = os.path.splitext(os.path.basename(path))[0]
+        digest = file_hash(path)
+        entry = manifest['cohorts'].get(cohort)
+        if entry and entry['sha256'] == digest and all(os.path.exists(p) for p in partition_paths(cohort)):
+            print(f"  {cohort}: unchanged, skipped")
+            cohorts[cohort] = entry
+            continue
+
+        start = time.perf_counter()
+        cohorts[cohort] = {**ingest_cohort(cohort, path), 'sha256': digest}
+        print(f"  {cohort}: ingested {cohorts[cohort]['rows']} rows in {time.perf_counter() - start:.2f}s")
+
+    # Cohorts whose file disappeared are dropped from the manifest
+    manifest['cohorts'] = cohorts
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def median_from_counts(counts):
+    """Exact median of a course from its (note, count) table, as pandas would compute it"""
+    counts = counts.groupby('note', sort=True)['count'].sum()
+    cumulative = counts.cumsum().to_numpy()
+    values = counts.index.to_numpy()
+    n = cumulative[-1]
+    upper = values[np.searchsorted(cumulative, n // 2 + 1)]
+    if n % 2:
+        return float(upper)
+    lower = values[np.searchsorted(cumulative, n // 2)]
+    return float((lower + upper) / 2)
+
+
+def assemble(manifest):
+    """
+    Build (grade_matrix, semester course pairs, medians) from the partitions.
+    Medians come from the merged grade counts, not from the assembled matrix.
+    """
+    cohorts = [manifest['cohorts'][c] for c in sorted(manifest['cohorts'])]
+    matrices = [read_cache(entry['grades']).set_index('admi') for entry in cohorts]
+    grade_matrix = pd.concat(matrices, sort=False)
+
+    overlapping = grade_matrix.index.duplicated()
+    if overlapping.any():
+        # A student present in several cohorts: keep the first grade per course, as a
+        # full rebuild would, and take medians from the matrix since counts double count
+        print(f"[WARN] {overlapping.sum()} students appear in more than one cohort")
+        grade_matrix = grade_matrix.groupby(level=0, sort=False).first()
+        medians = grade_matrix.median()
+    else:
+        counts = pd.concat([read_cache(entry['counts']) for entry in cohorts])
+        medians = pd.Series({code: median_from_counts(group) for code, group in counts.groupby('code')})
+
+    grade_matrix = grade_matrix.sort_index()
+    pairs = pd.DataFrame([pair for entry in cohorts for pair in entry['courses']], columns=['simester', 'code'])
+    return grade_matrix, pairs, medians
+
+
+def main():
+    with open('params.yaml', 'r') as f:
+        params = yaml.safe_load(f).get('prepare', {})
+
+    start = time.perf_counter()
+    print("[INFO] Ingesting cohorts...")
+    manifest = ingest(params.get('cohort_pattern', DEFAULT_PATTERN))
+    print(f"[OK] {len(manifest['cohorts'])} cohorts up to date in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,28 +2,62 @@ import pandas as pd
 from sklearn.model_selection import train_test_split
 import yaml
 import os
+import sys
+
+from convert_data import load_grades
+
+INPUT_SEMESTERS = ['S1', 'S2', 'S3', 'S4']
+OUTPUT_SEMESTERS = ['S5', 'S6']
+
+
+def build_grade_matrix(df):
+    """One row per student, one column per course, first recorded grade of each pair"""
+    grades = df.dropna(subset=['note'])
+    matrix = grades.groupby(['admi', 'code'], observed=True, sort=True)['note'].first().unstack('code')
+    matrix.columns = matrix.columns.tolist()
+    return matrix
 
-def main():
-    with open('params.yaml', 'r') as f:
-        params = yaml.safe_load(f)
 
-    df = pd.read_excel('data/cleaned_data.xlsx')
+def semester_courses(df):
+    """Course codes per semester group, ordered by semester then first appearance, in one pass"""
+    pairs = df[['simester', 'code']].drop_duplicates()
+    return order_courses(pairs)
 
-    grade_matrix = df.pivot_table(index='admi', columns='code', values='note', aggfunc='first')
 
-    courses_s1_s4 = []
-    courses_s5_s6 = []
+def order_courses(pairs):
+    rank = {sem: i for i, sem in enumerate(INPUT_SEMESTERS + OUTPUT_SEMESTERS)}
+    pairs = pairs.assign(rank=pairs['simester'].astype(object).map(rank)).dropna(subset=['rank'])
+    pairs = pairs.sort_values('rank', kind='stable')
+
+    is_input = pairs['rank'] < len(INPUT_SEMESTERS)
+    courses_s1_s4 = list(dict.fromkeys(pairs.loc[is_input, 'code'].tolist()))
+    courses_s5_s6 = list(dict.fromkeys(pairs.loc[~is_input, 'code'].tolist()))
+    return courses_s1_s4, courses_s5_s6
+
+
+def main():
+    with open('params.yaml', 'r') as f:
+        params = yaml.safe_load(f)
 
-    for sem in ['S1', 'S2', 'S3', 'S4']:
-        courses_s1_s4.extend(df[df['simester'] == sem]['code'].unique().tolist())
-    for sem in ['S5', 'S6']:
-        courses_s5_s6.extend(df[df['simester'] == sem]['code'].unique().tolist())
+    if params.get('prepare', {}).get('source', 'cleaned') == 'cohorts':
+        # Partitions and manifest are written by the ingest_cohorts stage, only read here
+        from ingest_cohorts import assemble, load_manifest
+        manifest = load_manifest()
+        if not manifest['cohorts']:
+            sys.exit("[ERROR] No cohort partitions found; run scripts/ingest_cohorts.py first")
+        grade_matrix, pairs, medians = assemble(manifest)
+        courses_s1_s4, courses_s5_s6 = order_courses(pairs)
+    else:
+        df = load_grades()
+        grade_matrix = build_grade_matrix(df)
+        courses_s1_s4, courses_s5_s6 = semester_courses(df)
+        medians = grade_matrix.median()
 
-    courses_s1_s4 = list(dict.fromkeys([c for c in courses_s1_s4 if c in grade_matrix.columns]))
-    courses_s5_s6 = list(dict.fromkeys([c for c in courses_s5_s6 if c in grade_matrix.columns]))
+    courses_s1_s4 = [c for c in courses_s1_s4 if c in grade_matrix.columns]
+    courses_s5_s6 = [c for c in courses_s5_s6 if c in grade_matrix.columns]
 
-    X = grade_matrix[courses_s1_s4].fillna(grade_matrix[courses_s1_s4].median())
-    y = grade_matrix[courses_s5_s6].fillna(grade_matrix[courses_s5_s6].median())
+    X = grade_matrix[courses_s1_s4].fillna(medians[courses_s1_s4])
+    y = grade_matrix[courses_s5_s6].fillna(medians[courses_s5_s6])
 
     data = pd.concat([X, y], axis=1)
     data = data.reset_index()
@@ -42,4 +76,4 @@ def main():
     print(f"Input courses: {len(courses_s1_s4)}, Output courses: {len(courses_s5_s6)}")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
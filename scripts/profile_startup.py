@@ -0,0 +1,85 @@
+"""
+Break down API cold start time: imports, model load, first and warm predictions
+Each measurement runs in a fresh interpreter so nothing is already imported or cached
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+import app.main
+from app.predictor import predictor
+t1 = time.perf_counter()
+predictor.load_model()
+t2 = time.perf_counter()
+grades = {c: 70.0 for c in predictor.feature_columns}
+predictor.predict(grades)
+t3 = time.perf_counter()
+grades[predictor.feature_columns[0]] = 71.0
+predictor.predict(grades)
+t4 = time.perf_counter()
+import sys
+print(json.dumps({
+    "import_seconds": t1 - t0,
+    "load_seconds": t2 - t1,
+    "artifact_load_seconds": predictor.get_version_info()["timings"].get("load_seconds", 0.0),
+    "compile_seconds": predictor.get_version_info()["timings"].get("compile_seconds", 0.0),
+    "first_predict_seconds": t3 - t2,
+    "warm_predict_seconds": t4 - t3,
+    "mlflow_imported": "mlflow" in sys.modules,
+}))
+"""
+
+
+def run_once(model_format):
+    env = dict(os.environ, MODEL_FORMAT=model_format, MODEL_RELOAD_INTERVAL="0")
+    out = subprocess.run(
+        [sys.executable, '-c', CHILD], cwd=BACKEND_DIR, env=env,
+        capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report API startup time breakdown")
+    parser.add_argument('--formats', nargs='+', default=['pickle', 'arrays'])
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = [
+        ('import_seconds', 'Import app'),
+        ('load_seconds', 'load_model() total'),
+        ('artifact_load_seconds', '  artifact load'),
+        ('compile_seconds', '  compile'),
+        ('first_predict_seconds', 'First prediction'),
+        ('warm_predict_seconds', 'Warm prediction'),
+    ]
+
+    results = {}
+    for model_format in args.formats:
+        try:
+            runs = [run_once(model_format) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            print(f"[WARN] {model_format} startup failed: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        results[model_format] = {k: min(r[k] for r in runs) for k, _ in rows}
+        results[model_format]['mlflow_imported'] = runs[0]['mlflow_imported']
+
+    print(f"\n{'Stage':<22}" + "".join(f"{fmt + ' (ms)':<16}" for fmt in results))
+    print("-" * (22 + 16 * len(results)))
+    for key, label in rows:
+        print(f"{label:<22}" + "".join(f"{results[fmt][key] * 1000:<16.1f}" for fmt in results))
+    stages = ('import_seconds', 'load_seconds', 'first_predict_seconds')
+    total = {fmt: sum(results[fmt][k] for k in stages) for fmt in results}
+    print(f"{'Total to first result':<22}" + "".join(f"{total[fmt] * 1000:<16.1f}" for fmt in results))
+    print("\nMLflow imported at startup: " + ", ".join(f"{fmt}={results[fmt]['mlflow_imported']}" for fmt in results))
+
+
+if __name__ == '__main__':
+    main()
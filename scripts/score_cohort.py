@@ -0,0 +1,155 @@
+"""
+Score a whole cohort offline with a pool of worker processes
+Reads CSV / Parquet / the data/processed layout in chunks, shards the chunks
+across workers and writes predictions incrementally as they complete
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+_model = None
+
+
+def init_worker(model_path):
+    """
+    Load the model once per worker. A directory of exported arrays is memory-mapped
+    read-only, so all workers share its pages; a pickle is loaded privately per worker
+    """
+    global _model
+    from app.tree_engine import CompiledEnsemble
+
+    if os.path.isdir(model_path):
+        _model = CompiledEnsemble.load(model_path, mmap=True)
+    else:
+        _model = joblib.load(model_path)
+
+
+def shared_model_path(model_dir, scratch):
+    """
+    Exported arrays for the workers: best_model_arrays if present, else the pickle
+    compiled once here into `scratch`. Falls back to the pickle for models the tree
+    engine does not support
+    """
+    arrays_path = os.path.join(model_dir, 'best_model_arrays')
+    if os.path.isdir(arrays_path):
+        return arrays_path
+
+    from app.tree_engine import compile_model
+
+    model_path = os.path.join(model_dir, 'best_model.pkl')
+    compiled = compile_model(joblib.load(model_path))
+    if compiled is None:
+        print("[WARN] Model type is not supported by the tree engine; each worker loads its own copy")
+        return model_path
+    compiled.save(scratch)
+    return scratch
+
+
+def score_chunk(index, X):
+    predictions = np.round(np.clip(np.asarray(_model.predict(X)), 0, 100), 2)
+    peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return index, predictions, peak_rss_kb
+
+
+def iter_chunks(path, chunk_size):
+    """Yield DataFrame chunks from a CSV file, a Parquet file or a data/processed directory"""
+    if os.path.isdir(path):
+        for name in ['train.csv', 'test.csv']:
+            if os.path.exists(os.path.join(path, name)):
+                yield from iter_chunks(os.path.join(path, name), chunk_size)
+    elif path.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a cohort of students with the trained model")
+    parser.add_argument('input', nargs='?', default='data/processed',
+                        help="CSV/Parquet file or data/processed directory")
+    parser.add_argument('--output', default='data/scores/cohort_scores.csv')
+    parser.add_argument('--model-dir', default=os.path.dirname(os.getenv('MODEL_PATH', 'models/best_model.pkl')))
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--id-column', default='admi')
+    args = parser.parse_args()
+
+    feature_columns = joblib.load(os.path.join(args.model_dir, 'feature_columns.pkl'))
+    target_columns = joblib.load(os.path.join(args.model_dir, 'target_columns.pkl'))
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    if os.path.exists(args.output):
+        os.remove(args.output)
+
+    print(f"[INFO] Scoring {args.input} with {args.workers} workers, {args.chunk_size} rows per chunk")
+    start = time.perf_counter()
+    total_rows = 0
+    worker_peak_kb = 0
+    pending_ids = {}
+    done = {}
+    next_to_write = 0
+
+    def collect(futures):
+        nonlocal next_to_write, total_rows, worker_peak_kb
+        for future in futures:
+            i, predictions, peak_kb = future.result()
+            done[i] = predictions
+            worker_peak_kb = max(worker_peak_kb, peak_kb)
+
+        # Write completed chunks in input order
+        while next_to_write in done:
+            out = pd.DataFrame(done.pop(next_to_write), columns=target_columns)
+            out.insert(0, args.id_column, pending_ids.pop(next_to_write))
+            out.to_csv(args.output, mode='a', header=next_to_write == 0, index=False)
+            total_rows += len(out)
+            next_to_write += 1
+
+    scratch = tempfile.TemporaryDirectory(prefix='cohort-model-')
+    model_path = shared_model_path(args.model_dir, scratch.name)
+    print(f"[INFO] Workers load the model from {model_path}")
+
+    with scratch, ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                                      initargs=(model_path,)) as pool:
+        in_flight = set()
+        for index, chunk in enumerate(iter_chunks(args.input, args.chunk_size)):
+            ids = chunk[args.id_column].to_numpy() if args.id_column in chunk else np.arange(len(chunk))
+            X = chunk.reindex(columns=feature_columns).fillna(50.0).to_numpy(dtype=np.float64)
+            pending_ids[index] = ids
+            in_flight.add(pool.submit(score_chunk, index, X))
+
+            # Keep a bounded number of chunks in flight so memory stays flat
+            if len(in_flight) >= 2 * args.workers:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+
+        collect(in_flight)
+
+    elapsed = time.perf_counter() - start
+    parent_peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    print(f"\n{'='*50}")
+    print("Cohort scoring completed")
+    print(f"{'='*50}")
+    print(f"Rows scored: {total_rows}")
+    print(f"Elapsed: {elapsed:.2f}s")
+    print(f"Throughput: {total_rows / elapsed if elapsed else 0:.0f} rows/sec")
+    print(f"Peak RSS (parent): {parent_peak_kb / 1024:.1f} MB")
+    print(f"Peak RSS (per worker): {worker_peak_kb / 1024:.1f} MB")
+    print(f"Output: {args.output}")
+    print(f"{'='*50}\n")
+
+
+if __name__ == '__main__':
+    main()
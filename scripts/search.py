@@ -0,0 +1,169 @@
+"""
+Successive-halving hyperparameter search over the training parameter space
+Samples `n_candidates` configurations per model family, scores them with k-fold CV
+on a small tree budget, keeps the best 1/factor and multiplies the budget by factor
+until max_estimators. XGBoost trials also stop adding trees once an early-stopping split
+carved out of the fold's training part stops improving, so the validation fold that is
+scored stays untouched. Winners and the full cv_r2/rmse table go to models/model_metadata.json
+"""
+import json
+import time
+
+import numpy as np
+import yaml
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.metrics import mean_squared_error, r2_score
+from sklearn.model_selection import KFold, ParameterSampler, train_test_split
+import xgboost as xgb
+
+from train import load_data
+
+FAMILIES = {
+    'xgboost': 'xgb',
+    'random_forest': 'rf',
+}
+
+
+def make_estimator(family, params, n_estimators, early_stopping_rounds=None):
+    if family == 'xgboost':
+        # One tree per target per round over the 2-D target, so a fold's
+        # DMatrix is built once for all courses
+        return xgb.XGBRegressor(
+            **params,
+            n_estimators=n_estimators,
+            tree_method='hist',
+            multi_strategy='one_output_per_tree',
+            early_stopping_rounds=early_stopping_rounds,
+            n_jobs=1,
+        )
+    return RandomForestRegressor(**params, n_estimators=n_estimators, n_jobs=1)
+
+
+def run_trial(family, params, n_estimators, fold, random_state, early_stopping_rounds, early_stopping_fraction):
+    """Fit one candidate on one cached fold; returns (r2, rmse, trees actually used)"""
+    X_train, y_train, X_val, y_val = fold
+    early_stopping_rounds = early_stopping_rounds if family == 'xgboost' else None
+    model = make_estimator(family, {**params, 'random_state': random_state}, n_estimators, early_stopping_rounds)
+    if early_stopping_rounds:
+        # Stop on rows held out of the training part; X_val is only used for the score
+        X_fit, X_stop, y_fit, y_stop = train_test_split(
+            X_train, y_train, test_size=early_stopping_fraction, random_state=random_state
+        )
+        model.fit(X_fit, y_fit, eval_set=[(X_stop, y_stop)], verbose=False)
+        used = model.best_iteration + 1
+    else:
+        model.fit(X_train, y_train)
+        used = n_estimators
+    y_pred = model.predict(X_val)
+    return r2_score(y_val, y_pred), np.sqrt(mean_squared_error(y_val, y_pred)), used
+
+
+def successive_halving(family, space, folds, config, parallel):
+    candidates = list(ParameterSampler(space, n_iter=config['n_candidates'], random_state=config['random_state']))
+    alive = list(range(len(candidates)))
+    n_estimators = config['min_estimators']
+    table = []
+    iteration = 0
+
+    while True:
+        start = time.perf_counter()
+        # Folds are built once; the same parallel pool (and its memory-mapped
+        # copies of the fold arrays) is reused for every rung
+        scores = parallel(
+            delayed(run_trial)(family, candidates[c], n_estimators, fold, config['random_state'],
+                               config.get('early_stopping_rounds'), config.get('early_stopping_fraction', 0.15))
+            for c in alive for fold in folds
+        )
+        scores = np.array(scores).reshape(len(alive), len(folds), 3)
+
+        rung = []
+        for c, fold_scores in zip(alive, scores):
+            row = {
+                'iteration': iteration,
+                'n_estimators': n_estimators,
+                'params': candidates[c],
+                'cv_r2': float(fold_scores[:, 0].mean()),
+                'cv_r2_std': float(fold_scores[:, 0].std()),
+                'rmse': float(fold_scores[:, 1].mean()),
+                'trees_used': int(round(fold_scores[:, 2].mean())),
+            }
+            rung.append((c, row))
+            table.append(row)
+        print(f"  rung {iteration}: {len(alive)} candidates x {len(folds)} folds at {n_estimators} trees "
+              f"({time.perf_counter() - start:.1f}s), best cv_r2 {max(r['cv_r2'] for _, r in rung):.4f}")
+
+        rung.sort(key=lambda item: item[1]['cv_r2'], reverse=True)
+        if len(alive) == 1 or n_estimators >= config['max_estimators']:
+            return rung[0][1], table
+
+        alive = [c for c, _ in rung[:max(1, len(alive) // config['factor'])]]
+        n_estimators = min(n_estimators * config['factor'], config['max_estimators'])
+        iteration += 1
+
+
+def main():
+    with open('params.yaml', 'r') as f:
+        params = yaml.safe_load(f)
+    config = params['search']
+
+    X_train, y_train, X_test, y_test, _, _ = load_data()
+    kfold = KFold(n_splits=config['cv_folds'], shuffle=True, random_state=config['random_state'])
+    folds = [(X_train[tr], y_train[tr], X_train[va], y_train[va]) for tr, va in kfold.split(X_train)]
+
+    with open('models/model_metadata.json', 'r') as f:
+        metadata = json.load(f)
+
+    results = {}
+    with Parallel(n_jobs=config.get('n_jobs', -1)) as parallel:
+        for family in config['models']:
+            print(f"[INFO] Searching {family}...")
+            start = time.perf_counter()
+            best, table = successive_halving(family, config[family], folds, config, parallel)
+
+            # Refit the winner on the whole training set with the trees it actually needed
+            n_estimators = best['trees_used']
+            winner = {**best['params'], 'n_estimators': n_estimators}
+            model = make_estimator(family, {**best['params'], 'random_state': config['random_state']}, n_estimators)
+            model.fit(X_train, y_train)
+            y_pred = model.predict(X_test)
+            rmse = float(np.sqrt(mean_squared_error(y_test, y_pred)))
+            r2 = float(r2_score(y_test, y_pred))
+
+            name = '_'.join([FAMILIES[family]] + [f"{k}{v}" for k, v in sorted(winner.items())])
+            metadata[family] = {
+                **metadata.get(family, {}),
+                'params': winner,
+                'filename': f"{name}.pkl",
+                'rmse': rmse,
+                'r2': r2,
+                'cv_r2': best['cv_r2'],
+                'search': table,
+            }
+            results[family] = {
+                'params': winner,
+                'cv_r2': best['cv_r2'],
+                'cv_rmse': best['rmse'],
+                'rmse': rmse,
+                'r2': r2,
+                'trials': len(table),
+                'seconds': round(time.perf_counter() - start, 2),
+            }
+            print(f"[OK] {family}: cv_r2 {best['cv_r2']:.4f}, test RMSE {rmse:.4f}, R2 {r2:.4f} -> {winner}")
+
+    with open('models/model_metadata.json', 'w') as f:
+        json.dump(metadata, f, indent=2)
+    with open('models/search_results.json', 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{'='*50}")
+    print("Search completed")
+    print(f"{'='*50}")
+    for family, result in results.items():
+        print(f"{family}: cv_r2={result['cv_r2']:.4f} rmse={result['rmse']:.4f} "
+              f"({result['trials']} trials, {result['seconds']:.1f}s)")
+    print(f"{'='*50}\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,10 +3,12 @@ import numpy as np
 from sklearn.multioutput import MultiOutputRegressor
 from sklearn.metrics import mean_squared_error, r2_score
 import xgboost as xgb
-import mlflow
-import mlflow.sklearn
+import argparse
 import joblib
 import json
+import multiprocessing
+import resource
+import time
 import yaml
 import os
 from dotenv import load_dotenv
@@ -14,11 +16,13 @@ from dotenv import load_dotenv
 # Load environment variables from .env file
 load_dotenv()
 
+# sequential: one target after another (MultiOutputRegressor default)
+# parallel:   several targets at once in threads, cores split between them
+# native:     a single XGBoost model over all targets (multi_strategy)
+TRAIN_MODES = ('sequential', 'parallel', 'native')
 
-def main():
-    with open('params.yaml', 'r') as f:
-        params = yaml.safe_load(f)['train']
 
+def load_data():
     train_data = pd.read_csv('data/processed/train.csv')
     test_data = pd.read_csv('data/processed/test.csv')
 
@@ -28,10 +32,120 @@ def main():
     input_courses = metadata['input_courses']
     output_courses = metadata['output_courses']
 
-    X_train = train_data[input_courses]
-    y_train = train_data[output_courses]
-    X_test = test_data[input_courses]
-    y_test = test_data[output_courses]
+    # Build the float32 matrices once; XGBoost trains on float32, so every
+    # target fit reuses them instead of converting the DataFrame again
+    X_train = np.ascontiguousarray(train_data[input_courses].to_numpy(dtype=np.float32))
+    y_train = train_data[output_courses].to_numpy(dtype=np.float32)
+    X_test = np.ascontiguousarray(test_data[input_courses].to_numpy(dtype=np.float32))
+    y_test = test_data[output_courses].to_numpy(dtype=np.float32)
+    return X_train, y_train, X_test, y_test, input_courses, output_courses
+
+
+def searched_params(params):
+    """XGBoost parameters picked by scripts/search.py, if enabled and the search has run"""
+    if not params.get('use_search_params'):
+        return {}
+    with open('models/model_metadata.json', 'r') as f:
+        xgboost = json.load(f).get('xgboost', {})
+    if 'search' not in xgboost:
+        return {}
+    return {k: v for k, v in xgboost['params'].items() if k in params}
+
+
+def build_model(params, mode, n_targets):
+    xgb_params = dict(
+        n_estimators=params['n_estimators'],
+        max_depth=params['max_depth'],
+        learning_rate=params['learning_rate'],
+        subsample=params['subsample'],
+        colsample_bytree=params['colsample_bytree'],
+        random_state=params['random_state'],
+        tree_method='hist',
+    )
+    n_cpus = params.get('n_jobs') or os.cpu_count() or 1
+
+    if mode == 'sequential':
+        return MultiOutputRegressor(xgb.XGBRegressor(**xgb_params, n_jobs=n_cpus))
+    if mode == 'parallel':
+        n_parallel = min(n_targets, n_cpus)
+        return MultiOutputRegressor(
+            xgb.XGBRegressor(**xgb_params, n_jobs=max(1, n_cpus // n_parallel)),
+            n_jobs=n_parallel
+        )
+    if mode == 'native':
+        return xgb.XGBRegressor(
+            **xgb_params,
+            n_jobs=n_cpus,
+            multi_strategy=params.get('multi_strategy', 'multi_output_tree')
+        )
+    raise ValueError(f"Unknown training mode '{mode}', expected one of {TRAIN_MODES}")
+
+
+def fit_model(params, mode, X_train, y_train):
+    """Fit the model for `mode`, returning it with the wall time and peak RSS of the process"""
+    model = build_model(params, mode, y_train.shape[1])
+    start = time.perf_counter()
+    if mode == 'parallel':
+        # Threads share X_train instead of copying it to worker processes;
+        # XGBoost releases the GIL while it trains
+        with joblib.parallel_backend('threading'):
+            model.fit(X_train, y_train)
+    else:
+        model.fit(X_train, y_train)
+    train_seconds = time.perf_counter() - start
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return model, train_seconds, peak_rss_mb
+
+
+def evaluate(model, X_test, y_test):
+    y_pred = model.predict(X_test)
+    rmse = np.sqrt(mean_squared_error(y_test, y_pred))
+    r2 = r2_score(y_test, y_pred)
+    return rmse, r2
+
+
+def _benchmark_mode(params, mode):
+    X_train, y_train, X_test, y_test, _, _ = load_data()
+    model, train_seconds, peak_rss_mb = fit_model(params, mode, X_train, y_train)
+    rmse, r2 = evaluate(model, X_test, y_test)
+    return mode, train_seconds, peak_rss_mb, rmse, r2
+
+
+def compare_modes(params):
+    """Train once per mode, each in a fresh process so peak memory is per mode"""
+    ctx = multiprocessing.get_context('spawn')
+    rows = []
+    for mode in TRAIN_MODES:
+        print(f"[INFO] Training in {mode} mode...")
+        with ctx.Pool(1) as pool:
+            rows.append(pool.apply(_benchmark_mode, (params, mode)))
+
+    print(f"\n{'Mode':<12} {'Train s':<10} {'Peak RSS MB':<13} {'RMSE':<9} {'R2':<8}")
+    print("-" * 52)
+    for mode, train_seconds, peak_rss_mb, rmse, r2 in rows:
+        print(f"{mode:<12} {train_seconds:<10.2f} {peak_rss_mb:<13.1f} {rmse:<9.4f} {r2:<8.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the grade prediction model")
+    parser.add_argument('--mode', choices=TRAIN_MODES, help="override train.mode from params.yaml")
+    parser.add_argument('--compare-modes', action='store_true',
+                        help="time every training mode without saving or logging a model")
+    args = parser.parse_args()
+
+    with open('params.yaml', 'r') as f:
+        params = yaml.safe_load(f)['train']
+    mode = args.mode or params.get('mode', 'sequential')
+    params.update(searched_params(params))
+
+    if args.compare_modes:
+        compare_modes(params)
+        return
+
+    import mlflow
+    import mlflow.sklearn
+
+    X_train, y_train, X_test, y_test, input_courses, output_courses = load_data()
 
     # Configure MLflow tracking
     mlflow_uri = os.getenv('MLFLOW_TRACKING_URI', '')
@@ -52,29 +166,18 @@ def main():
         mlflow.log_params(params)
 
         # Train model
-        model = MultiOutputRegressor(
-            xgb.XGBRegressor(
-                n_estimators=params['n_estimators'],
-                max_depth=params['max_depth'],
-                learning_rate=params['learning_rate'],
-                subsample=params['subsample'],
-                colsample_bytree=params['colsample_bytree'],
-                random_state=params['random_state'],
-                n_jobs=-1
-            )
-        )
-
-        model.fit(X_train, y_train)
+        print(f"Training {len(output_courses)} targets in {mode} mode...")
+        model, train_seconds, peak_rss_mb = fit_model(params, mode, X_train, y_train)
 
         # Evaluate model
-        y_pred = model.predict(X_test)
-        rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-        r2 = r2_score(y_test, y_pred)
+        rmse, r2 = evaluate(model, X_test, y_test)
 
         # Log metrics
         mlflow.log_metrics({
             'rmse': rmse,
-            'r2': r2
+            'r2': r2,
+            'train_seconds': train_seconds,
+            'peak_rss_mb': peak_rss_mb
         })
 
         # Save models locally (fallback)
@@ -86,7 +189,9 @@ def main():
         # Save metrics
         metrics = {
             'rmse': float(rmse),
-            'r2': float(r2)
+            'r2': float(r2),
+            'train_seconds': round(train_seconds, 2),
+            'peak_rss_mb': round(peak_rss_mb, 1)
         }
         with open('models/metrics.json', 'w') as f:
             json.dump(metrics, f, indent=2)
@@ -103,6 +208,8 @@ def main():
         print(f"{'='*50}")
         print(f"RMSE: {rmse:.4f}")
         print(f"R2: {r2:.4f}")
+        print(f"Training time ({mode}): {train_seconds:.2f}s")
+        print(f"Peak RSS: {peak_rss_mb:.1f} MB")
         print(f"Run ID: {run.info.run_id}")
         if mlflow_uri:
             print(f"Model registered in MLflow Registry as '{model_name}'")